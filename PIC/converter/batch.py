@@ -0,0 +1,114 @@
+import cv2 as cv
+import numpy as np
+
+# Filtering more pixels per call stops paying off once the intermediate buffers no longer fit in the CPU caches
+MAX_PIXELS_PER_CALL = 1 << 19
+
+
+def stack_images(images):
+    '''
+    Combine same-sized images into a single contiguous stack.
+    :param: images, an N×H×W or N×H×W×C numpy array, or a list of H×W or H×W×C arrays of the same shape and type.
+    :return: a contiguous numpy array with the images along its first axis.
+    '''
+    if isinstance(images, np.ndarray):
+        if images.ndim not in (3, 4):
+            raise ValueError(f'A stack of images must have 3 or 4 dimensions, not {images.ndim}')
+        return np.ascontiguousarray(images)
+
+    if len(images) == 0:
+        raise ValueError('Cannot stack an empty list of images')
+    shape, dtype = images[0].shape, images[0].dtype
+    for image in images:
+        if image.shape != shape or image.dtype != dtype:
+            raise ValueError(f'All images of a stack must have the same shape and type, found {shape} and {image.shape}')
+    return np.stack(images)
+
+
+def apply_in_chunks(stack_filter, max_pixels: int, stack):
+    '''
+    Apply a stack filter to consecutive chunks of a stack, so the intermediate buffers of every call hold at most
+    max_pixels pixels, or a single image if the images are larger.
+    :param: stack_filter, a callable converting an N×H×W(×C) stack into an N×H×W stack.
+    :param: max_pixels, the maximum number of pixels per call.
+    :param: stack, the N×H×W(×C) stack to filter.
+    :return: the N×H×W stack of filtered images.
+    '''
+    images_per_chunk = max(1, max_pixels // (stack.shape[1] * stack.shape[2]))
+    if len(stack) <= images_per_chunk:
+        return stack_filter(stack)
+
+    output = None
+    for start in range(0, len(stack), images_per_chunk):
+        filtered_chunk = stack_filter(stack[start:start + images_per_chunk])
+        if output is None:
+            output = np.empty((len(stack),) + filtered_chunk.shape[1:], dtype=filtered_chunk.dtype)
+        output[start:start + len(filtered_chunk)] = filtered_chunk
+
+    return output
+
+
+def padded_stack(stack, padding: int, buffer=None):
+    '''
+    Lay a stack of single channel images out side by side, with padding columns left and right of every image.\n
+    Filtering the flattened padded stack in a single call only filters each image with its own pixels, as long
+    as the padding is refilled with fill_padding before every filter and is at least the kernel radius. The rows
+    are as wide as the whole stack, which also keeps small images on the vectorised paths of OpenCV.
+    :param: stack, an N×H×W numpy array.
+    :param: padding, the number of columns to add left and right of every image.
+    :param: buffer (optional), an H×N×(W+2*padding) array to copy into. Default: a new array.
+    :return: the padded H×N×(W+2*padding) stack. The padding columns are undefined until fill_padding is called.
+    '''
+    count, height, width = stack.shape
+    if buffer is None:
+        buffer = np.empty((height, count, width + 2 * padding), dtype=stack.dtype)
+    buffer[:, :, padding:padding + width] = stack.transpose(1, 0, 2)
+    return buffer
+
+
+def fill_padding(padded, padding: int, border: int=cv.BORDER_REPLICATE):
+    '''
+    Fill the padding columns of every image in a padded stack from the image's own columns, like the border
+    extrapolation of the OpenCV filters. All images are filled at once.
+    :param: padded, a stack created by padded_stack.
+    :param: padding, the number of padding columns left and right of every image.
+    :param: border (optional), either cv2.BORDER_REPLICATE (default) or cv2.BORDER_REFLECT_101.
+    The width of the images must exceed the padding for cv2.BORDER_REFLECT_101.
+    '''
+    left, right = padding, padded.shape[2] - padding - 1 # The first and last column of every image
+    if border == cv.BORDER_REPLICATE:
+        padded[:, :, :left] = padded[:, :, left:left + 1]
+        padded[:, :, right + 1:] = padded[:, :, right:right + 1]
+    elif border == cv.BORDER_REFLECT_101:
+        for offset in range(1, padding + 1):
+            padded[:, :, left - offset] = padded[:, :, left + offset]
+            padded[:, :, right + offset] = padded[:, :, right - offset]
+    else:
+        raise ValueError(f'Unsupported border type: {border}')
+
+
+def flatten(padded):
+    '''
+    View a padded stack as a single wide image, so an OpenCV filter processes every image in one call.
+    :param: padded, a contiguous H×N×W numpy array.
+    :return: an H×(N*W) view of the stack.
+    '''
+    return padded.reshape(padded.shape[0], -1)
+
+
+def images_of(padded, padding: int):
+    '''
+    :param: padded, a stack created by padded_stack.
+    :param: padding, the number of padding columns left and right of every image.
+    :return: an N×H×W view of the images without their padding columns.
+    '''
+    return padded[:, :, padding:padded.shape[2] - padding].transpose(1, 0, 2)
+
+
+def unpad(padded, padding: int):
+    '''
+    :param: padded, a stack created by padded_stack.
+    :param: padding, the number of padding columns left and right of every image.
+    :return: a contiguous N×H×W copy of the images without their padding columns.
+    '''
+    return np.ascontiguousarray(images_of(padded, padding))
@@ -0,0 +1,49 @@
+import threading
+import numpy as np
+
+_thread_local = threading.local()
+
+
+class BufferPool:
+    '''
+    A pool of reusable scratch buffers for the intermediate results of a filter chain.\n
+    Every named buffer keeps the largest allocation it has needed so far, so converting images of the same
+    or a smaller size allocates nothing. A pool must only be used by one thread at a time.
+    '''
+
+    def __init__(self):
+        self._buffers = {}
+
+    def get(self, name: str, shape: tuple, dtype=np.uint8):
+        '''
+        Get a contiguous scratch array, reusing the memory of the previous array with the same name.\n
+        The contents are undefined and are overwritten by the next call with the same name.
+        :param: name, the name of the buffer.
+        :param: shape, the shape of the array.
+        :param: dtype (optional), the data type of the array. Default: numpy.uint8
+        :return: a numpy array of the given shape and data type.
+        '''
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape)) * dtype.itemsize
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.size < size:
+            buffer = np.empty(size, dtype=np.uint8)
+            self._buffers[name] = buffer
+
+        return buffer[:size].view(dtype).reshape(shape)
+
+    def clear(self):
+        '''Release all buffers.'''
+        self._buffers = {}
+
+
+def thread_buffer_pool():
+    '''
+    Get the buffer pool of the current thread, creating it on first use.
+    :return: the BufferPool of the current thread.
+    '''
+    pool = getattr(_thread_local, 'pool', None)
+    if pool is None:
+        pool = BufferPool()
+        _thread_local.pool = pool
+    return pool
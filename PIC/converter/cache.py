@@ -0,0 +1,137 @@
+import os
+import shutil
+import hashlib
+import threading
+
+
+class ResultCache:
+    '''
+    A persistent, content-addressed cache of converted images.\n
+    Entries are keyed on the source bytes plus a signature of the conversion and its parameters,
+    and are evicted least recently used first once the cache grows beyond its size limit.
+    '''
+    DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+    _TEMPORARY_SUFFIX = '.tmp'
+
+    def __init__(self, directory: str, max_size: int=DEFAULT_MAX_SIZE):
+        '''
+        Initialise the cache, creating its directory if needed.
+        :param: directory, the directory to store cached results in.
+        :param: max_size (optional), the maximum total size of the cache in bytes. Default: 512 MB
+        '''
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._size = sum(entry.stat().st_size for entry in self._entries())
+
+    def __getstate__(self):
+        '''Drop the lock when the cache is sent to a worker process.'''
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        '''Recreate the lock when the cache is received by a worker process.'''
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def key(_, source_bytes: bytes, signature: str):
+        '''
+        Build the cache key of a conversion.
+        :param: source_bytes, the encoded bytes of the source image.
+        :param: signature, a string identifying the conversion and all parameters affecting its output.
+        :return: the hexadecimal SHA-256 digest of the source bytes and the signature.
+        '''
+        digest = hashlib.sha256(source_bytes)
+        digest.update(b'\0')
+        digest.update(signature.encode('utf-8'))
+        return digest.hexdigest()
+
+    def fetch(self, key: str, destination: str):
+        '''
+        Copy a cached result to the given destination, if present.\n
+        Does not update the hit and miss counters, see record_hit and store.
+        :param: key, the cache key.
+        :param: destination, the path to copy the cached result to. Its extension selects the entry.
+        :return: True if the result was cached and copied, False otherwise.
+        '''
+        try:
+            shutil.copyfile(self._path(key, destination), destination)
+        except OSError:
+            return False
+        return True
+
+    def record_hit(self, key: str, destination: str):
+        '''
+        Count a cache hit and mark the entry as most recently used.
+        :param: key, the cache key.
+        :param: destination, the path the result was copied to.
+        '''
+        with self._lock:
+            self.hits += 1
+            try:
+                os.utime(self._path(key, destination))
+            except OSError:
+                pass
+
+    def store(self, key: str, source: str):
+        '''
+        Count a cache miss and store a freshly converted result, evicting old entries if needed.
+        :param: key, the cache key.
+        :param: source, the path of the converted image to cache.
+        '''
+        path = self._path(key, source)
+        temporary_path = f'{path}.{threading.get_ident()}{self._TEMPORARY_SUFFIX}'
+        with self._lock:
+            self.misses += 1
+            if os.path.isfile(path):
+                return
+
+            shutil.copyfile(source, temporary_path)
+            os.replace(temporary_path, path)
+            self._size += os.path.getsize(path)
+            if self._size > self.max_size:
+                self._evict()
+
+    def statistics(self):
+        '''
+        :return: a dictionary with the hits, misses, number of entries and total size of the cache.
+        '''
+        with self._lock:
+            entries = list(self._entries())
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(entries),
+                'size': sum(entry.stat().st_size for entry in entries)
+            }
+
+    def _evict(self):
+        '''PRIVATE METHOD: remove the least recently used entries until the cache fits its size limit.'''
+        entries = sorted(self._entries(), key=lambda entry: entry.stat().st_mtime)
+        self._size = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if self._size <= self.max_size:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self._size -= size
+            except OSError:
+                pass
+
+    def _entries(self):
+        '''PRIVATE METHOD: iterate over the directory entries of all cached results.'''
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and not entry.name.endswith(self._TEMPORARY_SUFFIX):
+                    yield entry
+
+    def _path(self, key: str, output_path: str):
+        '''PRIVATE METHOD: the path of a cache entry, using the extension of the output file.'''
+        return os.path.join(self.directory, key + os.path.splitext(output_path)[1])
@@ -0,0 +1,141 @@
+import io
+import importlib.util
+import cv2 as cv
+
+FORMAT_JPEG = 'jpeg'
+FORMAT_PNG = 'png'
+FORMAT_PNG_BILEVEL = 'png-bilevel'
+FORMAT_TIFF_G4 = 'tiff-g4'
+FORMAT_WEBP_LOSSLESS = 'webp-lossless'
+OUTPUT_FORMATS = [FORMAT_JPEG, FORMAT_PNG, FORMAT_PNG_BILEVEL, FORMAT_TIFF_G4, FORMAT_WEBP_LOSSLESS]
+
+_ALIASES = { 'jpg': FORMAT_JPEG, 'webp': FORMAT_WEBP_LOSSLESS, 'tiff': FORMAT_TIFF_G4, 'tif': FORMAT_TIFF_G4 }
+# name: (extension, mimetype, default level, valid level range)
+_FORMATS = {
+    FORMAT_JPEG: ('.jpg', 'image/jpeg', 95, range(0, 101)),
+    FORMAT_PNG: ('.png', 'image/png', 3, range(0, 10)),
+    FORMAT_PNG_BILEVEL: ('.png', 'image/png', 9, range(0, 10)),
+    FORMAT_TIFF_G4: ('.tif', 'image/tiff', None, None),
+    FORMAT_WEBP_LOSSLESS: ('.webp', 'image/webp', None, None)
+}
+
+
+class OutputFormat:
+    '''
+    How converted images are encoded: the file format and its quality or compression level.\n
+    Bilevel formats store one bit per pixel, which suits the black-and-white paintable conversion. Pixels above
+    127 become white and all others black, so they are lossy for grayscale conversions.
+    '''
+
+    def __init__(self, name: str=FORMAT_JPEG, level: int=None):
+        '''
+        Initialise an output format.
+        :param: name (optional), the name of the format. Options: 'jpeg' (default), 'png', 'png-bilevel', 'tiff-g4' or 'webp-lossless'
+        :param: level (optional), the JPEG quality (0-100, default 95) or PNG compression level (0-9, default 3,
+        or 9 for bilevel PNG). Not supported by the other formats.
+        '''
+        name = _ALIASES.get(name.lower(), name.lower())
+        if name not in _FORMATS:
+            raise ValueError(f'Unknown output format: {name}. Options: {OUTPUT_FORMATS}')
+
+        self.name = name
+        self.ext, self.mimetype, default_level, valid_levels = _FORMATS[name]
+        if level is not None and valid_levels is None:
+            raise ValueError(f'The {name} output format has no quality or compression level')
+        if level is not None and level not in valid_levels:
+            raise ValueError(f'The level of the {name} output format must be between {valid_levels.start} and {valid_levels.stop - 1}')
+        self.level = default_level if level is None else level
+
+        if name == FORMAT_TIFF_G4 and importlib.util.find_spec('PIL') is None:
+            raise ValueError('The tiff-g4 output format requires the Pillow package: pip install pillow')
+
+    @classmethod
+    def parse(cls, specification):
+        '''
+        Parse an output format from a string like 'png:9', 'jpeg:85' or 'tiff-g4'.
+        :param: specification, the format name optionally followed by ':' and its level, or an OutputFormat.
+        :return: an OutputFormat
+        '''
+        if isinstance(specification, OutputFormat):
+            return specification
+
+        name, _, level = specification.partition(':')
+        if level == '':
+            return cls(name)
+        try:
+            level = int(level)
+        except ValueError:
+            raise ValueError(f'The level of an output format must be a whole number: {specification}')
+        return cls(name, level)
+
+    @property
+    def specification(self):
+        '''
+        The format as a string that parse accepts, like 'png:9'. It changes whenever the encoded output would change,
+        so it is also used to key cached results.
+        '''
+        return self.name if self.level is None else f'{self.name}:{self.level}'
+
+    def params(self):
+        '''
+        :return: the cv2.imencode parameters of the format.
+        '''
+        if self.name == FORMAT_JPEG:
+            return [cv.IMWRITE_JPEG_QUALITY, self.level]
+        if self.name == FORMAT_PNG:
+            return [cv.IMWRITE_PNG_COMPRESSION, self.level]
+        if self.name == FORMAT_PNG_BILEVEL:
+            return [cv.IMWRITE_PNG_BILEVEL, 1, cv.IMWRITE_PNG_COMPRESSION, self.level]
+        if self.name == FORMAT_WEBP_LOSSLESS:
+            return [cv.IMWRITE_WEBP_QUALITY, 101] # Qualities above 100 select lossless compression
+        return []
+
+    def encode(self, image):
+        '''
+        Encode an image.
+        :param: image, a cv2 image.
+        :return: the encoded bytes, or None if the image could not be encoded.
+        '''
+        try:
+            if self.name == FORMAT_TIFF_G4:
+                return _encode_tiff_g4(image)
+            if self.name == FORMAT_PNG_BILEVEL:
+                image = _threshold_bilevel(image)
+            encoded, buffer = cv.imencode(self.ext, image, self.params())
+        except (cv.error, OSError):
+            return None
+        return buffer.tobytes() if encoded else None
+
+    def __eq__(self, other):
+        return isinstance(other, OutputFormat) and self.specification == other.specification
+
+    def __hash__(self):
+        return hash(self.specification)
+
+    def __repr__(self):
+        return f'OutputFormat({self.specification})'
+
+
+def _encode_tiff_g4(image):
+    '''
+    PRIVATE FUNCTION: encode an image as a bilevel TIFF with CCITT Group 4 compression.\n
+    OpenCV only writes 8-bit TIFF, so the optional Pillow package is used.
+    :param: image, a cv2 image.
+    :return: the encoded bytes.
+    '''
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.fromarray(_threshold_bilevel(image) > 0).save(buffer, format='TIFF', compression='group4')
+    return buffer.getvalue()
+
+
+def _threshold_bilevel(image):
+    '''
+    PRIVATE FUNCTION: reduce an image to black and white, where pixels above 127 become white.
+    :param: image, a cv2 image.
+    :return: a grayscale image containing only 0 and 255.
+    '''
+    if image.ndim == 3:
+        image = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
+    return cv.threshold(image, 127, 255, cv.THRESH_BINARY)[1]
@@ -0,0 +1,94 @@
+import cv2 as cv
+
+from PIC.converter.metrics import stage
+
+REFERENCE_DIMENSION = 1024
+
+
+class FastPaintableFilter:
+    '''
+    A faster paintable contours filter chain, trading some accuracy for speed.\n
+    Instead of a median blur and a Gaussian adaptive threshold, it uses a box blur and a mean adaptive threshold.
+    Both are box filters computed with running sums, so they cost the same per pixel regardless of their size.
+    Their sizes scale with the resolution, so large scans look like smaller images instead of losing most of
+    their lines. Images can be downscaled before thresholding, and the binary result is scaled back up.
+    '''
+
+    def __init__(self, scale: float=1.0, block_size: int=9, constant: int=3, reference_dimension: int=REFERENCE_DIMENSION):
+        '''
+        Initialise the filter chain.
+        :param: scale (optional), the factor to downscale images by before thresholding, between 0 (exclusive) and 1.
+        Default: 1, no downscaling.
+        :param: block_size (optional), the size of the threshold neighbourhood for images of reference_dimension pixels.
+        Default: 9, like the standard paintable filter.
+        :param: constant (optional), the amount a pixel must be darker than its neighbourhood to become black. Default: 3
+        :param: reference_dimension (optional), the largest dimension at which block_size applies unscaled. Default: 1024
+        '''
+        if not 0 < scale <= 1:
+            raise ValueError(f'The downscale factor must be above 0 and at most 1, not {scale}')
+        if block_size < 3:
+            raise ValueError(f'The block size must be at least 3, not {block_size}')
+
+        self.scale = scale
+        self.block_size = block_size
+        self.constant = constant
+        self.reference_dimension = reference_dimension
+
+    def kernel_sizes(self, dimension: int):
+        '''
+        Scale the blur and threshold neighbourhoods to the resolution of an image.
+        :param: dimension, the largest dimension of the image being thresholded, after downscaling.
+        :return: a (blur_size, block_size) tuple of odd sizes of at least 3.
+        '''
+        factor = dimension / self.reference_dimension
+        return _odd_size(3 * factor), _odd_size(self.block_size * factor)
+
+    def __call__(self, image):
+        '''
+        Apply the filter chain to an image.
+        :param: image, a cv2 image in BGR colour scheme.
+        :return: the thresholded, black-and-white image, the same size as image.
+        '''
+        height, width = image.shape[:2]
+        with stage('grayscale'):
+            grayscale = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
+
+        if self.scale < 1:
+            with stage('resize'):
+                size = (max(1, round(width * self.scale)), max(1, round(height * self.scale)))
+                grayscale = cv.resize(grayscale, size, interpolation=cv.INTER_AREA)
+
+        blur_size, block_size = self.kernel_sizes(max(grayscale.shape))
+        with stage('blur'):
+            blurred = cv.blur(grayscale, (blur_size, blur_size))
+        with stage('threshold'):
+            thresholded = cv.adaptiveThreshold(blurred, 255, cv.ADAPTIVE_THRESH_MEAN_C, cv.THRESH_BINARY, block_size, self.constant)
+
+        if self.scale < 1:
+            # Interpolating and thresholding again gives smoother lines than nearest neighbour scaling
+            with stage('resize'):
+                thresholded = cv.resize(thresholded, (width, height), interpolation=cv.INTER_LINEAR)
+                cv.threshold(thresholded, 127, 255, cv.THRESH_BINARY, dst=thresholded)
+        return thresholded
+
+    @property
+    def signature(self):
+        '''
+        A string that changes whenever the output of the filter chain would change, used to key cached results.
+        '''
+        return f'paintable-fast:scale={self.scale}:block_size={self.block_size}@{self.reference_dimension}:constant={self.constant}'
+
+    def __eq__(self, other):
+        return isinstance(other, FastPaintableFilter) and self.signature == other.signature
+
+    def __hash__(self):
+        return hash(self.signature)
+
+    def __repr__(self):
+        return f'FastPaintableFilter(scale={self.scale}, block_size={self.block_size}, constant={self.constant})'
+
+
+def _odd_size(size: float):
+    '''PRIVATE FUNCTION: round a kernel size to the nearest odd size of at least 3.'''
+    size = max(3, int(round(size)))
+    return size if size % 2 == 1 else size + 1
@@ -0,0 +1,79 @@
+import io
+import struct
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+_JPEG_START_OF_IMAGE = b'\xff\xd8'
+# Start of frame markers, excluding DHT (0xC4), JPG (0xC8) and DAC (0xCC) which share the range.
+_JPEG_START_OF_FRAME = { 0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF }
+# Markers without a length field.
+_JPEG_STANDALONE = { 0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8 }
+
+
+def read_image_dimensions(source):
+    '''
+    Read the width and height of a JPEG or PNG image from its header, without decoding it.
+    :param: source, the path of the image, its encoded bytes or a binary file object.
+    :return: a (width, height) tuple, or None if the format is not supported or the header is invalid.
+    '''
+    if isinstance(source, str):
+        with open(source, 'rb') as image_file:
+            return _read_dimensions(image_file)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return _read_dimensions(io.BytesIO(source))
+    return _read_dimensions(source)
+
+
+def _read_dimensions(image_file):
+    '''PRIVATE FUNCTION: read the dimensions from a binary file object positioned at the start of the image.'''
+    signature = image_file.read(8)
+    if signature == _PNG_SIGNATURE:
+        return _read_png_dimensions(image_file)
+    if signature[:2] == _JPEG_START_OF_IMAGE:
+        image_file.seek(-6, io.SEEK_CUR)
+        return _read_jpeg_dimensions(image_file)
+    return None
+
+
+def _read_png_dimensions(image_file):
+    '''PRIVATE FUNCTION: read the dimensions from the IHDR chunk that directly follows the PNG signature.'''
+    chunk = image_file.read(16)
+    if len(chunk) < 16 or chunk[4:8] != b'IHDR':
+        return None
+    width, height = struct.unpack('>II', chunk[8:16])
+    return width, height
+
+
+def _read_jpeg_dimensions(image_file):
+    '''PRIVATE FUNCTION: walk the JPEG segments up to the first start of frame marker.'''
+    while True:
+        byte = image_file.read(1)
+        if len(byte) == 0:
+            return None
+        if byte != b'\xff':
+            continue
+
+        marker = image_file.read(1)
+        while marker == b'\xff':
+            marker = image_file.read(1)
+        if len(marker) == 0:
+            return None
+
+        marker = marker[0]
+        if marker in _JPEG_STANDALONE or marker == 0x00:
+            continue
+
+        length_bytes = image_file.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0]
+
+        if marker in _JPEG_START_OF_FRAME:
+            frame = image_file.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack('>HH', frame[1:5])
+            return width, height
+
+        if marker == 0xD9 or marker == 0xDA: # End of image or start of scan before any frame
+            return None
+        image_file.seek(length - 2, io.SEEK_CUR)
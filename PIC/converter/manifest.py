@@ -0,0 +1,111 @@
+import os
+import json
+import tempfile
+import threading
+
+MANIFEST_FILE_NAME = '.pic-manifest.json'
+_MANIFEST_VERSION = 1
+
+
+class Manifest:
+    '''
+    A persisted record of the source files that were already processed, keyed by their path relative to the
+    source directory. A file counts as processed as long as its size and modification time are unchanged.
+    '''
+
+    def __init__(self, path: str):
+        '''
+        Initialise the manifest and load it from disk if it exists.
+        :param: path, the JSON file the manifest is persisted to.
+        '''
+        self.path = path
+        self._files = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        '''Load the manifest from disk. A missing or unreadable manifest is treated as empty.'''
+        try:
+            with open(self.path, 'r') as manifest_file:
+                data = json.load(manifest_file)
+        except (OSError, ValueError):
+            data = None
+
+        with self._lock:
+            self._files = {}
+            if isinstance(data, dict) and data.get('version') == _MANIFEST_VERSION:
+                self._files = { name: tuple(entry) for name, entry in data.get('files', {}).items() }
+            self._dirty = False
+
+    def save(self):
+        '''Write the manifest to disk if it changed. The file is replaced atomically, so a crash never leaves it truncated.'''
+        with self._lock:
+            if not self._dirty:
+                return
+            data = { 'version': _MANIFEST_VERSION, 'files': { name: list(entry) for name, entry in self._files.items() } }
+            self._dirty = False
+
+        directory = os.path.dirname(os.path.realpath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(dir=directory, prefix='.manifest-', suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'w') as manifest_file:
+                json.dump(data, manifest_file)
+            os.replace(temporary_path, self.path)
+        except OSError:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+
+    def is_processed(self, name: str, size: int, mtime: int):
+        '''
+        Check whether a file was processed in its current state.
+        :param: name, the path of the file relative to the source directory.
+        :param: size, the current size of the file in bytes.
+        :param: mtime, the current modification time of the file in nanoseconds.
+        :return: True if the file was processed with the same size and modification time, False otherwise.
+        '''
+        entry = self._files.get(name)
+        return entry is not None and entry[0] == size and entry[1] == mtime
+
+    def record(self, name: str, size: int, mtime: int, error: str=None):
+        '''
+        Record a processed file.
+        :param: name, the path of the file relative to the source directory.
+        :param: size, the size of the file in bytes when it was processed.
+        :param: mtime, the modification time of the file in nanoseconds when it was processed.
+        :param: error (optional), the reason the file failed to convert. Failed files are not retried until they change.
+        '''
+        with self._lock:
+            self._files[name] = (size, mtime, error)
+            self._dirty = True
+
+    def remove(self, name: str):
+        '''
+        Forget a file, so it is processed again the next time it is seen.
+        :param: name, the path of the file relative to the source directory.
+        '''
+        with self._lock:
+            if self._files.pop(name, None) is not None:
+                self._dirty = True
+
+    def names(self):
+        '''
+        :return: a list of the names of all recorded files.
+        '''
+        with self._lock:
+            return list(self._files)
+
+    def failed(self):
+        '''
+        :return: a list of (name, reason) tuples of the files that failed to convert.
+        '''
+        with self._lock:
+            return [ (name, entry[2]) for name, entry in self._files.items() if entry[2] is not None ]
+
+    def __len__(self):
+        return len(self._files)
+
+    def __contains__(self, name: str):
+        return name in self._files
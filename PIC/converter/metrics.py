@@ -0,0 +1,231 @@
+import time
+import bisect
+import threading
+
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_thread_local = threading.local()
+
+
+class Metrics:
+    '''
+    Counters and per-stage latency histograms of the Python Image Converter.\n
+    When disabled, recording is a no-op, so instrumented code can call it unconditionally.
+    '''
+
+    def __init__(self, enabled: bool=True, buckets: tuple=DEFAULT_LATENCY_BUCKETS):
+        '''
+        Initialise empty metrics.
+        :param: enabled (optional), a flag indicating whether to record anything. Default: True
+        :param: buckets (optional), the upper bounds in seconds of the latency histogram buckets.
+        '''
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, amount: float=1):
+        '''
+        Increase a counter.
+        :param: name, the name of the counter.
+        :param: amount (optional), the amount to increase it by. Default: 1
+        '''
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe(self, stage: str, seconds: float):
+        '''
+        Record the duration of a stage.
+        :param: stage, the name of the stage.
+        :param: seconds, the duration in seconds.
+        '''
+        if not self.enabled:
+            return
+        with self._lock:
+            self._observe(stage, seconds)
+
+    def observe_stages(self, stage_times: dict):
+        '''
+        Record the durations of several stages, as collected by recording.
+        :param: stage_times, a dictionary of stage name to duration in seconds.
+        '''
+        if not self.enabled or not stage_times:
+            return
+        with self._lock:
+            for stage, seconds in stage_times.items():
+                self._observe(stage, seconds)
+
+    def timer(self, stage: str):
+        '''
+        Time a block of code as a stage.
+        :param: stage, the name of the stage.
+        :return: a context manager recording the duration of its block.
+        '''
+        if not self.enabled:
+            return _NULL_TIMER
+        return _MetricsTimer(self, stage)
+
+    def summary(self):
+        '''
+        :return: a JSON-serialisable dictionary with all counters and, per stage, the count, total, mean, minimum
+        and maximum duration and the histogram buckets.
+        '''
+        with self._lock:
+            stages = {}
+            for stage, histogram in self._histograms.items():
+                stages[stage] = {
+                    'count': histogram.count,
+                    'total_s': histogram.total,
+                    'mean_s': histogram.total / histogram.count if histogram.count > 0 else 0,
+                    'min_s': histogram.minimum,
+                    'max_s': histogram.maximum,
+                    'buckets': { str(bound): count for bound, count in zip(self.buckets + ('+Inf',), histogram.cumulative()) }
+                }
+            return { 'counters': dict(self._counters), 'stages': stages }
+
+    def to_prometheus(self, prefix: str='pic'):
+        '''
+        Render the metrics in the Prometheus text exposition format.
+        :param: prefix (optional), the prefix of all metric names. Default: 'pic'
+        :return: the exposition text.
+        '''
+        lines = []
+        with self._lock:
+            for name, value in sorted(self._counters.items()):
+                metric = f'{prefix}_{name}_total'
+                lines.append(f'# TYPE {metric} counter')
+                lines.append(f'{metric} {value}')
+
+            metric = f'{prefix}_stage_duration_seconds'
+            lines.append(f'# TYPE {metric} histogram')
+            for stage, histogram in sorted(self._histograms.items()):
+                for bound, count in zip(self.buckets + ('+Inf',), histogram.cumulative()):
+                    lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'{metric}_sum{{stage="{stage}"}} {histogram.total}')
+                lines.append(f'{metric}_count{{stage="{stage}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        '''Remove all recorded values.'''
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+
+    def _observe(self, stage: str, seconds: float):
+        '''PRIVATE METHOD: record a duration, the lock must be held.'''
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            histogram = _Histogram(len(self.buckets))
+            self._histograms[stage] = histogram
+        histogram.add(bisect.bisect_left(self.buckets, seconds), seconds)
+
+
+class _Histogram:
+    '''PRIVATE CLASS: the bucket counts and totals of a single latency histogram.'''
+
+    def __init__(self, number_of_buckets: int):
+        self.counts = [0] * (number_of_buckets + 1)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def add(self, bucket: int, seconds: float):
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        self.minimum = seconds if self.minimum is None else min(self.minimum, seconds)
+        self.maximum = seconds if self.maximum is None else max(self.maximum, seconds)
+
+    def cumulative(self):
+        total = 0
+        for count in self.counts:
+            total += count
+            yield total
+
+
+class _MetricsTimer:
+    '''PRIVATE CLASS: records the duration of a block to a Metrics instance.'''
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics: Metrics, stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _StageTimer:
+    '''PRIVATE CLASS: adds the duration of a block to the stage times of the current thread.'''
+    __slots__ = ('stage_times', 'stage', 'start')
+
+    def __init__(self, stage_times: dict, stage: str):
+        self.stage_times = stage_times
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        self.stage_times[self.stage] = self.stage_times.get(self.stage, 0.0) + time.perf_counter() - self.start
+        return False
+
+
+class _NullTimer:
+    '''PRIVATE CLASS: a timer that records nothing.'''
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class recording:
+    '''
+    Collect the durations of all stages timed with stage() in the current thread into a dictionary.\n
+    Stage times are plain dictionaries, so they can be returned from worker processes and merged
+    into a Metrics instance with Metrics.observe_stages.
+    '''
+    __slots__ = ('stage_times', 'previous')
+
+    def __init__(self, stage_times: dict):
+        '''
+        :param: stage_times, the dictionary to add durations to, or None to record nothing.
+        '''
+        self.stage_times = stage_times
+
+    def __enter__(self):
+        self.previous = getattr(_thread_local, 'stage_times', None)
+        _thread_local.stage_times = self.stage_times
+        return self.stage_times
+
+    def __exit__(self, *_):
+        _thread_local.stage_times = self.previous
+        return False
+
+
+def stage(name: str):
+    '''
+    Time a block of code as a stage, if the current thread is recording.
+    :param: name, the name of the stage.
+    :return: a context manager.
+    '''
+    stage_times = getattr(_thread_local, 'stage_times', None)
+    if stage_times is None:
+        return _NULL_TIMER
+    return _StageTimer(stage_times, name)
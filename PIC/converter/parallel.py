@@ -0,0 +1,95 @@
+import os
+import cv2 as cv
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+
+EXECUTION_SERIAL = 'serial'
+EXECUTION_THREAD = 'thread'
+EXECUTION_PROCESS = 'process'
+EXECUTION_PIPELINE = 'pipeline'
+EXECUTION_MODES = [EXECUTION_SERIAL, EXECUTION_THREAD, EXECUTION_PROCESS, EXECUTION_PIPELINE]
+
+
+def default_worker_count():
+    '''
+    The default number of workers to use for parallel execution.
+    :return: the number of CPUs available to this process, or 1 if it cannot be determined.
+    '''
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _initialise_process_worker():
+    '''PRIVATE FUNCTION: limit OpenCV to a single thread per worker process to avoid oversubscription.'''
+    cv.setNumThreads(1)
+
+
+def create_executor(execution_mode: str=EXECUTION_THREAD, workers: int=None):
+    '''
+    Create a pool of workers that can be reused across batches.
+    :param: execution_mode (optional), either EXECUTION_THREAD (default) or EXECUTION_PROCESS.
+    :param: workers (optional), the number of workers in the pool. Default: the number of available CPUs.
+    :return: a concurrent.futures executor. The caller is responsible for shutting it down.
+    '''
+    if workers is None:
+        workers = default_worker_count()
+
+    if execution_mode == EXECUTION_PROCESS:
+        return ProcessPoolExecutor(max_workers=workers, initializer=_initialise_process_worker)
+    elif execution_mode == EXECUTION_THREAD:
+        return ThreadPoolExecutor(max_workers=workers)
+    else:
+        raise ValueError(f'Unsupported execution mode for a worker pool: {execution_mode}')
+
+
+def run_tasks(task, items, execution_mode: str=EXECUTION_THREAD, workers: int=None, executor=None, max_pending: int=None):
+    '''
+    Run a task for every item on a pool of workers.
+    :param: task, the callable to run. It must be a module level function when using processes.
+    :param: items, the arguments to pass to the task, one per call.
+    :param: execution_mode (optional), either EXECUTION_THREAD (default) or EXECUTION_PROCESS.
+    :param: workers (optional), the number of workers in the pool. Default: the number of available CPUs.
+    :param: executor (optional), an existing pool to run the tasks on instead of creating a new one.
+    It is left running when all tasks are done.
+    :param: max_pending (optional), the maximum number of submitted tasks that have not completed yet. Items are
+    taken from items lazily, so generators are consumed as the workers keep up. Default: submit all items at once.
+    :return: a generator of (item, result, error) tuples in order of completion, where error is None
+    when the task succeeded.
+    '''
+    if executor is None:
+        with create_executor(execution_mode, workers) as owned_executor:
+            yield from _run_on_executor(owned_executor, task, items, max_pending)
+    else:
+        yield from _run_on_executor(executor, task, items, max_pending)
+
+
+def _run_on_executor(executor, task, items, max_pending: int=None):
+    '''PRIVATE FUNCTION: submit a task for every item and yield (item, result, error) tuples as they complete.'''
+    if max_pending is None:
+        futures = { executor.submit(task, item): item for item in items }
+        for future in as_completed(futures):
+            yield _outcome(futures[future], future)
+        return
+
+    items = iter(items)
+    futures = {}
+    while True:
+        for item in items:
+            futures[executor.submit(task, item)] = item
+            if len(futures) >= max_pending:
+                break
+        if len(futures) == 0:
+            return
+
+        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield _outcome(futures.pop(future), future)
+
+
+def _outcome(item, future):
+    '''PRIVATE FUNCTION: the (item, result, error) tuple of a completed future.'''
+    try:
+        return item, future.result(), None
+    except Exception as error:
+        return item, None, error
@@ -3,17 +3,54 @@ import cv2 as cv
 import numpy as np
 import datetime as dt
 import logging
+import functools
+import itertools
+from collections import namedtuple
+
+from PIC.converter.parallel import EXECUTION_SERIAL, EXECUTION_PIPELINE, EXECUTION_MODES, run_tasks, default_worker_count
+from PIC.converter.pipeline import run_pipeline
+from PIC.converter.cache import ResultCache
+from PIC.converter.tiles import apply_in_strips
+from PIC.converter.buffers import thread_buffer_pool
+from PIC.converter.headers import read_image_dimensions
+from PIC.converter.metrics import Metrics, recording, stage
+from PIC.converter.manifest import Manifest
+from PIC.converter.scanner import scan_files
+from PIC.converter.encoders import OutputFormat, OUTPUT_FORMATS
+from PIC.converter.video import VIDEO_TYPES, VIDEO_EXTENSION, VideoOptions, open_video, frame_rate, read_frame_batches
+from PIC.converter.video import VideoFileWriter, FrameSequenceWriter
+from PIC.converter.fast_paintable import FastPaintableFilter
+from PIC.converter.profiles import ConversionProfile, DEFAULT_PROFILE, get_profile
+from PIC.converter.batch import stack_images, apply_in_chunks, padded_stack, fill_padding, flatten, images_of, unpad, MAX_PIXELS_PER_CALL
+
+ConversionTask = namedtuple('ConversionTask', ['image_filter', 'source_path', 'output_path', 'cache', 'signature', 'preview_size', 'collect_metrics', 'output_format', 'video'])
+ConversionTask.__doc__ = '''The conversion of a single image or video from source_path to output_path, as run by the worker pools.'''
 
 class PIC:
     '''Python Image Converter: Responsible for loading, converting and saving images from source to target.'''
     ACCEPTABLE_IMAGE_TYPES = ['jpg', 'png', 'jpeg']
+    ACCEPTABLE_VIDEO_TYPES = VIDEO_TYPES
     BASE_SOURCE_DIR = './images/'
     BASE_TARGET_DIR = './converted_images/'
+    PREVIEW_PREFIX = 'preview'
+    CONVERSION_PAINTABLE = 'paintable'
+    CONVERSION_LAPLACIAN = 'laplacian'
+    CONVERSION_PAINTABLE_FAST = 'paintable-fast'
+    CONVERSIONS = [CONVERSION_PAINTABLE, CONVERSION_LAPLACIAN, CONVERSION_PAINTABLE_FAST]
+    ALGORITHM_STANDARD = 'standard'
+    ALGORITHM_FAST = 'fast'
+    ALGORITHMS = [ALGORITHM_STANDARD, ALGORITHM_FAST]
     _TIMESTAMP_FORMAT = '%B_%d_%Y-%H_%M_%S'
+    _ORGANISED_DIRECTORY_FORMAT = '%B %d %Y %H %M %S'
+    _MANIFEST_SAVE_INTERVAL = 1000 # Save the manifest after this many images, so an interrupted run keeps its progress
 
     def __init__(self, logger=None, path_to_images: str=BASE_SOURCE_DIR, target: str=BASE_TARGET_DIR, 
         delete_source_file_when_complete: bool=True, organise_source_files_when_complete: bool=False,
-        auto_cleanup: bool=False):
+        auto_cleanup: bool=False, execution_mode: str=EXECUTION_SERIAL, workers: int=None, queue_size: int=8,
+        cache: ResultCache=None, executor=None, progress_callback=None, tile_height: int=None,
+        preview_size: int=None, metrics: Metrics=None, recursive: bool=False, manifest: Manifest=None, output_format='jpeg',
+        batch_size: int=None, every_nth_frame: int=1, frame_sequence: bool=False, algorithm: str=ALGORITHM_STANDARD,
+        downscale: float=1.0, profile=DEFAULT_PROFILE):
         '''
         Initialise the Python Image Converter and validate source and target directories.
         :param: logger, the logger to use
@@ -23,6 +60,40 @@ class PIC:
         source files upon completion of conversion process.
         :param: organise_source_files_when_complete, a flag indicating whether to automatically sort source files 
         upon completion of the conversion process.
+        :param: auto_cleanup, a flag indicating whether to clean up the source directory after converting.
+        :param: execution_mode, how to run conversions. Options: 'serial' (default), 'thread', 'process' or 'pipeline'.
+        :param: workers, the number of workers to use for the 'thread', 'process' and 'pipeline' modes. Default: all CPUs.
+        :param: queue_size, the number of images buffered between the stages of the 'pipeline' mode. Default: 8
+        :param: cache, a ResultCache to serve previously converted images from. Default: no caching
+        :param: executor, an existing worker pool to use for the 'thread' and 'process' modes, see
+        parallel.create_executor. Default: a new pool is created for every conversion.
+        :param: progress_callback, a callable receiving (source_path, error) after every image, where error is
+        None if the image was converted successfully.
+        :param: tile_height, the number of rows to convert at a time. Limits the memory used by the filter chain
+        for very large images without changing the output. Default: convert the full frame at once.
+        :param: preview_size, convert previews no larger than this many pixels in either dimension instead of
+        full resolution images. JPEG images are decoded at a reduced scale. Default: full resolution.
+        :param: metrics, a Metrics instance to record stage timings and image, byte and failure counters to.
+        Default: no metrics are recorded.
+        :param: recursive, a flag indicating whether to also convert images in subdirectories of the source directory.
+        Images are discovered while converting, and the relative directory structure is preserved in the target directory.
+        :param: manifest, a Manifest of converted images. Images whose size and modification time are unchanged
+        since they were recorded are skipped. Default: convert all images.
+        :param: output_format, how to encode converted images, as an OutputFormat or a string like 'png:9'.
+        Options: 'jpeg[:quality]' (default), 'png[:compression]', 'png-bilevel[:compression]', 'tiff-g4' or 'webp-lossless'
+        :param: batch_size, convert up to this many images of the same resolution at once with the batch filter of the
+        conversion, see convert_batch. Resolutions are read from the image headers. Failed images are collected in
+        failed_images rather than aborting the batch, also in the 'serial' mode. Not supported by the 'pipeline' mode.
+        Default: convert images one at a time.
+        :param: every_nth_frame, convert only the first of every this many frames of videos and animated images. Default: 1
+        :param: frame_sequence, a flag indicating whether to save converted videos as a directory of numbered frames
+        in the output format instead of a VIDEO_EXTENSION video. Default: False
+        :param: algorithm, the paintable contours algorithm. Options: 'standard' (default) or 'fast', which uses
+        a mean threshold scaling with the resolution, see FastPaintableFilter.
+        :param: downscale, the factor to downscale images by before thresholding them with the fast algorithm,
+        between 0 (exclusive) and 1. Default: 1, no downscaling.
+        :param: profile, the kernel sizes and pre-scale of the standard filter chains, as a ConversionProfile or the name
+        of one. Options: 'fast', 'balanced' (default) or 'high-quality'. Profiles that scale images produce smaller outputs.
         '''
         self.path = path_to_images
         self.target = target
@@ -31,6 +102,28 @@ class PIC:
         self.auto_organise = organise_source_files_when_complete
         self.auto_cleanup = auto_cleanup
         self.logger = logger
+        self.execution_mode = execution_mode
+        self.workers = workers
+        self.queue_size = queue_size
+        self.cache = cache
+        self.executor = executor
+        self.progress_callback = progress_callback
+        self.tile_height = tile_height
+        self.preview_size = preview_size
+        self.metrics = metrics if metrics is not None else Metrics(enabled=False)
+        self.recursive = recursive
+        self.manifest = manifest
+        self.output_format = output_format
+        self.batch_size = batch_size
+        self.video_options = VideoOptions(every_nth_frame, frame_sequence, batch_size or 1)
+        self.algorithm = algorithm
+        self.downscale = downscale
+        self.profile = profile
+        self.failed_images = []
+        self.skipped_images = 0
+        self._scanned_images = {}
+        self._unsaved_manifest_records = 0
+        self._converted_files = []
 
         self.log(self.path, logging.INFO)
         self.log(self.target, logging.INFO)
@@ -38,6 +131,33 @@ class PIC:
         if self.auto_delete == self.auto_organise and self.auto_delete:
             raise ConflictingCompletionActionsError('Please set at least one of either delete_source_file_when_complete or organise_source_files_when_complete to False')
 
+        if self.execution_mode not in EXECUTION_MODES:
+            raise InvalidExecutionModeError(f'Unknown execution mode: {self.execution_mode}. Options: {EXECUTION_MODES}')
+
+        if self.batch_size is not None and self.execution_mode == EXECUTION_PIPELINE:
+            raise InvalidExecutionModeError('The pipeline execution mode cannot convert images in batches')
+        if self.batch_size is not None and self.batch_size < 1:
+            raise InvalidBatchError(f'The batch size must be at least 1, not {self.batch_size}')
+        if every_nth_frame < 1:
+            raise InvalidVideoOptionsError(f'Every nth frame must be at least 1, not {every_nth_frame}')
+        if self.algorithm not in PIC.ALGORITHMS:
+            raise UnknownConversionError(f'Unknown paintable algorithm: {self.algorithm}. Options: {PIC.ALGORITHMS}')
+        if not 0 < self.downscale <= 1:
+            raise UnknownConversionError(f'The downscale factor must be above 0 and at most 1, not {self.downscale}')
+        if self.algorithm == PIC.ALGORITHM_FAST and self.tile_height is not None:
+            raise UnknownConversionError('The fast paintable algorithm scales with the resolution of the full image, it cannot be converted in tiles')
+
+        try:
+            self.output_format = OutputFormat.parse(self.output_format)
+        except ValueError as error:
+            raise InvalidOutputFormatError(str(error))
+
+        self.profile = PIC.parse_profile(self.profile)
+        if self.algorithm == PIC.ALGORITHM_FAST and self.profile != DEFAULT_PROFILE:
+            raise InvalidProfileError(f'The fast paintable algorithm has its own parameters, it cannot use the {self.profile.name} profile')
+        if self.profile.scale < 1 and self.tile_height is not None:
+            raise InvalidProfileError(f'The {self.profile.name} profile scales images, they cannot be converted in tiles')
+
         self._validate_source_and_target_directories()
 
     def convert_to_paintable(self):
@@ -45,49 +165,565 @@ class PIC:
         Convert an image to its black-and-white equivalent common to drawing books.\n
         Converted images will be saved to the target directory.
         '''
-        for root, file in self.image_paths:
-            image = self.read_image(os.path.join(root, file))
-            grayscale_image = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
-            median_blur = cv.medianBlur(grayscale_image, 5)
-            thresholded_image = self.apply_adaptive_thresholding(median_blur)
-            
-            timestamp = dt.datetime.now().strftime(self._TIMESTAMP_FORMAT)
-            self.save_image(thresholded_image, f'paintable-contours-{timestamp}-{file}')
-
-        if self.auto_cleanup:
-            self.clean_up()
+        self._convert_images(self.paintable_image_filter(), 'paintable-contours')
 
     def convert_to_laplacian(self):
         '''Convert an image to a chalk drawing.'''
-        for root, file in self.image_paths:
-            image = self.read_image(os.path.join(root, file))
-            grayscale = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
-            lap = cv.Laplacian(grayscale, cv.CV_64F, ksize=3)
-            lap = np.uint8(np.absolute(lap))
+        self._convert_images(PIC.conversion_filter(PIC.CONVERSION_LAPLACIAN, self.profile), 'chalk')
+
+    @classmethod
+    def paintable_filter(cls, image, profile: ConversionProfile=DEFAULT_PROFILE):
+        '''
+        Apply the paintable contours filter chain to an image.\n
+        Intermediate results are written to the reusable buffers of the current thread.
+        :param: image, a cv2 image in BGR colour scheme.
+        :param: profile (optional), the ConversionProfile with the kernel sizes and pre-scale. Default: 'balanced'
+        :return: the thresholded, black-and-white image, scaled by the profile.
+        '''
+        image = _prescale(image, profile)
+        buffers = thread_buffer_pool()
+        grayscale_image = buffers.get('grayscale', image.shape[:2])
+        median_blur = buffers.get('median_blur', image.shape[:2])
+
+        with stage('grayscale'):
+            cv.cvtColor(image, cv.COLOR_BGR2GRAY, dst=grayscale_image)
+        with stage('median_blur'):
+            cv.medianBlur(grayscale_image, profile.median_blur_size, dst=median_blur)
+        with stage('threshold'):
+            return cls.apply_adaptive_thresholding(median_blur, block_size=profile.threshold_block_size, constant=profile.threshold_constant)
+
+    @classmethod
+    def laplacian_filter(_, image, profile: ConversionProfile=DEFAULT_PROFILE):
+        '''
+        Apply the chalk drawing filter chain to an image.\n
+        Intermediate results are written to the reusable buffers of the current thread.
+        The Laplacian of a 3x3 kernel on 8-bit input fits in 16 bits, so it is computed as CV_16S
+        rather than CV_64F. Like the original CV_64F conversion, values above 255 wrap around.
+        :param: image, a cv2 image in BGR colour scheme.
+        :param: profile (optional), the ConversionProfile with the aperture size and pre-scale. Default: 'balanced'
+        :return: the absolute Laplacian of the grayscale image, scaled by the profile.
+        '''
+        image = _prescale(image, profile)
+        buffers = thread_buffer_pool()
+        grayscale = buffers.get('grayscale', image.shape[:2])
+        lap = buffers.get('laplacian', image.shape[:2], np.int16)
+
+        with stage('grayscale'):
+            cv.cvtColor(image, cv.COLOR_BGR2GRAY, dst=grayscale)
+        with stage('laplacian'):
+            cv.Laplacian(grayscale, cv.CV_16S, dst=lap, ksize=profile.laplacian_ksize)
+            np.absolute(lap, out=lap)
+
+            result = np.empty(image.shape[:2], dtype=np.uint8)
+            np.copyto(result, lap, casting='unsafe')
+        return result
+
+    @classmethod
+    def paintable_batch_filter(cls, stack, profile: ConversionProfile=DEFAULT_PROFILE):
+        '''
+        Apply the paintable contours filter chain to a stack of same-sized images at once.\n
+        Every stage filters the stack in a single OpenCV call per chunk of MAX_PIXELS_PER_CALL pixels, with the
+        images side by side. They are separated by padding columns that are refilled before every stage like OpenCV
+        extrapolates borders, so the result is identical to applying paintable_filter to every image. Images of
+        MAX_PIXELS_PER_CALL pixels or more gain nothing from batching and are filtered one at a time.
+        :param: stack, an N×H×W×3 stack of images in BGR colour scheme or an N×H×W stack of grayscale images.
+        :param: profile (optional), the ConversionProfile with the kernel sizes and pre-scale. Default: 'balanced'
+        :return: an N×H×W stack of the thresholded, black-and-white images, scaled by the profile.
+        '''
+        stack, profile = _prescale_stack(stack, profile)
+        # Every stage is padded by its own kernel radius, as padding columns are filtered too
+        median_halo, threshold_halo = profile.median_blur_size // 2, profile.threshold_block_size // 2
+        count, height, width = stack.shape[:3]
+        if width <= max(median_halo, threshold_halo) or height * width >= MAX_PIXELS_PER_CALL:
+            return _filter_each(functools.partial(cls.paintable_filter, profile=profile), stack)
+        if count * height * width > MAX_PIXELS_PER_CALL:
+            return apply_in_chunks(functools.partial(cls.paintable_batch_filter, profile=profile), MAX_PIXELS_PER_CALL, stack)
+
+        buffers = thread_buffer_pool()
+        median_shape = (height, count, width + 2 * median_halo)
+        threshold_shape = (height, count, width + 2 * threshold_halo)
+        grayscale = buffers.get('batch_grayscale', median_shape)
+        median_blur = buffers.get('batch_median_blur', median_shape)
+        median_blur_padded = buffers.get('batch_median_blur_padded', threshold_shape)
+        thresholded = buffers.get('batch_threshold', threshold_shape)
+
+        with stage('grayscale'):
+            _grayscale_stack(stack, median_halo, grayscale)
+        with stage('median_blur'):
+            fill_padding(grayscale, median_halo, cv.BORDER_REPLICATE)
+            cv.medianBlur(flatten(grayscale), profile.median_blur_size, dst=flatten(median_blur))
+        with stage('threshold'):
+            padded_stack(images_of(median_blur, median_halo), threshold_halo, median_blur_padded)
+            fill_padding(median_blur_padded, threshold_halo, cv.BORDER_REPLICATE)
+            cls.apply_adaptive_thresholding(flatten(median_blur_padded), block_size=profile.threshold_block_size,
+                constant=profile.threshold_constant, dst=flatten(thresholded))
+            return unpad(thresholded, threshold_halo)
+
+    @classmethod
+    def laplacian_batch_filter(cls, stack, profile: ConversionProfile=DEFAULT_PROFILE):
+        '''
+        Apply the chalk drawing filter chain to a stack of same-sized images at once.\n
+        Like paintable_batch_filter, the result is identical to applying laplacian_filter to every image.
+        :param: stack, an N×H×W×3 stack of images in BGR colour scheme or an N×H×W stack of grayscale images.
+        :param: profile (optional), the ConversionProfile with the aperture size and pre-scale. Default: 'balanced'
+        :return: an N×H×W stack of the absolute Laplacians of the grayscale images, scaled by the profile.
+        '''
+        stack, profile = _prescale_stack(stack, profile)
+        halo = 1 # Both apertures of a profile, 1 and 3, read one neighbouring pixel
+        count, height, width = stack.shape[:3]
+        if width <= halo or height * width >= MAX_PIXELS_PER_CALL:
+            return _filter_each(functools.partial(cls.laplacian_filter, profile=profile), stack)
+        if count * height * width > MAX_PIXELS_PER_CALL:
+            return apply_in_chunks(functools.partial(cls.laplacian_batch_filter, profile=profile), MAX_PIXELS_PER_CALL, stack)
 
-            timestamp = dt.datetime.now().strftime(self._TIMESTAMP_FORMAT)
-            self.save_image(lap, f'chalk-{timestamp}-{file}')
+        buffers = thread_buffer_pool()
+        padded_shape = (height, count, width + 2 * halo)
+        grayscale = buffers.get('batch_grayscale', padded_shape)
+        lap = buffers.get('batch_laplacian', padded_shape, np.int16)
+
+        with stage('grayscale'):
+            _grayscale_stack(stack, halo, grayscale)
+        with stage('laplacian'):
+            fill_padding(grayscale, halo, cv.BORDER_REFLECT_101)
+            cv.Laplacian(flatten(grayscale), cv.CV_16S, dst=flatten(lap), ksize=profile.laplacian_ksize)
+            np.absolute(lap, out=lap)
+
+            result = np.empty((count, height, width), dtype=np.uint8)
+            np.copyto(result, images_of(lap, halo), casting='unsafe')
+        return result
+
+    @classmethod
+    def batch_filter(cls, image_filter):
+        '''
+        Look up the batch equivalent of a filter chain.
+        :param: image_filter, the filter chain.
+        :return: a callable converting an N×H×W(×3) stack into an N×H×W stack. Filter chains without a batch
+        equivalent, like tiled ones, are applied to the images one at a time.
+        '''
+        chain, profile = _split_profile(image_filter)
+        if chain == PIC.paintable_filter:
+            return functools.partial(cls.paintable_batch_filter, profile=profile)
+        if chain == PIC.laplacian_filter:
+            return functools.partial(cls.laplacian_batch_filter, profile=profile)
+        return functools.partial(_filter_each, image_filter)
+
+    @classmethod
+    def convert_batch(cls, images, conversion: str=CONVERSION_PAINTABLE, profile=DEFAULT_PROFILE):
+        '''
+        Convert a batch of same-sized images at once, such as video frames or a scanner batch. For many small
+        images this avoids most of the per-call overhead of converting them one at a time.
+        :param: images, an N×H×W×3 stack of images in BGR colour scheme, an N×H×W stack of grayscale images,
+        or a list of images of the same shape.
+        :param: conversion (optional), the name of the conversion. Options: 'paintable' (default), 'laplacian' or 'paintable-fast'
+        :param: profile (optional), a ConversionProfile or the name of one, see PIC. Default: 'balanced'
+        :return: an N×H×W stack of the converted images.
+        '''
+        try:
+            stack = stack_images(images)
+        except ValueError as error:
+            raise InvalidBatchError(str(error))
+
+        return cls.batch_filter(cls.conversion_filter(conversion, cls.parse_profile(profile)))(stack)
+
+    def paintable_image_filter(self):
+        '''
+        :return: the filter chain of the configured paintable contours algorithm.
+        '''
+        if self.algorithm == PIC.ALGORITHM_FAST:
+            return FastPaintableFilter(self.downscale)
+        return PIC.conversion_filter(PIC.CONVERSION_PAINTABLE, self.profile)
+
+    @classmethod
+    def conversion_filter(cls, conversion: str, profile: ConversionProfile=DEFAULT_PROFILE):
+        '''
+        Look up the filter chain of a conversion by name.
+        :param: conversion, the name of the conversion. Options: 'paintable', 'laplacian' or 'paintable-fast'
+        :param: profile (optional), the ConversionProfile of the standard filter chains. 'paintable-fast' has its own
+        parameters. Default: 'balanced'
+        :return: the filter chain of the conversion.
+        '''
+        if conversion == cls.CONVERSION_PAINTABLE:
+            return _with_profile(cls.paintable_filter, profile)
+        if conversion == cls.CONVERSION_LAPLACIAN:
+            return _with_profile(cls.laplacian_filter, profile)
+        if conversion == cls.CONVERSION_PAINTABLE_FAST:
+            return FastPaintableFilter()
+        raise UnknownConversionError(f'Unknown conversion: {conversion}. Options: {cls.CONVERSIONS}')
+
+    @classmethod
+    def parse_profile(_, profile):
+        '''
+        :param: profile, a ConversionProfile or the name of one. Options: 'fast', 'balanced' or 'high-quality'
+        :return: the ConversionProfile.
+        '''
+        try:
+            return get_profile(profile)
+        except ValueError as error:
+            raise InvalidProfileError(str(error))
+
+    @classmethod
+    def convert_in_memory(cls, image, conversion: str=CONVERSION_PAINTABLE, output_format='jpeg', preview_size: int=None,
+        profile=DEFAULT_PROFILE):
+        '''
+        Convert an image without touching the filesystem.
+        :param: image, either the encoded image as bytes or a 1-dimensional numpy buffer,
+        or an already decoded cv2 image in BGR colour scheme.
+        :param: conversion (optional), the name of the conversion. Options: 'paintable' (default), 'laplacian' or 'paintable-fast'
+        :param: output_format (optional), how to encode the converted image, as an OutputFormat or a string like 'png:9'. Default: 'jpeg'
+        :param: preview_size (optional), convert a preview no larger than this many pixels in either dimension.
+        Default: convert at full resolution.
+        :param: profile (optional), a ConversionProfile or the name of one, see PIC. Default: 'balanced'
+        :return: the encoded bytes of the converted image.
+        '''
+        if not isinstance(image, np.ndarray) or image.ndim == 1:
+            with stage('decode'):
+                image = cls.decode_image(image, preview_size)
+        elif preview_size is not None:
+            image = cls.fit_image(image, preview_size)
+
+        converted_image = cls.conversion_filter(conversion, cls.parse_profile(profile))(image)
+        with stage('encode'):
+            return cls.encode_image(converted_image, output_format)
+
+    @classmethod
+    def decode_image(cls, data, max_dimension: int=None):
+        '''
+        Decode an image from memory.
+        :param: data, the encoded image as bytes or a 1-dimensional numpy buffer.
+        :param: max_dimension (optional), see read_image.
+        :return: a cv2 image in BGR colour scheme.
+        '''
+        buffer = data if isinstance(data, np.ndarray) else np.frombuffer(data, dtype=np.uint8)
+        image = None
+        if buffer.size > 0:
+            flag = cv.IMREAD_COLOR
+            if max_dimension is not None:
+                flag = cls.reduced_read_flag(read_image_dimensions(data if isinstance(data, bytes) else memoryview(buffer)), max_dimension)
+            image = cv.imdecode(buffer, flag)
+        if image is None:
+            raise ReadError('Could not decode image data')
+
+        return image if max_dimension is None else cls.fit_image(image, max_dimension)
+
+    @classmethod
+    def encode_image(_, image, output_format='jpeg'):
+        '''
+        Encode an image in memory.
+        :param: image, the cv2 image to encode.
+        :param: output_format (optional), an OutputFormat or a string like 'png:9'. Default: 'jpeg'
+        :return: the encoded bytes.
+        '''
+        try:
+            output_format = OutputFormat.parse(output_format)
+        except ValueError as error:
+            raise InvalidOutputFormatError(str(error))
+
+        encoded = output_format.encode(image)
+        if encoded is None:
+            raise SaveError(f'Could not encode image as {output_format.name}')
+
+        return encoded
+
+    def _convert_images(self, image_filter, prefix: str):
+        '''
+        PRIVATE METHOD: convert all loaded images using the configured execution mode.
+        :param: image_filter, the filter chain to apply to each image.
+        :param: prefix, the prefix of the output file names.
+        '''
+        self.failed_images = []
+        self._converted_files = []
+        try:
+            with self.metrics.timer('batch'):
+                if self.batch_size is not None:
+                    self._convert_images_in_batches(image_filter, prefix)
+                elif self.execution_mode == EXECUTION_SERIAL:
+                    for task in self._build_conversion_tasks(image_filter, prefix):
+                        try:
+                            result = _convert_image_task(task)
+                        except Exception as error:
+                            self.metrics.increment('images_failed')
+                            if self.manifest is not None:
+                                self._record_in_manifest(task, error)
+                            raise
+                        self._record_conversion_result(task, result, None)
+                elif self.execution_mode == EXECUTION_PIPELINE:
+                    self._convert_images_in_pipeline(image_filter, prefix)
+                else:
+                    self._convert_images_in_parallel(image_filter, prefix)
+        finally:
+            if self.manifest is not None:
+                self.manifest.save()
+
+        if self.skipped_images > 0:
+            self.log(f'Skipped {self.skipped_images} unchanged image(s)', logging.INFO)
+
+        if self.cache is not None:
+            statistics = self.cache.statistics()
+            self.log(f'Result cache: {statistics["hits"]} hit(s), {statistics["misses"]} miss(es), {statistics["entries"]} entries', logging.INFO)
 
         if self.auto_cleanup:
-            self.clean_up()
+            # Only converted images are cleaned up, so failed and skipped images stay in the source directory
+            self.clean_up(self._converted_files)
+
+    def _convert_images_in_parallel(self, image_filter, prefix: str):
+        '''
+        PRIVATE METHOD: convert all loaded images on a pool of workers.\n
+        Failed images are collected in failed_images rather than aborting the batch.
+        :param: image_filter, the filter chain to apply to each image.
+        :param: prefix, the prefix of the output file names.
+        '''
+        tasks = self._build_conversion_tasks(image_filter, prefix)
+        max_pending = (self.workers or default_worker_count()) * 4
+        total = 0
+        for task, result, error in run_tasks(_convert_image_task, tasks, self.execution_mode, self.workers, self.executor, max_pending):
+            self._record_conversion_result(task, result, error)
+            total += 1
+
+        self._report_failed_images(total)
+
+    def _convert_images_in_pipeline(self, image_filter, prefix: str):
+        '''
+        PRIVATE METHOD: convert all loaded images in a streaming read -> convert -> write pipeline.\n
+        Failed images are collected in failed_images rather than aborting the batch.
+        :param: image_filter, the filter chain to apply to each image.
+        :param: prefix, the prefix of the output file names.
+        '''
+        tasks = self._build_conversion_tasks(image_filter, prefix)
+        results = run_pipeline(
+            _read_stage,
+            _convert_stage,
+            _write_stage,
+            tasks,
+            compute_workers=self.workers or default_worker_count(),
+            queue_size=self.queue_size
+        )
+        total = 0
+        for task, result, error in results:
+            self._record_conversion_result(task, result, error)
+            total += 1
+
+        self._report_failed_images(total)
+
+    def _convert_images_in_batches(self, image_filter, prefix: str):
+        '''
+        PRIVATE METHOD: convert all loaded images in batches of the same resolution, serially or on a pool of workers.\n
+        Failed images are collected in failed_images rather than aborting the batch.
+        :param: image_filter, the filter chain to apply to each image.
+        :param: prefix, the prefix of the output file names.
+        '''
+        batches = self._batch_conversion_tasks(self._build_conversion_tasks(image_filter, prefix))
+        if self.execution_mode == EXECUTION_SERIAL:
+            outcomes = ((batch, _convert_batch_task(batch), None) for batch in batches)
+        else:
+            max_pending = (self.workers or default_worker_count()) * 2
+            outcomes = run_tasks(_convert_batch_task, batches, self.execution_mode, self.workers, self.executor, max_pending)
+
+        total = 0
+        for batch, results, batch_error in outcomes:
+            if batch_error is not None:
+                results = [ (None, batch_error) ] * len(batch)
+            for task, (result, error) in zip(batch, results):
+                self._record_conversion_result(task, result, error)
+                total += 1
+
+        self._report_failed_images(total)
+
+    def _batch_conversion_tasks(self, tasks):
+        '''
+        PRIVATE METHOD: group conversion tasks by the resolution in the headers of their images.\n
+        A batch is yielded as soon as it holds batch_size tasks, the incomplete batches once all tasks are grouped.
+        Images whose resolution cannot be read from their header are grouped together.
+        :param: tasks, an iterable of ConversionTasks
+        :return: a generator of lists of ConversionTasks
+        '''
+        batches = {}
+        for task in tasks:
+            if PIC.is_acceptable_video(task.source_path): # Videos batch their own frames
+                yield [ task ]
+                continue
+            try:
+                dimensions = read_image_dimensions(task.source_path)
+            except OSError:
+                dimensions = None
+
+            batch = batches.setdefault(dimensions, [])
+            batch.append(task)
+            if len(batch) >= self.batch_size:
+                yield batches.pop(dimensions)
+
+        yield from batches.values()
+
+    def _build_conversion_tasks(self, image_filter, prefix: str):
+        '''
+        PRIVATE METHOD: build the conversion tasks for all loaded images.
+        :param: image_filter, the filter chain to apply to each image.
+        :param: prefix, the prefix of the output file names.
+        :return: a generator of ConversionTasks, which follows the discovery of images when they are streamed.
+        '''
+        signature = f'{self.conversion_signature(image_filter)}:format={self.output_format.specification}'
+        if self.preview_size is not None:
+            signature += f':preview={self.preview_size}'
+            prefix = f'{PIC.PREVIEW_PREFIX}-{prefix}'
+        if self.tile_height is not None:
+            image_filter = functools.partial(apply_in_strips, image_filter, self.filter_halo(image_filter), self.tile_height)
+
+        return self._generate_conversion_tasks(image_filter, prefix, signature)
+
+    def _generate_conversion_tasks(self, image_filter, prefix: str, signature: str):
+        '''
+        PRIVATE METHOD: generate a conversion task for every loaded image, creating the output subdirectories
+        of images in subdirectories of the source directory.
+        :param: image_filter, the filter chain to apply to each image.
+        :param: prefix, the prefix of the output file names.
+        :param: signature, the signature of the conversion.
+        :return: a generator of ConversionTasks
+        '''
+        output_directories = set()
+        for root, file in self.image_paths:
+            relative_directory = os.path.relpath(root, self.path)
+            if relative_directory != os.curdir and relative_directory not in output_directories:
+                os.makedirs(os.path.join(self.target, relative_directory), exist_ok=True)
+                output_directories.add(relative_directory)
+
+            output_path = self._output_path(self.output_file_name(prefix, file), relative_directory, self._output_ext(file))
+            yield ConversionTask(image_filter, os.path.join(root, file), output_path, self.cache, signature,
+                self.preview_size, self.metrics.enabled, self.output_format, self.video_options)
+
+    def _record_conversion_result(self, task: tuple, result: tuple, error):
+        '''
+        PRIVATE METHOD: log the outcome of a conversion task, update the cache and metrics and collect the task if it failed.
+        :param: task, the ConversionTask
+        :param: result, the result of the task organised like (output_path, cache_key, cache_hit, stage_times)
+        :param: error, the error raised by the task or None if it succeeded.
+        '''
+        if self.progress_callback is not None:
+            self.progress_callback(task.source_path, error)
+
+        if self.metrics.enabled:
+            self._record_metrics(task, result, error)
+        if self.manifest is not None:
+            self._record_in_manifest(task, error)
+
+        if error is None:
+            self._converted_files.append(os.path.relpath(task.source_path, self.path))
+            output_path, cache_key, cache_hit, _ = result
+            if self.cache is not None and cache_hit:
+                self.cache.record_hit(cache_key, output_path)
+                self.log(f'Served cached result: {os.path.basename(output_path)}', logging.INFO)
+                return
+            if self.cache is not None and cache_key is not None: # Videos are not cached
+                self.cache.store(cache_key, output_path)
+            self.log(f'Successfully saved file: {os.path.basename(output_path)}', logging.INFO)
+        else:
+            self.failed_images.append((task.source_path, str(error)))
+            self.log(f'Failed to convert file: {task.source_path} ({error})', logging.ERROR)
+
+    def _record_metrics(self, task: tuple, result: tuple, error):
+        '''
+        PRIVATE METHOD: add the stage timings and the image and byte counts of a conversion task to the metrics.
+        :param: task, the ConversionTask
+        :param: result, the result of the task organised like (output_path, cache_key, cache_hit, stage_times)
+        :param: error, the error raised by the task or None if it succeeded.
+        '''
+        if error is not None:
+            self.metrics.increment('images_failed')
+            return
+
+        output_path, _, cache_hit, stage_times = result
+        self.metrics.observe_stages(stage_times)
+        self.metrics.increment('images_cached' if cache_hit else 'images_converted')
+        try:
+            self.metrics.increment('bytes_read', os.path.getsize(task.source_path))
+            self.metrics.increment('bytes_written', _output_size(output_path))
+        except OSError:
+            pass
+
+    def _record_in_manifest(self, task: tuple, error):
+        '''
+        PRIVATE METHOD: record a converted or failed image in the manifest, as it was when it was discovered.
+        :param: task, the ConversionTask
+        :param: error, the error raised by the task or None if it succeeded.
+        '''
+        scanned = self._scanned_images.pop(task.source_path, None)
+        if scanned is None:
+            return
+
+        self.manifest.record(scanned.relative_path, scanned.size, scanned.mtime, None if error is None else str(error))
+        self._unsaved_manifest_records += 1
+        if self._unsaved_manifest_records >= PIC._MANIFEST_SAVE_INTERVAL:
+            self.manifest.save()
+            self._unsaved_manifest_records = 0
+
+    def _report_failed_images(self, total: int):
+        '''
+        PRIVATE METHOD: log a summary of the failed conversions, if any.
+        :param: total, the number of images in the batch.
+        '''
+        if len(self.failed_images) > 0:
+            self.log(f'{len(self.failed_images)} of {total} image(s) failed to convert', logging.WARNING)
     
     @classmethod
-    def apply_adaptive_thresholding(_, image, method=cv.ADAPTIVE_THRESH_GAUSSIAN_C):
+    def output_file_name(cls, prefix: str, file_name: str):
+        '''
+        Build the name of a converted image.
+        :param: prefix, the prefix of the conversion, e.g. 'paintable-contours' or 'chalk'.
+        :param: file_name, the name of the source image.
+        :return: the output file name, made unique with the current timestamp.
+        '''
+        timestamp = dt.datetime.now().strftime(cls._TIMESTAMP_FORMAT)
+        return f'{prefix}-{timestamp}-{file_name}'
+
+    @classmethod
+    def filter_halo(_, image_filter):
+        '''
+        The number of neighbouring rows a filter chain reads around every output row, used for tiled conversion.
+        :param: image_filter, the filter chain.
+        :return: the sum of the kernel radii of the filter chain.
+        '''
+        chain, profile = _split_profile(image_filter)
+        if chain == PIC.paintable_filter:
+            return profile.median_blur_size // 2 + profile.threshold_block_size // 2 # median blur + adaptive threshold
+        if chain == PIC.laplacian_filter:
+            return 1 # laplacian, both apertures of a profile read one neighbouring pixel
+        raise UnknownConversionError(f'The halo of {image_filter} is unknown, it cannot be converted in tiles')
+
+    @classmethod
+    def conversion_signature(_, image_filter):
+        '''
+        Describe a conversion and every parameter affecting its output, used to key cached results.
+        :param: image_filter, the filter chain of the conversion.
+        :return: a string that changes whenever the output of the conversion would change.
+        '''
+        chain, profile = _split_profile(image_filter)
+        scale = '' if profile.scale == 1 else f':scale={profile.scale}'
+        if chain == PIC.paintable_filter:
+            return f'paintable:median_blur={profile.median_blur_size}:adaptive_threshold=gaussian,{profile.threshold_block_size},{profile.threshold_constant}{scale}'
+        if chain == PIC.laplacian_filter:
+            return f'laplacian:ksize={profile.laplacian_ksize}{scale}'
+        if isinstance(image_filter, FastPaintableFilter):
+            return image_filter.signature
+        return f'{image_filter.__module__}.{image_filter.__qualname__}'
+
+    @classmethod
+    def apply_adaptive_thresholding(_, image, method=cv.ADAPTIVE_THRESH_GAUSSIAN_C, dst=None, block_size: int=9, constant: int=3):
         '''
         Apply adaptive thresholding to find the optimal threshold for edge detection.
         :param: image, a cv2, grayscale, preprocessed image to find thesholds for.
         :param: method (optional), the method of adaptive thresholding to use. \n
         Options: cv2.ADAPTIVE_THRESH_GAUSSIAN_C (default) or cv2.ADAPTIVE_THRESH_MEAN_C)) 
-        :return: a thresholded image using: colour 255, given method, binary conversion, range 9 and correction 3
+        :param: dst (optional), an array of the same size as image to write the result to.
+        :param: block_size (optional), the odd size of the neighbourhood to threshold every pixel against. Default: 9
+        :param: constant (optional), the correction subtracted from the threshold of every neighbourhood. Default: 3
+        :return: a thresholded image using: colour 255, given method, binary conversion, range block_size and correction constant
         '''
         colour_code = 255
         thresholding_method = method
         thresholding_format = cv.THRESH_BINARY
-        thresholding_range = 9
-        correction_constant = 3
+        thresholding_range = block_size
+        correction_constant = constant
 
         return cv.adaptiveThreshold(image, colour_code, thresholding_method, 
-            thresholding_format, thresholding_range, correction_constant)
+            thresholding_format, thresholding_range, correction_constant, dst=dst)
 
     @classmethod
     def scale_image(_, image, scale=0.75):
@@ -97,27 +733,75 @@ class PIC:
         :param: scale (optional), the scaling factor. Options: range 0-1, default 0.75
         :return: a resized images using scale as the scaling factor.
         '''
-        height = int(image.shape[0] * scale)
-        width = int(image.shape[1] * scale)
+        height = max(1, int(image.shape[0] * scale))
+        width = max(1, int(image.shape[1] * scale))
         dimensions = (width, height)
 
         return cv.resize(image, dimensions, interpolation=cv.INTER_AREA)
 
     @classmethod
-    def read_image(_, path: str):
+    def read_image(cls, path: str, max_dimension: int=None):
         '''
         Read an image.
         :param: path, the path to read the image from.
+        :param: max_dimension (optional), read a preview no larger than this many pixels in either dimension.
+        JPEG images are decoded at a reduced scale, which is much faster than a full decode. Default: full resolution.
         :return: a cv2 image that was read from the given path in BGR colour scheme.
         '''
-        return cv.imread(path)
+        if max_dimension is None:
+            return cv.imread(path)
+
+        try:
+            dimensions = read_image_dimensions(path)
+        except OSError:
+            dimensions = None
+        image = cv.imread(path, cls.reduced_read_flag(dimensions, max_dimension))
+        return None if image is None else cls.fit_image(image, max_dimension)
+
+    @classmethod
+    def reduced_read_flag(_, dimensions: tuple, max_dimension: int):
+        '''
+        Choose the smallest reduced decode that is still at least max_dimension pixels in its largest dimension.
+        :param: dimensions, the (width, height) of the encoded image, or None if unknown.
+        :param: max_dimension, the largest dimension of the preview.
+        :return: the cv2.imread flag to decode the image with.
+        '''
+        if dimensions is None:
+            return cv.IMREAD_COLOR
+
+        largest_dimension = max(dimensions)
+        for factor, flag in ((8, cv.IMREAD_REDUCED_COLOR_8), (4, cv.IMREAD_REDUCED_COLOR_4), (2, cv.IMREAD_REDUCED_COLOR_2)):
+            if largest_dimension // factor >= max_dimension:
+                return flag
+        return cv.IMREAD_COLOR
+
+    @classmethod
+    def fit_image(cls, image, max_dimension: int):
+        '''
+        Scale an image down so it is no larger than max_dimension pixels in either dimension.
+        :param: image, a cv2 image.
+        :param: max_dimension, the largest allowed dimension.
+        :return: the scaled image, or the image itself if it already fits.
+        '''
+        largest_dimension = max(image.shape[:2])
+        if largest_dimension <= max_dimension:
+            return image
+
+        return cls.scale_image(image, max_dimension / largest_dimension)
 
     def load_images(self):
-        '''Attempt to load images from the source directory.'''
+        '''
+        Attempt to load images from the source directory.\n
+        When converting recursively or incrementally, images are discovered lazily while they are converted.
+        '''
+        if self.recursive or self.manifest is not None:
+            self._stream_images()
+            return
+
         try:
             for file in os.listdir(self.path):
-                acceptable_files = [ (self.path, file) for ext in PIC.ACCEPTABLE_IMAGE_TYPES if file.endswith(ext) ]
-                self.image_paths.extend(acceptable_files)
+                if PIC.is_acceptable_source(file):
+                    self.image_paths.append((self.path, file))
         except OSError:
             raise NoImagesFoundError('An error occurred whilst navigating the given directory, did you provide a valid directory?')
     
@@ -126,6 +810,83 @@ class PIC:
 
         self.log(f'{len(self.image_paths)} image(s) found!', logging.INFO)
 
+    def _stream_images(self):
+        '''PRIVATE METHOD: start discovering images, making sure there is at least one image to convert.'''
+        images = self._discover_images()
+        try:
+            first_image = next(images)
+        except OSError:
+            raise NoImagesFoundError('An error occurred whilst navigating the given directory, did you provide a valid directory?')
+        except StopIteration:
+            if self.skipped_images == 0:
+                raise NoImagesFoundError('No images in given directory!')
+            self.log(f'All {self.skipped_images} image(s) are up to date!', logging.INFO)
+            self.image_paths = []
+            return
+
+        self.image_paths = itertools.chain([ first_image ], images)
+        self.log(f'Converting images while scanning {self.path}...', logging.INFO)
+
+    def _discover_images(self):
+        '''
+        PRIVATE METHOD: scan the source directory for images that are not up to date in the manifest.
+        :return: a generator of (root, file) tuples, like image_paths.
+        '''
+        self.skipped_images = 0
+        self._scanned_images = {}
+        for scanned in scan_files(self.path, PIC.is_acceptable_source, self.should_scan_directory, self.recursive):
+            if self.manifest is not None and self.manifest.is_processed(scanned.relative_path, scanned.size, scanned.mtime):
+                self.skipped_images += 1
+                continue
+
+            if self.manifest is not None:
+                self._scanned_images[scanned.path] = scanned
+            yield os.path.dirname(scanned.path), os.path.basename(scanned.path)
+
+    def should_scan_directory(self, relative_path: str):
+        '''
+        Check whether a subdirectory of the source directory should be scanned.\n
+        The target directory and the directories created by organising clean-ups are skipped.
+        :param: relative_path, the path of the subdirectory relative to the source directory.
+        :return: True if the subdirectory should be scanned, False otherwise.
+        '''
+        if os.path.realpath(os.path.join(self.path, relative_path)) == os.path.realpath(self.target):
+            return False
+        if os.path.dirname(relative_path) == '':
+            try:
+                dt.datetime.strptime(relative_path, PIC._ORGANISED_DIRECTORY_FORMAT)
+                return False
+            except ValueError:
+                pass
+        return True
+
+    @classmethod
+    def is_acceptable_image(cls, file_name: str):
+        '''
+        Check whether a file is an image the converter accepts.
+        :param: file_name, the name of the file.
+        :return: True if the file has one of the ACCEPTABLE_IMAGE_TYPES extensions in any case, False otherwise.
+        '''
+        return os.path.splitext(file_name)[1][1:].lower() in cls.ACCEPTABLE_IMAGE_TYPES
+
+    @classmethod
+    def is_acceptable_video(cls, file_name: str):
+        '''
+        Check whether a file is a video or animated image the converter accepts.
+        :param: file_name, the name of the file.
+        :return: True if the file has one of the ACCEPTABLE_VIDEO_TYPES extensions in any case, False otherwise.
+        '''
+        return os.path.splitext(file_name)[1][1:].lower() in cls.ACCEPTABLE_VIDEO_TYPES
+
+    @classmethod
+    def is_acceptable_source(cls, file_name: str):
+        '''
+        Check whether a file is an image or video the converter accepts.
+        :param: file_name, the name of the file.
+        :return: True if the file is an acceptable image or video, False otherwise.
+        '''
+        return cls.is_acceptable_image(file_name) or cls.is_acceptable_video(file_name)
+
     def save_image(self, image, file_name: str):
         '''
         Save an image.
@@ -134,20 +895,44 @@ class PIC:
         Images are saved to the target directory.
         '''
         try:
-            name, ext = os.path.splitext(file_name)
-            if ext != 'jpg':
-                ext = 'jpg'
-
-            cv.imwrite(os.path.join(self.target, f'{name}.{ext}'), image)
-        except Exception:
-            raise SaveError(f'Could not save file: {image}. Please, check if you are using one of these formats: {PIC.ACCEPTABLE_IMAGE_TYPES}')
+            _write_image_or_raise(self._output_path(file_name), image, self.output_format)
+        except SaveError:
+            raise SaveError(f'Could not save file: {file_name} as {self.output_format.name}. Please, check if you are using one of these formats: {OUTPUT_FORMATS}')
         
         self.log(f'Successfully saved file: {file_name}', logging.INFO)
 
-    def clean_up(self):
-        '''Clean up the source directory if desired.'''
+    def _output_path(self, file_name: str, relative_directory: str=os.curdir, ext: str=None):
+        '''
+        PRIVATE METHOD: build the path in the target directory to save a converted image to.
+        :param: file_name, the name of the output file.
+        :param: relative_directory (optional), the subdirectory of the target directory to save to. Default: the target directory
+        :param: ext (optional), the extension replacing the extension of the source. Default: the extension of the output format
+        :return: the full output path.
+        '''
+        name, _ = os.path.splitext(file_name)
+        ext = self.output_format.ext if ext is None else ext
+        if relative_directory != os.curdir:
+            return os.path.join(self.target, relative_directory, name + ext)
+        return os.path.join(self.target, name + ext)
+
+    def _output_ext(self, file_name: str):
+        '''
+        PRIVATE METHOD: the extension of the converted version of a source file.
+        :param: file_name, the name of the source file.
+        :return: the extension of the output format for images, VIDEO_EXTENSION for videos, or no extension for
+        videos converted to a directory of frames.
+        '''
+        if not PIC.is_acceptable_video(file_name):
+            return self.output_format.ext
+        return '' if self.video_options.frame_sequence else VIDEO_EXTENSION
+
+    def clean_up(self, files: list=None):
+        '''
+        Clean up the source directory if desired.
+        :param: files (optional), the names of the files to clean up. Default: all files in the source directory.
+        '''
         dir_name = None
-        for file in os.listdir(self.path):
+        for file in os.listdir(self.path) if files is None else files:
             if not os.path.isfile(os.path.join(self.path, file)):
                 continue
 
@@ -155,10 +940,11 @@ class PIC:
                 os.remove(os.path.join(self.path, file))
             elif self.auto_organise and dir_name is None:
                 now = dt.datetime.now()
-                dir_name = now.strftime('%B %d %Y %H %M %S')
-                os.mkdir(os.path.join(self.path, dir_name))
+                dir_name = now.strftime(PIC._ORGANISED_DIRECTORY_FORMAT)
+                os.makedirs(os.path.join(self.path, dir_name, os.path.dirname(file)), exist_ok=True)
                 os.replace(os.path.join(self.path, file), os.path.join(self.path, dir_name, file))
             elif self.auto_organise and dir_name is not None:
+                os.makedirs(os.path.join(self.path, dir_name, os.path.dirname(file)), exist_ok=True)
                 os.replace(os.path.join(self.path, file), os.path.join(self.path, dir_name, file))
             else:
                 break
@@ -203,6 +989,309 @@ class PIC:
             self.logger.log(level, message)
 
 
+def _convert_image_task(task: tuple):
+    '''
+    Read, convert and save a single image, serving it from the result cache when possible.
+    :param: task, a ConversionTask
+    :return: a tuple organised like (output_path, cache_key, cache_hit, stage_times), where stage_times maps
+    every stage to its duration in seconds if the task collects metrics and is None otherwise.
+    '''
+    return _write_stage(task, _convert_stage(task, _read_stage(task)))
+
+
+def _read_stage(task: tuple):
+    '''
+    Read the source image of a conversion task, or copy its cached result to the output path.
+    :param: task, a ConversionTask
+    :return: a tuple organised like (image, cache_key, cache_hit, stage_times), where image is None on a cache hit.
+    '''
+    stage_times = {} if task.collect_metrics else None
+    if PIC.is_acceptable_video(task.source_path): # The frames of videos are streamed by _convert_stage
+        return None, None, False, stage_times
+
+    with recording(stage_times):
+        if task.cache is None:
+            with stage('decode'): # cv2.imread reads and decodes in one call
+                return _read_image_or_raise(task.source_path, task.preview_size), None, False, stage_times
+
+        try:
+            with stage('read'), open(task.source_path, 'rb') as source_file:
+                source_bytes = source_file.read()
+        except OSError:
+            raise ReadError(f'Could not read file: {task.source_path}')
+
+        cache_key = task.cache.key(source_bytes, task.signature)
+        if task.cache.fetch(cache_key, task.output_path):
+            return None, cache_key, True, stage_times
+
+        try:
+            with stage('decode'):
+                image = PIC.decode_image(source_bytes, task.preview_size)
+        except ReadError:
+            raise ReadError(f'Could not read file: {task.source_path}')
+
+    return image, cache_key, False, stage_times
+
+
+def _convert_stage(task: tuple, payload: tuple):
+    '''
+    Apply the filter chain of a conversion task to the image read by _read_stage.
+    :param: task, a ConversionTask
+    :param: payload, the result of _read_stage.
+    :return: a tuple organised like (converted_image, cache_key, cache_hit, stage_times)
+    '''
+    image, cache_key, cache_hit, stage_times = payload
+    if cache_hit:
+        return payload
+
+    with recording(stage_times):
+        if PIC.is_acceptable_video(task.source_path):
+            _convert_video(task)
+            return None, cache_key, cache_hit, stage_times
+        return task.image_filter(image), cache_key, cache_hit, stage_times
+
+
+def _write_stage(task: tuple, payload: tuple):
+    '''
+    Save the image converted by _convert_stage, unless it was served from the cache or is a video,
+    which _convert_stage saves while streaming its frames.
+    :param: task, a ConversionTask
+    :param: payload, the result of _convert_stage.
+    :return: a tuple organised like (output_path, cache_key, cache_hit, stage_times)
+    '''
+    image, cache_key, cache_hit, stage_times = payload
+    if not cache_hit and not PIC.is_acceptable_video(task.source_path):
+        with recording(stage_times):
+            _write_image_or_raise(task.output_path, image, task.output_format)
+
+    return task.output_path, cache_key, cache_hit, stage_times
+
+
+def _convert_batch_task(tasks: list):
+    '''
+    Read, convert and save a batch of images, converting the images of the same size at once with the batch filter
+    of their conversion. Cached results are served like in _convert_image_task.
+    :param: tasks, a list of ConversionTasks with the same filter chain.
+    :return: a list of (result, error) tuples in the order of the tasks, where result is organised like the result
+    of _convert_image_task and error is None when the image was converted successfully. The time of the batched
+    stages is divided evenly over the stage times of the images.
+    '''
+    outcomes = [ None ] * len(tasks)
+    payloads = {}
+    images_by_shape = {}
+    for index, task in enumerate(tasks):
+        try:
+            if PIC.is_acceptable_video(task.source_path):
+                outcomes[index] = _convert_image_task(task), None
+                continue
+            payload = _read_stage(task)
+            if payload[2]: # Served from the cache
+                outcomes[index] = _write_stage(task, payload), None
+                continue
+        except Exception as error:
+            outcomes[index] = None, error
+            continue
+        payloads[index] = payload
+        images_by_shape.setdefault(payload[0].shape, []).append(index)
+
+    batch_filter = PIC.batch_filter(tasks[0].image_filter)
+    for indices in images_by_shape.values():
+        batch_times = {} if tasks[0].collect_metrics else None
+        try:
+            with recording(batch_times):
+                converted_images = batch_filter(stack_images([ payloads[index][0] for index in indices ]))
+        except Exception as error:
+            for index in indices:
+                outcomes[index] = None, error
+            continue
+
+        for converted_image, index in zip(converted_images, indices):
+            _, cache_key, cache_hit, stage_times = payloads.pop(index)
+            if stage_times is not None:
+                for name, seconds in batch_times.items():
+                    stage_times[name] = stage_times.get(name, 0.0) + seconds / len(indices)
+            try:
+                outcomes[index] = _write_stage(tasks[index], (converted_image, cache_key, cache_hit, stage_times)), None
+            except Exception as error:
+                outcomes[index] = None, error
+
+    return outcomes
+
+
+def _convert_video(task: tuple):
+    '''
+    Stream the frames of a video or animated image through the filter chain of a conversion task, and save them
+    as a VIDEO_EXTENSION video or a directory of numbered frames. Only task.video.frames_per_batch frames are held
+    in memory at a time, and batches of frames are converted with the batch filter of the conversion.
+    :param: task, a ConversionTask of a video.
+    :return: the number of converted frames.
+    '''
+    capture = open_video(task.source_path)
+    if capture is None:
+        raise ReadError(f'Could not read video: {task.source_path}')
+
+    options = task.video
+    if options.frame_sequence:
+        writer = FrameSequenceWriter(task.output_path, task.output_format)
+    else:
+        writer = VideoFileWriter(task.output_path, frame_rate(capture) / options.every_nth_frame)
+    batch_filter = PIC.batch_filter(task.image_filter)
+
+    frames = 0
+    try:
+        for batch in read_frame_batches(capture, options.every_nth_frame, options.frames_per_batch):
+            if task.preview_size is not None:
+                batch = [ PIC.fit_image(frame, task.preview_size) for frame in batch ]
+            converted_frames = batch_filter(stack_images(batch)) if len(batch) > 1 else [ task.image_filter(batch[0]) ]
+            for converted_frame in converted_frames:
+                if not writer.write(converted_frame):
+                    raise SaveError(f'Could not save frame {frames} of video: {task.output_path}')
+                frames += 1
+    finally:
+        capture.release()
+        writer.close()
+
+    if frames == 0:
+        raise ReadError(f'Could not read any frames of video: {task.source_path}')
+    return frames
+
+
+def _output_size(output_path: str):
+    '''
+    :param: output_path, the path of a converted image or video, or a directory of converted frames.
+    :return: the size of the output in bytes.
+    '''
+    if not os.path.isdir(output_path):
+        return os.path.getsize(output_path)
+    with os.scandir(output_path) as entries:
+        return sum(entry.stat().st_size for entry in entries if entry.is_file())
+
+
+def _filter_each(image_filter, stack):
+    '''
+    Apply a filter chain to every image of a stack separately.
+    :param: image_filter, the filter chain, expecting images in BGR colour scheme.
+    :param: stack, an N×H×W×3 stack of images in BGR colour scheme or an N×H×W stack of grayscale images.
+    :return: an N×H×W stack of the filtered images.
+    '''
+    return np.stack([ image_filter(image if image.ndim == 3 else cv.cvtColor(image, cv.COLOR_GRAY2BGR)) for image in stack ])
+
+
+def _grayscale_stack(stack, padding: int, padded):
+    '''
+    Convert a stack of images to grayscale, into the columns between the padding of a padded stack.
+    :param: stack, an N×H×W×3 stack of images in BGR colour scheme or an N×H×W stack of grayscale images.
+    :param: padding, the number of padding rows above and below every image.
+    :param: padded, the H×N×(W+2*padding) array to write to, see batch.padded_stack.
+    '''
+    if stack.ndim == 3:
+        padded_stack(stack, padding, padded)
+        return
+
+    count, height, width = stack.shape[:3]
+    grayscale = thread_buffer_pool().get('batch_grayscale_images', (count, height, width))
+    cv.cvtColor(stack.reshape(count * height, width, 3), cv.COLOR_BGR2GRAY, dst=grayscale.reshape(count * height, width))
+    padded_stack(grayscale, padding, padded)
+
+
+def _with_profile(image_filter, profile: ConversionProfile):
+    '''
+    PRIVATE FUNCTION: bind a standard filter chain to a profile. The filter chain itself is returned for the default
+    profile, so it keeps its identity for lookups like batch_filter.
+    :param: image_filter, PIC.paintable_filter or PIC.laplacian_filter.
+    :param: profile, the ConversionProfile.
+    :return: a picklable filter chain applying the profile.
+    '''
+    if profile == DEFAULT_PROFILE:
+        return image_filter
+    return functools.partial(image_filter, profile=profile)
+
+
+def _split_profile(image_filter):
+    '''
+    PRIVATE FUNCTION: undo _with_profile.
+    :param: image_filter, a filter chain.
+    :return: a (filter_chain, profile) tuple, where profile is DEFAULT_PROFILE unless the chain was bound to another one.
+    '''
+    if isinstance(image_filter, functools.partial) and 'profile' in image_filter.keywords:
+        return image_filter.func, image_filter.keywords['profile']
+    return image_filter, DEFAULT_PROFILE
+
+
+def _prescale(image, profile: ConversionProfile):
+    '''
+    PRIVATE FUNCTION: scale an image by the scale of a profile, if any.
+    :param: image, a cv2 image.
+    :param: profile, the ConversionProfile.
+    :return: the scaled image, or image itself if the profile does not scale images.
+    '''
+    if profile.scale == 1:
+        return image
+    with stage('resize'):
+        return PIC.scale_image(image, profile.scale)
+
+
+def _prescale_stack(stack, profile: ConversionProfile):
+    '''
+    PRIVATE FUNCTION: scale a stack of images by the scale of a profile, if any.
+    :param: stack, an N×H×W(×3) stack of images.
+    :param: profile, the ConversionProfile.
+    :return: a (stack, profile) tuple of the scaled stack and the profile without its scale, so it is not applied twice.
+    '''
+    if profile.scale == 1:
+        return stack, profile
+    with stage('resize'):
+        stack = np.stack([ PIC.scale_image(image, profile.scale) for image in stack ])
+    return stack, profile._replace(scale=1.0)
+
+
+def _convert_in_memory_task(task: tuple):
+    '''
+    Convert a single encoded image in memory. Used by worker pools converting request payloads.
+    :param: task, a tuple organised like (image_bytes, conversion, output_format, preview_size, collect_metrics[, profile])
+    :return: a tuple organised like (converted_bytes, stage_times), where stage_times is None unless collect_metrics is set.
+    '''
+    image_bytes, conversion, output_format, preview_size, collect_metrics = task[:5]
+    profile = task[5] if len(task) > 5 else DEFAULT_PROFILE
+    stage_times = {} if collect_metrics else None
+    with recording(stage_times):
+        return PIC.convert_in_memory(image_bytes, conversion, output_format, preview_size, profile), stage_times
+
+
+def _read_image_or_raise(path: str, max_dimension: int=None):
+    '''
+    Read an image and raise a ReadError if it could not be decoded.
+    :param: path, the path to read the image from.
+    :param: max_dimension (optional), see PIC.read_image.
+    :return: a cv2 image in BGR colour scheme.
+    '''
+    image = PIC.read_image(path, max_dimension)
+    if image is None:
+        raise ReadError(f'Could not read file: {path}')
+
+    return image
+
+
+def _write_image_or_raise(path: str, image, output_format: OutputFormat):
+    '''
+    Write an image and raise a SaveError if it could not be encoded or saved.\n
+    Encoding and writing are separate steps, so they can be timed separately.
+    :param: path, the path to save the image to.
+    :param: image, the cv2 image to save.
+    :param: output_format, the OutputFormat to encode the image with.
+    '''
+    with stage('encode'):
+        encoded = output_format.encode(image)
+    if encoded is None:
+        raise SaveError(f'Could not encode file: {path}')
+
+    try:
+        with stage('write'), open(path, 'wb') as output_file:
+            output_file.write(encoded)
+    except OSError:
+        raise SaveError(f'Could not save file: {path}')
+
+
 class PICError(Exception):
     '''Base error for the Python Image Converter'''
     pass
@@ -222,3 +1311,31 @@ class FailedDirectoryCreationError(PICError):
 class ConflictingCompletionActionsError(PICError):
     '''Error raised when the clean-up actions conflict'''
     pass
+
+class InvalidExecutionModeError(PICError):
+    '''Error raised when an unknown execution mode is requested'''
+    pass
+
+class ReadError(PICError):
+    '''Error raised when an image could not be read'''
+    pass
+
+class UnknownConversionError(PICError):
+    '''Error raised when an unknown conversion is requested'''
+    pass
+
+class InvalidOutputFormatError(PICError):
+    '''Error raised when an unknown or unavailable output format is requested'''
+    pass
+
+class InvalidBatchError(PICError):
+    '''Error raised when images cannot be converted as a batch'''
+    pass
+
+class InvalidVideoOptionsError(PICError):
+    '''Error raised when videos cannot be converted with the given options'''
+    pass
+
+class InvalidProfileError(PICError):
+    '''Error raised when an unknown or invalid conversion profile is requested'''
+    pass
@@ -0,0 +1,116 @@
+import queue
+import threading
+
+_END_OF_STREAM = object()
+_STOP_CHECK_INTERVAL = 0.1 # Seconds between checks whether the consumer stopped iterating, while a stage waits for a queue
+
+
+def run_pipeline(read, convert, write, items, compute_workers: int=1, queue_size: int=8):
+    '''
+    Run items through a staged read -> convert -> write pipeline so disk and CPU work overlap.\n
+    A reader thread prefetches and decodes, compute threads convert and a writer thread encodes and saves.
+    The stages are connected by bounded queues, so at most queue_size decoded and queue_size converted
+    images are held in memory at any time, plus one per compute worker.
+    :param: read, a callable taking an item and returning the decoded image.
+    :param: convert, a callable taking an item and its decoded image and returning the converted image.
+    :param: write, a callable taking an item and its converted image, saving it and returning a result.
+    :param: items, the items to process.
+    :param: compute_workers (optional), the number of compute threads. Default: 1
+    :param: queue_size (optional), the capacity of each queue between stages. Default: 8
+    :return: a generator of (item, result, error) tuples in order of completion, where error is None
+    when the item was processed successfully. An exception raised while iterating items is raised by the
+    generator once the items read before it are processed.
+    '''
+    decoded = queue.Queue(maxsize=queue_size)
+    converted = queue.Queue(maxsize=queue_size)
+    completed = queue.Queue()
+    stopping = threading.Event()
+    reader_errors = []
+
+    def put(stage_queue, entry):
+        '''Put an entry in a bounded queue, giving up once the consumer stopped iterating.'''
+        while not stopping.is_set():
+            try:
+                stage_queue.put(entry, timeout=_STOP_CHECK_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(stage_queue):
+        '''Take an entry from a queue, or _END_OF_STREAM once the consumer stopped iterating.'''
+        while not stopping.is_set():
+            try:
+                return stage_queue.get(timeout=_STOP_CHECK_INTERVAL)
+            except queue.Empty:
+                continue
+        return _END_OF_STREAM
+
+    def reader():
+        try:
+            for item in items:
+                try:
+                    entry = (item, read(item), None)
+                except Exception as error:
+                    entry = (item, None, error)
+                if not put(decoded, entry):
+                    return
+        except Exception as error: # Raised by the items themselves, e.g. by a scan of the source directory
+            reader_errors.append(error)
+        finally:
+            for _ in range(compute_workers):
+                put(decoded, _END_OF_STREAM)
+
+    def computer():
+        while True:
+            entry = get(decoded)
+            if entry is _END_OF_STREAM:
+                put(converted, _END_OF_STREAM)
+                return
+
+            item, image, error = entry
+            if error is None:
+                try:
+                    image = convert(item, image)
+                except Exception as convert_error:
+                    image, error = None, convert_error
+            if not put(converted, (item, image, error)):
+                return
+
+    def writer():
+        remaining_workers = compute_workers
+        while remaining_workers > 0 and not stopping.is_set():
+            entry = get(converted)
+            if entry is _END_OF_STREAM:
+                remaining_workers -= 1
+                continue
+
+            item, image, error = entry
+            result = None
+            if error is None:
+                try:
+                    result = write(item, image)
+                except Exception as write_error:
+                    error = write_error
+            completed.put((item, result, error))
+        completed.put(_END_OF_STREAM)
+
+    stages = [threading.Thread(target=reader, daemon=True), threading.Thread(target=writer, daemon=True)]
+    stages.extend(threading.Thread(target=computer, daemon=True) for _ in range(compute_workers))
+    for stage in stages:
+        stage.start()
+
+    try:
+        while True:
+            result = completed.get()
+            if result is _END_OF_STREAM:
+                break
+            yield result
+    finally:
+        # Also stops the stages when the consumer stops iterating early
+        stopping.set()
+        for stage in stages:
+            stage.join()
+
+    if len(reader_errors) > 0:
+        raise reader_errors[0]
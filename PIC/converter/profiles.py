@@ -0,0 +1,41 @@
+from collections import namedtuple
+
+PROFILE_FAST = 'fast'
+PROFILE_BALANCED = 'balanced'
+PROFILE_HIGH_QUALITY = 'high-quality'
+
+ConversionProfile = namedtuple('ConversionProfile', ['name', 'median_blur_size', 'threshold_block_size', 'threshold_constant', 'laplacian_ksize', 'scale'])
+ConversionProfile.__doc__ = '''The kernel sizes of the paintable contours and chalk drawing filter chains, and the factor to scale images by first.'''
+
+PROFILES = {
+    PROFILE_FAST: ConversionProfile(PROFILE_FAST, median_blur_size=3, threshold_block_size=7, threshold_constant=3, laplacian_ksize=1, scale=0.5),
+    PROFILE_BALANCED: ConversionProfile(PROFILE_BALANCED, median_blur_size=5, threshold_block_size=9, threshold_constant=3, laplacian_ksize=3, scale=1.0),
+    PROFILE_HIGH_QUALITY: ConversionProfile(PROFILE_HIGH_QUALITY, median_blur_size=7, threshold_block_size=11, threshold_constant=3, laplacian_ksize=3, scale=1.0),
+}
+DEFAULT_PROFILE = PROFILES[PROFILE_BALANCED]
+
+
+def get_profile(profile):
+    '''
+    Look up a conversion profile by name, or validate a custom one.
+    :param: profile, the name of a profile, 'fast', 'balanced' or 'high-quality', or a ConversionProfile.
+    :return: the ConversionProfile.
+    '''
+    if isinstance(profile, ConversionProfile):
+        _validate(profile)
+        return profile
+    if profile not in PROFILES:
+        raise ValueError(f'Unknown conversion profile: {profile}. Options: {list(PROFILES)}')
+    return PROFILES[profile]
+
+
+def _validate(profile: ConversionProfile):
+    '''PRIVATE FUNCTION: raise a ValueError if OpenCV cannot apply the kernels of a profile.'''
+    for field in ('median_blur_size', 'threshold_block_size'):
+        size = getattr(profile, field)
+        if size < 3 or size % 2 == 0:
+            raise ValueError(f'The {field} of a profile must be an odd number of at least 3, not {size}')
+    if profile.laplacian_ksize not in (1, 3): # Larger apertures overflow the 16-bit Laplacian
+        raise ValueError(f'The laplacian_ksize of a profile must be 1 or 3, not {profile.laplacian_ksize}')
+    if not 0 < profile.scale <= 1:
+        raise ValueError(f'The scale of a profile must be above 0 and at most 1, not {profile.scale}')
@@ -0,0 +1,52 @@
+import os
+from collections import namedtuple
+
+ScannedFile = namedtuple('ScannedFile', ['path', 'relative_path', 'size', 'mtime'])
+ScannedFile.__doc__ = '''A file found by scan_files, with its size in bytes and modification time in nanoseconds.'''
+
+
+def scan_files(directory: str, accept_file, accept_directory=None, recursive: bool=True, on_error=None):
+    '''
+    Lazily find files in a directory tree with os.scandir, which reuses the file type and stat information
+    of the directory listing instead of querying every file separately.\n
+    Files are yielded as soon as their directory is listed, so callers can start processing before the scan
+    finishes. Subdirectories that cannot be read are skipped.
+    :param: directory, the directory to scan. An OSError is raised if it cannot be read.
+    :param: accept_file, a callable receiving a file name and returning True if the file should be yielded.
+    :param: accept_directory (optional), a callable receiving the path of a subdirectory relative to directory
+    and returning True if it should be scanned. Default: scan all subdirectories.
+    :param: recursive (optional), a flag indicating whether to scan subdirectories. Default: True
+    :param: on_error (optional), a callable receiving the OSError of every subdirectory that could not be read
+    and was skipped. Default: None
+    :return: a generator of ScannedFiles.
+    '''
+    pending_directories = [ '' ]
+    while len(pending_directories) > 0:
+        relative_directory = pending_directories.pop()
+        try:
+            entries = os.scandir(os.path.join(directory, relative_directory))
+        except OSError as error:
+            if relative_directory == '':
+                raise
+            if on_error is not None:
+                on_error(error)
+            continue
+
+        subdirectories = []
+        with entries:
+            for entry in entries:
+                relative_path = os.path.join(relative_directory, entry.name)
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive and (accept_directory is None or accept_directory(relative_path)):
+                            subdirectories.append(relative_path)
+                        continue
+                    if not accept_file(entry.name) or not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError: # Removed or inaccessible between listing and stat
+                    continue
+                yield ScannedFile(entry.path, relative_path, stat.st_size, stat.st_mtime_ns)
+
+        # Reversed, so subdirectories are scanned in listing order
+        pending_directories.extend(reversed(subdirectories))
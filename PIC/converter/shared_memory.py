@@ -0,0 +1,209 @@
+import os
+import secrets
+import threading
+import numpy as np
+from collections import namedtuple
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+from PIC.converter.parallel import EXECUTION_PROCESS, create_executor
+
+SharedSegment = namedtuple('SharedSegment', ['name', 'size', 'shape', 'dtype'])
+SharedSegment.__doc__ = '''Describes a payload in a shared memory segment: raw bytes if shape is None, a numpy array otherwise.'''
+
+_SEGMENT_PREFIX = 'pic' # POSIX shared memory names are limited to 31 characters on some platforms
+
+
+def share(data):
+    '''
+    Copy bytes or a numpy array into a new shared memory segment.
+    :param: data, a bytes-like object or a numpy array.
+    :return: a (SharedMemory, SharedSegment) tuple. The caller owns the segment and must close and unlink it.
+    '''
+    if isinstance(data, np.ndarray):
+        shape, dtype = data.shape, data.dtype.str
+        data = np.ascontiguousarray(data)
+    else:
+        shape, dtype = None, None
+    view = memoryview(data).cast('B')
+    segment = shared_memory.SharedMemory(create=True, size=max(1, view.nbytes)) # Segments cannot be empty
+    segment.buf[:view.nbytes] = view
+    return segment, SharedSegment(segment.name, view.nbytes, shape, dtype)
+
+
+def attach(descriptor: SharedSegment):
+    '''
+    Attach to a shared memory segment without copying its payload.
+    :param: descriptor, the SharedSegment.
+    :return: a (SharedMemory, view) tuple, where view is a 1-dimensional uint8 numpy array of raw bytes or
+    an array of the shared shape and type. The view must be released before the segment is closed.
+    '''
+    segment = shared_memory.SharedMemory(name=descriptor.name)
+    if descriptor.shape is None:
+        return segment, np.ndarray((descriptor.size,), dtype=np.uint8, buffer=segment.buf)
+    return segment, np.ndarray(descriptor.shape, dtype=np.dtype(descriptor.dtype), buffer=segment.buf)
+
+
+def take(descriptor: SharedSegment):
+    '''
+    Copy the payload out of a shared memory segment, then close and unlink the segment.
+    :param: descriptor, the SharedSegment.
+    :return: bytes if the payload was shared as bytes, otherwise a numpy array.
+    '''
+    segment, view = attach(descriptor)
+    try:
+        return view.tobytes() if descriptor.shape is None else view.copy()
+    finally:
+        del view
+        segment.close()
+        segment.unlink()
+
+
+def discard(name: str):
+    '''
+    Unlink a shared memory segment if it exists.
+    :param: name, the name of the segment.
+    '''
+    try:
+        segment = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    segment.close()
+    segment.unlink()
+
+
+class SharedMemoryExecutor(Executor):
+    '''
+    A pool of worker processes that exchanges payloads through shared memory segments instead of pickling them.\n
+    Tasks submitted with submit_shared receive their payload as a view of a shared segment and write their result
+    to a segment named by the submitting process, so only small descriptors cross the process boundary. Segments
+    are unlinked by the submitting process once the task is done, also if a worker crashed. A pool broken by a
+    crashed worker is replaced by a new one on the next submission. submit runs ordinary tasks on the same workers.
+    '''
+
+    def __init__(self, workers: int=None):
+        '''
+        Start the pool of worker processes.
+        :param: workers (optional), the number of worker processes. Default: the number of available CPUs.
+        '''
+        if os.name == 'posix':
+            # Workers must share the tracker of the submitting process, so a segment is released by whichever side unlinks it
+            from multiprocessing import resource_tracker
+            resource_tracker.ensure_running()
+
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._executor = create_executor(EXECUTION_PROCESS, workers)
+
+    def submit(self, fn, *args, **kwargs):
+        '''
+        Run a task on the pool, pickling its arguments and result like a ProcessPoolExecutor.
+        :return: a Future of the result of the task.
+        '''
+        with self._lock:
+            if self._executor is None:
+                raise RuntimeError('Cannot submit tasks after shutdown')
+            try:
+                return self._executor.submit(fn, *args, **kwargs)
+            except BrokenProcessPool:
+                self._restart()
+                return self._executor.submit(fn, *args, **kwargs)
+
+    def submit_shared(self, fn, task: tuple):
+        '''
+        Run a task on the pool, passing its payload and result through shared memory.
+        :param: fn, a module level function receiving task with the payload replaced by a numpy view of the shared
+        segment, see attach. It must return a tuple whose first element is bytes or a numpy array, the result payload.
+        The view is only valid while fn runs.
+        :param: task, a tuple whose first element is the payload, bytes or a numpy array. The other elements are pickled.
+        :return: a Future of the tuple returned by fn, with the result payload copied out of shared memory.
+        '''
+        segment, descriptor = share(task[0])
+        result_name = f'{_SEGMENT_PREFIX}{secrets.token_hex(12)}'
+        future = Future()
+        try:
+            task_future = self.submit(_run_shared_task, fn, (descriptor,) + tuple(task[1:]), result_name)
+        except BaseException:
+            _release(segment)
+            raise
+
+        def collect(task_future):
+            _release(segment)
+            try:
+                result = task_future.result()
+            except BaseException as error:
+                discard(result_name) # The worker may have failed or crashed after creating the result segment
+                future.set_exception(error)
+                return
+            try:
+                future.set_result((take(result[0]),) + tuple(result[1:]))
+            except BaseException as error:
+                discard(result_name)
+                future.set_exception(error)
+
+        task_future.add_done_callback(collect)
+        return future
+
+    def shutdown(self, wait: bool=True, *, cancel_futures: bool=False):
+        '''
+        Stop the worker processes. Segments of cancelled tasks are unlinked.
+        :param: wait (optional), a flag indicating whether to wait for running tasks to finish. Default: True
+        :param: cancel_futures (optional), a flag indicating whether to cancel tasks that have not started. Default: False
+        '''
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def _restart(self):
+        '''PRIVATE METHOD: replace a pool broken by a crashed worker. Must be called with the lock held.'''
+        self._executor.shutdown(wait=False)
+        self._executor = create_executor(EXECUTION_PROCESS, self.workers)
+
+
+def _run_shared_task(fn, task: tuple, result_name: str):
+    '''
+    PRIVATE FUNCTION: run a task of submit_shared in a worker process.
+    :param: fn, the task function.
+    :param: task, the task with the SharedSegment of its payload as first element.
+    :param: result_name, the name of the segment to write the result payload to.
+    :return: the result of fn with its payload replaced by the SharedSegment of the result.
+    '''
+    segment, view = attach(task[0])
+    try:
+        result = fn((view,) + tuple(task[1:]))
+    finally:
+        del view
+        _close(segment)
+
+    payload = result[0]
+    if isinstance(payload, np.ndarray):
+        shape, dtype = payload.shape, payload.dtype.str
+        payload = np.ascontiguousarray(payload)
+    else:
+        shape, dtype = None, None
+    data = memoryview(payload).cast('B')
+    result_segment = shared_memory.SharedMemory(name=result_name, create=True, size=max(1, data.nbytes))
+    try:
+        result_segment.buf[:data.nbytes] = data
+    finally:
+        result_segment.close()
+    return (SharedSegment(result_name, data.nbytes, shape, dtype),) + tuple(result[1:])
+
+
+def _release(segment):
+    '''PRIVATE FUNCTION: close and unlink a segment created by the submitting process.'''
+    _close(segment)
+    try:
+        segment.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _close(segment):
+    '''PRIVATE FUNCTION: close a segment. If a view of it is still referenced, e.g. by a traceback, it closes once the view is collected.'''
+    try:
+        segment.close()
+    except BufferError:
+        pass
@@ -0,0 +1,31 @@
+import numpy as np
+
+
+def apply_in_strips(image_filter, halo: int, strip_height: int, image):
+    '''
+    Apply a filter chain to an image one horizontal strip at a time, so that the intermediate buffers of the
+    filter chain are bounded by the strip size instead of the image size.\n
+    Every strip is extended by halo rows above and below. As long as the halo is at least the sum of the
+    kernel radii of the filter chain, the result is identical to filtering the full frame.
+    :param: image_filter, the filter chain to apply. It must preserve the height and width of the image.
+    :param: halo, the number of extra rows to read above and below each strip.
+    :param: strip_height, the number of output rows produced per strip.
+    :param: image, the cv2 image to filter.
+    :return: the filtered image.
+    '''
+    height = image.shape[0]
+    if height <= strip_height:
+        return image_filter(image)
+
+    output = None
+    for top in range(0, height, strip_height):
+        bottom = min(top + strip_height, height)
+        halo_top = max(0, top - halo)
+        halo_bottom = min(height, bottom + halo)
+
+        filtered_strip = image_filter(image[halo_top:halo_bottom])
+        if output is None:
+            output = np.empty((height,) + filtered_strip.shape[1:], dtype=filtered_strip.dtype)
+        output[top:bottom] = filtered_strip[top - halo_top:bottom - halo_top]
+
+    return output
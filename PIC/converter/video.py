@@ -0,0 +1,144 @@
+import os
+import math
+import cv2 as cv
+from collections import namedtuple
+
+from PIC.converter.metrics import stage
+
+VIDEO_TYPES = ['mp4', 'avi', 'mov', 'mkv', 'webm', 'gif']
+VIDEO_EXTENSION = '.mp4'
+FRAME_FILE_FORMAT = 'frame-{:06d}'
+_VIDEO_FOURCC = 'mp4v'
+_DEFAULT_FRAME_RATE = 25.0
+
+VideoOptions = namedtuple('VideoOptions', ['every_nth_frame', 'frame_sequence', 'frames_per_batch'])
+VideoOptions.__doc__ = '''How videos and animated images are converted: which frames, to a video or a numbered frame sequence, and how many frames at a time.'''
+
+
+def open_video(path: str):
+    '''
+    Open a video or animated image for reading.
+    :param: path, the path of the video.
+    :return: a cv2.VideoCapture, or None if the video could not be opened.
+    '''
+    capture = cv.VideoCapture(path)
+    if not capture.isOpened():
+        capture.release()
+        return None
+    return capture
+
+
+def frame_rate(capture):
+    '''
+    :param: capture, an opened cv2.VideoCapture
+    :return: the frames per second of the video, or a default of 25 if the container does not report it.
+    '''
+    fps = capture.get(cv.CAP_PROP_FPS)
+    if fps is None or math.isnan(fps) or fps <= 0:
+        return _DEFAULT_FRAME_RATE
+    return fps
+
+
+def read_frame_batches(capture, every_nth_frame: int=1, frames_per_batch: int=1):
+    '''
+    Stream the frames of a video, decoding only the frames that are kept. At most frames_per_batch frames
+    are held in memory, regardless of the length of the video.
+    :param: capture, an opened cv2.VideoCapture
+    :param: every_nth_frame (optional), keep only the first of every this many frames. Default: keep every frame.
+    :param: frames_per_batch (optional), the number of frames per batch. Default: 1
+    :return: a generator of lists of frames in BGR colour scheme.
+    '''
+    batch = []
+    index = 0
+    while True:
+        with stage('decode'):
+            if not capture.grab(): # Grabbing without retrieving skips the decode of dropped frames
+                break
+            keep = index % every_nth_frame == 0
+            frame = capture.retrieve()[1] if keep else None
+        index += 1
+        if not keep or frame is None:
+            continue
+
+        batch.append(frame)
+        if len(batch) >= frames_per_batch:
+            yield batch
+            batch = []
+
+    if len(batch) > 0:
+        yield batch
+
+
+class VideoFileWriter:
+    '''Writes converted frames to a video file. The writer is opened by the first frame, which sets its size.'''
+
+    def __init__(self, path: str, fps: float):
+        '''
+        :param: path, the path of the video, normally ending in VIDEO_EXTENSION.
+        :param: fps, the frames per second of the video.
+        '''
+        self.path = path
+        self.fps = fps
+        self._writer = None
+
+    def write(self, frame):
+        '''
+        Write a frame.
+        :param: frame, a grayscale or BGR cv2 image of the same size as the first frame.
+        :return: True if the frame was written, False if the video could not be opened.
+        '''
+        if self._writer is None:
+            height, width = frame.shape[:2]
+            self._writer = cv.VideoWriter(self.path, cv.VideoWriter_fourcc(*_VIDEO_FOURCC), self.fps, (width, height), frame.ndim == 3)
+            if not self._writer.isOpened():
+                return False
+
+        with stage('encode'): # cv2.VideoWriter encodes and writes in one call
+            self._writer.write(frame)
+        return True
+
+    def close(self):
+        '''Finish the video file.'''
+        if self._writer is not None:
+            self._writer.release()
+
+
+class FrameSequenceWriter:
+    '''Writes converted frames as numbered images to a directory, like frame-000000.jpg, frame-000001.jpg and so on.'''
+
+    def __init__(self, directory: str, output_format):
+        '''
+        :param: directory, the directory to write the frames to. It is created by the first frame.
+        :param: output_format, the OutputFormat to encode the frames with.
+        '''
+        self.directory = directory
+        self.output_format = output_format
+        self.frames = 0
+
+    def write(self, frame):
+        '''
+        Write the next frame.
+        :param: frame, a cv2 image.
+        :return: True if the frame was written, False if it could not be encoded or saved.
+        '''
+        with stage('encode'):
+            encoded = self.output_format.encode(frame)
+        if encoded is None:
+            return False
+
+        path = os.path.join(self.directory, FRAME_FILE_FORMAT.format(self.frames) + self.output_format.ext)
+        try:
+            with stage('write'):
+                if self.frames == 0:
+                    os.makedirs(self.directory, exist_ok=True)
+                with open(path, 'wb') as frame_file:
+                    frame_file.write(encoded)
+        except OSError:
+            return False
+
+        self.frames += 1
+        return True
+
+    def close(self):
+        '''Nothing to finish, every frame is a complete file.'''
+        pass
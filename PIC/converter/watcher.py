@@ -0,0 +1,171 @@
+import os
+import time
+import logging
+import threading
+
+from PIC.converter.pic import PIC
+from PIC.converter.manifest import Manifest
+from PIC.converter.scanner import scan_files
+
+DEFAULT_POLL_INTERVAL = 2.0
+DEFAULT_SETTLE_TIME = 2.0
+
+
+class FolderWatcher:
+    '''
+    Watch the source directory of a Python Image Converter and convert new or changed images as they arrive.\n
+    The directory is polled, which works on every platform and network share. Images are only converted once
+    their size and modification time have not changed for settle_time seconds, so files that are still being
+    written are skipped until they are complete. Processed files are recorded in a Manifest, so a restarted
+    watcher does not convert them again.
+    '''
+
+    def __init__(self, pic: PIC, manifest: Manifest, convert=PIC.convert_to_paintable,
+        poll_interval: float=DEFAULT_POLL_INTERVAL, settle_time: float=DEFAULT_SETTLE_TIME):
+        '''
+        Initialise the watcher.
+        :param: pic, the Python Image Converter to convert images with. Its source directory is watched.
+        :param: manifest, the manifest of processed files.
+        :param: convert (optional), the conversion to run, called with the converter. Default: PIC.convert_to_paintable
+        :param: poll_interval (optional), the number of seconds between scans of the source directory. Default: 2
+        :param: settle_time (optional), the number of seconds an image must be unchanged before it is converted. Default: 2
+        '''
+        self.pic = pic
+        self.manifest = manifest
+        self.convert = convert
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self._candidates = {}
+        self._stop_event = threading.Event()
+
+    def run(self):
+        '''Poll the source directory until stop is called. The manifest is saved after every batch.'''
+        self._stop_event.clear()
+        self.pic.log(f'Watching {self.pic.path} for new images...', logging.INFO)
+        try:
+            while not self._stop_event.is_set():
+                self.poll()
+                self._stop_event.wait(self.poll_interval)
+        finally:
+            self.manifest.save()
+
+    def stop(self):
+        '''Stop a running watcher after its current batch.'''
+        self._stop_event.set()
+
+    def poll(self):
+        '''
+        Scan the source directory once and convert all images that are ready.
+        :return: the number of images that were converted or failed.
+        '''
+        ready_files = self._ready_files(time.monotonic())
+        if len(ready_files) == 0:
+            return 0
+
+        processed = self._convert(ready_files)
+        for name in processed:
+            self._candidates.pop(name, None)
+        self.manifest.save()
+        return len(processed)
+
+    def _ready_files(self, now: float):
+        '''
+        PRIVATE METHOD: find the images that are not processed yet and have settled.\n
+        Manifest entries of files that disappeared from the source directory are removed, but only after a complete
+        scan, as files in directories that could not be read did not necessarily disappear.
+        :param: now, the current monotonic time.
+        :return: a list of (name, size, mtime) tuples.
+        '''
+        scanned_files, complete = self._scan()
+        if scanned_files is None:
+            return [] # Retried by the next poll, without forgetting the processed files
+
+        ready_files = []
+        seen = set()
+        for name, size, mtime in scanned_files:
+            seen.add(name)
+            if self.manifest.is_processed(name, size, mtime):
+                continue
+
+            candidate = self._candidates.get(name)
+            if candidate is None or candidate[0] != size or candidate[1] != mtime:
+                candidate = (size, mtime, now)
+                self._candidates[name] = candidate
+            if now - candidate[2] >= self.settle_time:
+                ready_files.append((name, size, mtime))
+
+        if not complete:
+            return ready_files
+
+        for name in [ name for name in self._candidates if name not in seen ]:
+            del self._candidates[name]
+        for name in [ name for name in self.manifest.names() if name not in seen ]:
+            self.manifest.remove(name)
+
+        return ready_files
+
+    def _scan(self):
+        '''
+        PRIVATE METHOD: list the images in the source directory, and its subdirectories if the converter is recursive.
+        :return: a tuple of a list of (name, size, mtime) tuples, where name is relative to the source directory and
+        mtime is in nanoseconds, and a flag indicating whether every subdirectory could be read. The list is None if
+        the scan failed.
+        '''
+        skipped_directories = []
+        try:
+            scanned_files = [
+                (scanned.relative_path, scanned.size, scanned.mtime)
+                for scanned in scan_files(self.pic.path, PIC.is_acceptable_source, self.pic.should_scan_directory,
+                    self.pic.recursive, on_error=skipped_directories.append)
+            ]
+        except OSError as error:
+            self.pic.log(f'Could not scan the source directory: {self.pic.path}: {error}', logging.ERROR)
+            return None, False
+
+        for error in skipped_directories:
+            self.pic.log(f'Could not scan the directory: {error.filename}', logging.WARNING)
+        return scanned_files, len(skipped_directories) == 0
+
+    def _convert(self, files: list):
+        '''
+        PRIVATE METHOD: convert a batch of images and record every outcome in the manifest.\n
+        Images the conversion did not get to are left unrecorded, so they are retried by the next poll.
+        :param: files, a list of (name, size, mtime) tuples.
+        :return: the names of the images that were converted or failed.
+        '''
+        pic = self.pic
+        pending = { os.path.join(pic.path, name): (name, size, mtime) for name, size, mtime in files }
+        converted = []
+        progress_callback = pic.progress_callback
+        auto_cleanup = pic.auto_cleanup
+
+        def record(source_path: str, error):
+            name, size, mtime = pending.pop(source_path)
+            self.manifest.record(name, size, mtime, None if error is None else str(error))
+            if error is None:
+                converted.append(name)
+            if progress_callback is not None:
+                progress_callback(source_path, error)
+
+        pic.log(f'{len(files)} new image(s) found!', logging.INFO)
+        pic.image_paths = [ (os.path.join(pic.path, os.path.dirname(name)), os.path.basename(name)) for name, _, _ in files ]
+        pic.progress_callback = record
+        pic.auto_cleanup = False # Only the converted images are cleaned up, not files still being written
+        try:
+            self.convert(pic)
+        except Exception as error:
+            # The serial execution mode stops at the first failing image, which is the first one not recorded yet.
+            pic.log(f'Conversion stopped: {error}', logging.ERROR)
+            if len(pending) > 0:
+                name, size, mtime = pending.pop(next(iter(pending)))
+                self.manifest.record(name, size, mtime, str(error))
+        finally:
+            pic.image_paths = []
+            pic.progress_callback = progress_callback
+            pic.auto_cleanup = auto_cleanup
+
+        if auto_cleanup and len(converted) > 0:
+            pic.clean_up(converted)
+
+        skipped = { name for name, _, _ in pending.values() }
+        return [ name for name, _, _ in files if name not in skipped ]
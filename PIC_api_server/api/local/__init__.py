@@ -1 +1,4 @@
-from api.local.upload_images import local_image_converter
\ No newline at end of file
+from api.local.upload_images import local_image_converter
+from api.local.jobs import local_jobs
+from api.local.stream_images import local_stream_converter
+from api.local.metrics import local_metrics
\ No newline at end of file
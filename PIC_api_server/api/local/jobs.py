@@ -0,0 +1,111 @@
+import os
+import zipfile
+import tempfile
+from flask import Blueprint, request, jsonify, send_file, current_app
+
+from PIC_api_server.configuration import config
+from PIC_api_server.api.shared import _save_images_to_input_dir, Job, RootAccessAttemptedError
+from PIC_api_server.api.local.upload_images import _check_authentication, _output_format, _profile, InvalidLocalConfiguration, LocalUserDoesNotExistError
+
+local_jobs = Blueprint('jobs', __name__)
+
+
+@local_jobs.route('/local/jobs', methods=['POST'])
+def submit_job():
+    data = request.get_json()
+    if data is None:
+        return 'Data was not in JSON format!', 500
+
+    try:
+        images = data.get(config.CONFIG_JSON_IMAGES)
+        if not isinstance(images, list) or not all(isinstance(image, dict) for image in images):
+            raise InvalidLocalConfiguration(f'{config.CONFIG_JSON_IMAGES} must be a list of images.')
+        save_to, output = _check_authentication(data)
+        auto_clean = config.CONFIG_PIC_AUTO_CLEAN
+        delete = config.CONFIG_PIC_DELETE_WHEN_AUTO_CLEAN
+        sort = config.CONFIG_PIC_SORT_WHEN_AUTO_CLEAN
+        output_format = _output_format(data)
+        profile = _profile(data)
+
+        if delete and sort:
+            raise InvalidLocalConfiguration('It is not allowed to use the delete and sort flags at the same time.')
+
+        job = Job(save_to, output, len(images), auto_clean=auto_clean, delete=delete, sort=sort,
+            output_format=output_format.specification, profile=profile.name)
+        os.makedirs(job.source)
+        os.makedirs(job.output)
+
+        _save_images_to_input_dir(images, job.source)
+        job.commit_to_database()
+    except InvalidLocalConfiguration as config_error:
+        return config_error.message, 400
+    except LocalUserDoesNotExistError as non_existing_user_error:
+        return non_existing_user_error.message, 500
+    except RootAccessAttemptedError as root_error:
+        return root_error.message, 500
+
+    current_app.extensions['job_runner'].notify()
+    return jsonify({ config.CONFIG_JSON_JOB_ID: job.id }), 202
+
+
+@local_jobs.route('/local/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    try:
+        job = _find_job(job_id)
+    except LocalUserDoesNotExistError as non_existing_user_error:
+        return non_existing_user_error.message, 500
+    except RootAccessAttemptedError as root_error:
+        return root_error.message, 500
+    if job is None:
+        return 'Job does not exist', 404
+
+    progress = 1.0 if job.total_images == 0 else job.processed_images / job.total_images
+    return jsonify(
+        {
+            config.CONFIG_JSON_JOB_ID: job.id,
+            config.CONFIG_JSON_JOB_STATUS: job.status,
+            config.CONFIG_JSON_JOB_TOTAL_IMAGES: job.total_images,
+            config.CONFIG_JSON_JOB_PROCESSED_IMAGES: job.processed_images,
+            config.CONFIG_JSON_JOB_FAILED_IMAGES: job.failed_images,
+            config.CONFIG_JSON_JOB_PROGRESS: progress,
+            config.CONFIG_JSON_JOB_ERROR: job.error
+        }
+    )
+
+
+@local_jobs.route('/local/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    try:
+        job = _find_job(job_id)
+    except LocalUserDoesNotExistError as non_existing_user_error:
+        return non_existing_user_error.message, 500
+    except RootAccessAttemptedError as root_error:
+        return root_error.message, 500
+    if job is None:
+        return 'Job does not exist', 404
+    if job.status != Job.STATUS_COMPLETED:
+        return f'Job is not completed, its status is: {job.status}', 409
+
+    archive = tempfile.SpooledTemporaryFile(max_size=config.CONFIG_JOBS_RESULT_SPOOL_SIZE)
+    with zipfile.ZipFile(archive, 'w', compression=zipfile.ZIP_STORED) as result_zip:
+        for file in sorted(os.listdir(job.output)):
+            result_zip.write(os.path.join(job.output, file), arcname=file)
+    archive.seek(0)
+
+    response = send_file(archive, mimetype='application/zip')
+    response.headers['Content-Disposition'] = f'attachment; filename={job.id}.zip'
+    return response
+
+
+def _find_job(job_id):
+    '''
+    PRIVATE FUNCTION: find a job of the user identified by the query parameters, which are the same as the JSON keys
+    used to submit the job. Jobs of other users are not found, so their IDs cannot be used to read them.
+    :param: job_id, the ID of the job.
+    :return: the job or None if it does not exist or belongs to another user.
+    '''
+    save_to, output = _check_authentication(request.args)
+    job = Job.query.get(job_id)
+    if job is None or os.path.dirname(job.source) != save_to or os.path.dirname(job.output) != output:
+        return None
+    return job
@@ -0,0 +1,12 @@
+from flask import Blueprint, Response
+
+from PIC_api_server.api.shared import ConverterService
+
+local_metrics = Blueprint('metrics', __name__)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@local_metrics.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(ConverterService.instance().metrics.to_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
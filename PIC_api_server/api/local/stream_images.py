@@ -0,0 +1,124 @@
+import os
+from collections import deque
+from flask import Blueprint, request, jsonify, Response
+from werkzeug.utils import secure_filename
+
+from PIC_api_server.configuration import config
+from PIC_api_server.api.shared import ConverterService, RootAccessAttemptedError
+from PIC_api_server.api.shared.streaming import iterate_multipart_files, MalformedMultipartError
+from PIC_api_server.api.local.upload_images import _check_authentication, _output_format, _profile, InvalidLocalConfiguration, LocalUserDoesNotExistError
+from PIC.converter.pic import PIC, PICError
+from PIC.converter.encoders import OutputFormat
+from PIC.converter.profiles import ConversionProfile
+
+local_stream_converter = Blueprint('stream_images', __name__)
+
+_PAINTABLE_PREFIX = 'paintable-contours'
+
+
+@local_stream_converter.route('/local/convert_images/stream', methods=['POST'])
+def upload_images_stream():
+    '''
+    Convert images uploaded as binary data instead of Base64 in JSON.\n
+    A multipart/form-data body may contain any number of images, which are converted while the rest of the body
+    is still being received and saved to the output directory. Any other body is treated as a single raw image,
+    named by the 'name' query parameter, and the converted image is returned in the response.
+    The user is identified by the same query parameters as the JSON keys of /local/convert_images.
+    '''
+    try:
+        _, output = _check_authentication(request.args)
+        output_format = _output_format(request.args)
+        profile = _profile(request.args)
+    except InvalidLocalConfiguration as config_error:
+        return config_error.message, 400
+    except LocalUserDoesNotExistError as non_existing_user_error:
+        return non_existing_user_error.message, 500
+    except RootAccessAttemptedError as root_error:
+        return root_error.message, 500
+
+    if request.mimetype == 'multipart/form-data':
+        boundary = request.mimetype_params.get('boundary')
+        if boundary is None:
+            return 'The multipart body has no boundary', 400
+        try:
+            return _convert_multipart(request.stream, boundary, output, output_format, profile)
+        except MalformedMultipartError as multipart_error:
+            return multipart_error.message, 400
+
+    return _convert_raw(request.stream, request.args.get('name', 'image'), output_format, profile)
+
+
+def _convert_multipart(stream, boundary: str, output: str, output_format: OutputFormat, profile: ConversionProfile):
+    '''
+    Convert every file of a multipart body as soon as it has been received.
+    :param: stream, the request body stream.
+    :param: boundary, the multipart boundary.
+    :param: output, the directory to save converted images to.
+    :param: output_format, the OutputFormat to encode converted images with.
+    :param: profile, the ConversionProfile to convert images with.
+    :return: a JSON response listing the output name or error of every image, or a 413 response if an image is larger
+    than CONFIG_STREAM_MAX_IMAGE_SIZE bytes.
+    '''
+    service = ConverterService.instance()
+    os.makedirs(output, exist_ok=True)
+    pending = deque()
+    converted_images = []
+
+    for file_name, part in iterate_multipart_files(stream, boundary):
+        with part:
+            image_bytes = part.read(config.CONFIG_STREAM_MAX_IMAGE_SIZE + 1)
+        if len(image_bytes) > config.CONFIG_STREAM_MAX_IMAGE_SIZE:
+            return f'Images may not be larger than {config.CONFIG_STREAM_MAX_IMAGE_SIZE} bytes: {file_name}', 413
+        pending.append((secure_filename(file_name), service.submit_in_memory(image_bytes, output_format=output_format, profile=profile)))
+        if len(pending) >= config.CONFIG_STREAM_MAX_IN_FLIGHT:
+            converted_images.append(_save_converted_image(*pending.popleft(), output, output_format))
+
+    while len(pending) > 0:
+        converted_images.append(_save_converted_image(*pending.popleft(), output, output_format))
+
+    return jsonify({ config.CONFIG_JSON_IMAGES: converted_images }), 200
+
+
+def _save_converted_image(file_name: str, conversion, output: str, output_format: OutputFormat):
+    '''
+    Wait for a conversion and save its result to the output directory.
+    :param: file_name, the name of the uploaded image.
+    :param: conversion, the Future of the converted image bytes.
+    :param: output, the directory to save the converted image to.
+    :param: output_format, the OutputFormat the image was encoded with.
+    :return: a JSON-serialisable description of the result.
+    '''
+    try:
+        converted_bytes = conversion.result()
+        name, _ = os.path.splitext(PIC.output_file_name(_PAINTABLE_PREFIX, file_name))
+        output_name = name + output_format.ext
+        with open(os.path.join(output, output_name), 'wb') as output_file:
+            output_file.write(converted_bytes)
+    except (PICError, OSError) as error:
+        return { config.CONFIG_JSON_IMAGE_NAME: file_name, config.CONFIG_JSON_IMAGE_ERROR: str(error) }
+
+    return { config.CONFIG_JSON_IMAGE_NAME: file_name, config.CONFIG_JSON_OUTPUT_NAME: output_name }
+
+
+def _convert_raw(stream, file_name: str, output_format: OutputFormat, profile: ConversionProfile):
+    '''
+    Convert a single image sent as the raw request body.
+    :param: stream, the request body stream.
+    :param: file_name, the name of the uploaded image.
+    :param: output_format, the OutputFormat to encode the converted image with.
+    :param: profile, the ConversionProfile to convert the image with.
+    :return: a response containing the converted image.
+    '''
+    image_bytes = stream.read(config.CONFIG_STREAM_MAX_IMAGE_SIZE + 1)
+    if len(image_bytes) > config.CONFIG_STREAM_MAX_IMAGE_SIZE:
+        return f'Images may not be larger than {config.CONFIG_STREAM_MAX_IMAGE_SIZE} bytes', 413
+
+    try:
+        converted_bytes = ConverterService.instance().submit_in_memory(image_bytes, output_format=output_format, profile=profile).result()
+    except PICError as conversion_error:
+        return f'Conversion failed: {conversion_error}', 500
+
+    name, _ = os.path.splitext(secure_filename(file_name))
+    response = Response(converted_bytes, mimetype=output_format.mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={_PAINTABLE_PREFIX}-{name}{output_format.ext}'
+    return response
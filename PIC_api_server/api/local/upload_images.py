@@ -1,9 +1,13 @@
 import os
-from flask import Blueprint, request
+from flask import Blueprint, request, jsonify
 
 from PIC_api_server.configuration import config
 from PIC_api_server.api.shared import _save_images_to_input_dir, _invoke_Python_Image_Converter, User
+from PIC_api_server.api.shared import _decode_images_in_memory, ConverterService, Image
 from PIC_api_server.api.shared import RootAccessAttemptedError
+from PIC.converter.pic import PICError
+from PIC.converter.profiles import get_profile
+from PIC.converter.encoders import OutputFormat
 
 local_image_converter = Blueprint('images', __name__)
 
@@ -25,22 +29,104 @@ def upload_images():
         auto_clean = config.CONFIG_PIC_AUTO_CLEAN
         delete = config.CONFIG_PIC_DELETE_WHEN_AUTO_CLEAN
         sort = config.CONFIG_PIC_SORT_WHEN_AUTO_CLEAN
+        preview_size = _preview_size(data)
+        output_format = _output_format(data)
+        profile = _profile(data)
 
         if delete and sort:
             raise InvalidLocalConfiguration('It is not allowed to use the delete and sort flags at the same time.')
 
         _save_images_to_input_dir(images, save_to)
-        _invoke_Python_Image_Converter((save_to, output, show, auto_clean, delete, sort))
+        failed_images = _invoke_Python_Image_Converter((save_to, output, show, auto_clean, delete, sort, preview_size, output_format, profile))
     except InvalidLocalConfiguration as config_error:
         return config_error.message, 500
     except  LocalUserDoesNotExistError as non_existing_user_error:
         return non_existing_user_error.message, 500
     except RootAccessAttemptedError as root_error:
         return root_error.message, 500
+    except PICError as conversion_error:
+        return f'Conversion failed: {conversion_error}', 500
 
+    if len(failed_images) > 0:
+        return f'Images Converted! {len(failed_images)} image(s) could not be converted.', 200
     return 'Images Converted!', 200
 
 
+@local_image_converter.route('/local/convert_images/memory', methods=['POST'])
+def convert_images_in_memory():
+    data = request.get_json()
+    try:
+        images = _decode_images_in_memory(data.get(config.CONFIG_JSON_IMAGES))
+        _check_authentication(data)
+        results = ConverterService.instance().convert_in_memory(images, output_format=_output_format(data), preview_size=_preview_size(data),
+            profile=_profile(data))
+    except InvalidLocalConfiguration as config_error:
+        return config_error.message, 500
+    except LocalUserDoesNotExistError as non_existing_user_error:
+        return non_existing_user_error.message, 500
+    except RootAccessAttemptedError as root_error:
+        return root_error.message, 500
+
+    converted_images = []
+    for name, converted_bytes, error in results:
+        if error is None:
+            converted_images.append({
+                config.CONFIG_JSON_IMAGE_NAME: name,
+                config.CONFIG_JSON_IMAGE_DATA: Image.encode_bytes_base_64(converted_bytes)
+            })
+        else:
+            converted_images.append({
+                config.CONFIG_JSON_IMAGE_NAME: name,
+                config.CONFIG_JSON_IMAGE_ERROR: error
+            })
+
+    return jsonify({ config.CONFIG_JSON_IMAGES: converted_images }), 200
+
+
+def _preview_size(json_data):
+    '''
+    Get the requested preview size, if any.
+    :param: json_data, the JSON data obtained from the request.
+    :return: the maximum dimension of the previews or None to convert at full resolution.
+    '''
+    preview_size = json_data.get(config.CONFIG_JSON_PREVIEW_SIZE, None)
+    if preview_size is None:
+        return None
+    if not isinstance(preview_size, int) or isinstance(preview_size, bool) or preview_size <= 0: # JSON true is an int in Python
+        raise InvalidLocalConfiguration(f'{config.CONFIG_JSON_PREVIEW_SIZE} must be a positive number of pixels.')
+    return preview_size
+
+
+def _output_format(json_data):
+    '''
+    Get the requested output format, if any.
+    :param: json_data, the JSON data obtained from the request.
+    :return: the OutputFormat to encode converted images with, CONFIG_PIC_OUTPUT_FORMAT if none was requested.
+    '''
+    specification = json_data.get(config.CONFIG_JSON_OUTPUT_FORMAT, config.CONFIG_PIC_OUTPUT_FORMAT)
+    if not isinstance(specification, str):
+        raise InvalidLocalConfiguration(f'{config.CONFIG_JSON_OUTPUT_FORMAT} must be a string like \'png:9\'.')
+    try:
+        return OutputFormat.parse(specification)
+    except ValueError as format_error:
+        raise InvalidLocalConfiguration(str(format_error))
+
+
+def _profile(json_data):
+    '''
+    Get the requested conversion profile, if any.
+    :param: json_data, the JSON data obtained from the request.
+    :return: the ConversionProfile to convert images with, CONFIG_PIC_PROFILE if none was requested.
+    '''
+    name = json_data.get(config.CONFIG_JSON_PROFILE, config.CONFIG_PIC_PROFILE)
+    if not isinstance(name, str):
+        raise InvalidLocalConfiguration(f'{config.CONFIG_JSON_PROFILE} must be the name of a profile like \'fast\'.')
+    try:
+        return get_profile(name)
+    except ValueError as profile_error:
+        raise InvalidLocalConfiguration(str(profile_error))
+
+
 def _check_authentication(json_data):
     '''
     Check if local authentication should be used and return a path based on whether it should or not.
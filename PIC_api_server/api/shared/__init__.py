@@ -1,7 +1,11 @@
 from api.shared.image import Image
-from api.shared.database import db
-from api.shared.run_pic import _invoke_Python_Image_Converter, _save_images_to_input_dir
-from api.shared.user import User, Admin
+from api.shared.database import db, configure_database, add_missing_columns
+from api.shared.run_pic import ConverterService, _invoke_Python_Image_Converter, _save_images_to_input_dir, _decode_images_in_memory
+from api.shared.user import User, Admin, TOKEN_TYPE_ACCESS, TOKEN_TYPE_REFRESH
+from api.shared.provisioning import provision_users, iterate_json_rows, iterate_ndjson_rows, iterate_csv_rows
+from api.shared.provisioning import ProvisioningError, MalformedUserDataError, TooManyUsersError, UserConflictError
+from api.shared.job import Job
+from api.shared.job_runner import JobRunner
 
 class SharedAPIError(Exception):
     def __init__(self, message):
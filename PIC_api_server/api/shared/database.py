@@ -1,3 +1,128 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect, literal
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool, NullPool
+
+from configuration import config
 
 db = SQLAlchemy()
+
+_SQLITE_JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+_SQLITE_SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+
+def configure_database(app):
+    '''
+    Connect the database to a Flask app, using CONFIG_DB_URI and the pool settings of the configuration.
+    SQLite connections are tuned with the CONFIG_DB_SQLITE pragmas when they are opened.
+    :param: app, the Flask app.
+    '''
+    uri = database_uri()
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(uri)
+    db.init_app(app)
+
+    with app.app_context():
+        engine = db.get_engine()
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', _apply_sqlite_pragmas)
+
+
+def database_uri():
+    '''
+    :return: CONFIG_DB_URI, or the URI of the SQLite database at CONFIG_DB_PATH if it is None.
+    '''
+    if config.CONFIG_DB_URI is not None:
+        return config.CONFIG_DB_URI
+    return f'sqlite:///{config.CONFIG_DB_PATH}'
+
+
+def engine_options(uri: str):
+    '''
+    The options to create the engine of a database with.\n
+    SQLAlchemy opens a new connection for every session of a SQLite file by default. Here SQLite connections
+    are pooled like those of database servers, so the pragmas run once per connection instead of once per request.
+    :param: uri, the SQLAlchemy URL of the database.
+    :return: a dictionary of keyword arguments for sqlalchemy.create_engine.
+    '''
+    url = make_url(uri)
+    if url.get_backend_name() != 'sqlite':
+        return _pool_options(pool_pre_ping=config.CONFIG_DB_POOL_PRE_PING)
+    if url.database in (None, '', ':memory:'):
+        return {} # Flask-SQLAlchemy shares a single connection to an in-memory database
+
+    # Pooled connections move between threads, but are only used by one thread at a time
+    connect_args = { 'check_same_thread': False, 'timeout': config.CONFIG_DB_SQLITE_BUSY_TIMEOUT / 1000 }
+    return _pool_options(connect_args=connect_args)
+
+
+def add_missing_columns():
+    '''
+    Add the columns of the models that are missing from the existing tables of the database, as create_all only
+    creates missing tables. Existing rows get the default value of the new columns. Must be called in an app context.
+    :return: a list of the added columns as table.column.
+    '''
+    engine = db.get_engine()
+    inspector = inspect(engine)
+    added_columns = []
+    with engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing_columns = { column['name'] for column in inspector.get_columns(table.name) }
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    connection.exec_driver_sql(_add_column_statement(engine.dialect, table, column))
+                    added_columns.append(f'{table.name}.{column.name}')
+    return added_columns
+
+
+def _add_column_statement(dialect, table, column):
+    '''
+    PRIVATE FUNCTION: the ALTER TABLE statement that adds a column with its default value to an existing table.
+    :return: the statement as a string.
+    '''
+    preparer = dialect.identifier_preparer
+    statement = f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect=dialect)}'
+    if column.default is not None and column.default.is_scalar:
+        default = literal(column.default.arg, column.type).compile(dialect=dialect, compile_kwargs={ 'literal_binds': True })
+        statement += f' DEFAULT {default}'
+    elif not column.nullable:
+        raise ValueError(f'Cannot add the column {table.name}.{column.name} to the database, as it is required and has no '
+            'default value. Set CONFIG_DB_CLEAR to recreate the database.')
+    if not column.nullable:
+        statement += ' NOT NULL'
+    return statement
+
+
+def _pool_options(**options):
+    '''PRIVATE FUNCTION: add the pool settings of the configuration to engine options.'''
+    if config.CONFIG_DB_POOL_SIZE == 0:
+        return dict(options, poolclass=NullPool) # A pool size of 0 would make a QueuePool unbounded
+    options.update(
+        poolclass=QueuePool,
+        pool_size=config.CONFIG_DB_POOL_SIZE,
+        max_overflow=config.CONFIG_DB_POOL_MAX_OVERFLOW,
+        pool_timeout=config.CONFIG_DB_POOL_TIMEOUT,
+        pool_recycle=config.CONFIG_DB_POOL_RECYCLE
+    )
+    return options
+
+
+def _apply_sqlite_pragmas(connection, _):
+    '''PRIVATE FUNCTION: tune a new SQLite connection, registered as a listener of the connect event of the engine.'''
+    journal_mode = config.CONFIG_DB_SQLITE_JOURNAL_MODE.upper()
+    synchronous = config.CONFIG_DB_SQLITE_SYNCHRONOUS.upper()
+    if journal_mode not in _SQLITE_JOURNAL_MODES:
+        raise ValueError(f'Unknown SQLite journal mode: {journal_mode}. Options: {list(_SQLITE_JOURNAL_MODES)}')
+    if synchronous not in _SQLITE_SYNCHRONOUS_MODES:
+        raise ValueError(f'Unknown SQLite synchronous mode: {synchronous}. Options: {list(_SQLITE_SYNCHRONOUS_MODES)}')
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f'PRAGMA busy_timeout = {int(config.CONFIG_DB_SQLITE_BUSY_TIMEOUT)}')
+        cursor.execute(f'PRAGMA journal_mode = {journal_mode}')
+        cursor.execute(f'PRAGMA synchronous = {synchronous}')
+        cursor.execute(f'PRAGMA cache_size = {-int(config.CONFIG_DB_SQLITE_CACHE_SIZE_KB)}')
+    finally:
+        cursor.close()
@@ -47,3 +47,21 @@ class Image(db.Model):
             file_to_save.write(decoded_image_data)
 
         return Image(name=name, path=write_to_path)
+
+    @classmethod
+    def decode_base_64_to_bytes(_, base64_data: bytes) -> bytes:
+        '''
+        Decode Base64 data in memory, without writing it to a file.
+        :param: base64_data, the byte Base64 data.
+        :return: the decoded bytes.
+        '''
+        return base64.decodebytes(base64_data)
+
+    @classmethod
+    def encode_bytes_base_64(_, data: bytes) -> str:
+        '''
+        Encode bytes as Base64 in memory, without reading them from a file.
+        :param: data, the bytes to encode.
+        :return: a UTF-8 representation of the Base64 encoding.
+        '''
+        return base64.b64encode(data).decode('utf-8')
@@ -0,0 +1,137 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from api.shared.database import db
+
+class Job(db.Model):
+    '''A conversion job that is queued in the database and run by the JobRunner'''
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+
+    id = db.Column(db.String(36), primary_key=True)
+    status = db.Column(db.String(16), nullable=False, default=STATUS_QUEUED, index=True)
+    source = db.Column(db.Text, nullable=False)
+    output = db.Column(db.Text, nullable=False)
+    auto_clean = db.Column(db.Boolean, nullable=False, default=False)
+    delete = db.Column(db.Boolean, nullable=False, default=False)
+    sort = db.Column(db.Boolean, nullable=False, default=False)
+    output_format = db.Column(db.String(32), nullable=False, default='jpeg')
+    profile = db.Column(db.String(32), nullable=False, default='balanced')
+    total_images = db.Column(db.Integer, nullable=False, default=0)
+    processed_images = db.Column(db.Integer, nullable=False, default=0)
+    failed_images = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime) # Last time the job runner running the job marked it as alive
+
+    def __init__(self, source, output, total_images, auto_clean=False, delete=False, sort=False, output_format='jpeg', profile='balanced'):
+        '''
+        Initialise a queued job.
+        :param: source, the directory to save uploaded images to. Each job uses its own subdirectory.
+        :param: output, the directory to save converted images to. Each job uses its own subdirectory.
+        :param: total_images, the number of images to convert.
+        :param: auto_clean (optional), a flag indicating whether to clean up the source directory when complete.
+        :param: delete (optional), a flag indicating whether clean up deletes the source files.
+        :param: sort (optional), a flag indicating whether clean up sorts the source files.
+        :param: output_format (optional), the specification of the OutputFormat to encode converted images with. Default: 'jpeg'
+        :param: profile (optional), the name of the conversion profile to convert images with. Default: 'balanced'
+        '''
+        self.id = str(uuid.uuid4())
+        self.status = Job.STATUS_QUEUED
+        self.source = os.path.join(source, self.id)
+        self.output = os.path.join(output, self.id)
+        self.total_images = total_images
+        self.processed_images = 0
+        self.failed_images = 0
+        self.auto_clean = auto_clean
+        self.delete = delete
+        self.sort = sort
+        self.output_format = output_format
+        self.profile = profile
+        self.created_at = datetime.utcnow()
+
+    def __repr__(self) -> str:
+        return f'<Job id={self.id}, status={self.status}/>'
+
+    def commit_to_database(self):
+        db.session.add(self)
+        db.session.commit()
+
+    def is_finished(self):
+        '''
+        :return: True if the job completed or failed.
+        '''
+        return self.status in (Job.STATUS_COMPLETED, Job.STATUS_FAILED)
+
+    @classmethod
+    def claim_next(cls):
+        '''
+        Atomically mark the oldest queued job as running, so that no other worker can run it.
+        :return: the claimed job or None if the queue is empty.
+        '''
+        while True:
+            next_job = cls.query.filter_by(status=Job.STATUS_QUEUED).order_by(cls.created_at).first()
+            if next_job is None:
+                return None
+
+            now = datetime.utcnow()
+            claimed = cls.query.filter_by(id=next_job.id, status=Job.STATUS_QUEUED).update(
+                { 'status': Job.STATUS_RUNNING, 'started_at': now, 'heartbeat_at': now },
+                synchronize_session=False
+            )
+            db.session.commit()
+            if claimed == 1:
+                db.session.refresh(next_job)
+                return next_job
+
+    @classmethod
+    def requeue_interrupted(cls):
+        '''
+        Put jobs that were running when the server stopped back in the queue.
+        :return: the number of requeued jobs.
+        '''
+        return cls._requeue(cls.query.filter_by(status=Job.STATUS_RUNNING))
+
+    @classmethod
+    def requeue_stale(cls, timeout: float):
+        '''
+        Put running jobs whose job runner stopped marking them as alive back in the queue, e.g. because the
+        worker process running them crashed.
+        :param: timeout, the number of seconds since the last heartbeat after which a running job is stale.
+        :return: the number of requeued jobs.
+        '''
+        cutoff = datetime.utcnow() - timedelta(seconds=timeout)
+        # Jobs claimed before heartbeats were recorded fall back to the time they started
+        last_alive = db.func.coalesce(cls.heartbeat_at, cls.started_at)
+        return cls._requeue(cls.query.filter(cls.status == Job.STATUS_RUNNING, last_alive < cutoff))
+
+    @classmethod
+    def heartbeat(cls, job_ids):
+        '''
+        Mark running jobs as alive.
+        :param: job_ids, the IDs of the jobs.
+        '''
+        cls.query.filter(cls.id.in_(job_ids), cls.status == Job.STATUS_RUNNING).update(
+            { 'heartbeat_at': datetime.utcnow() },
+            synchronize_session=False
+        )
+        db.session.commit()
+
+    @classmethod
+    def _requeue(cls, running_jobs):
+        '''
+        PRIVATE METHOD: put running jobs back in the queue.
+        :param: running_jobs, the query selecting the jobs.
+        :return: the number of requeued jobs.
+        '''
+        requeued = running_jobs.update(
+            { 'status': Job.STATUS_QUEUED, 'started_at': None, 'heartbeat_at': None, 'processed_images': 0, 'failed_images': 0 },
+            synchronize_session=False
+        )
+        db.session.commit()
+        return requeued
@@ -0,0 +1,177 @@
+import time
+import logging
+import threading
+from datetime import datetime
+
+from configuration import config
+from api.shared.database import db
+from api.shared.job import Job
+from api.shared.run_pic import ConverterService
+
+class JobRunner:
+    '''Runs queued conversion jobs on a fixed number of background threads.'''
+
+    def __init__(self, app, max_concurrent_jobs: int=config.CONFIG_JOBS_MAX_CONCURRENT,
+        poll_interval: float=config.CONFIG_JOBS_POLL_INTERVAL, heartbeat_interval: float=config.CONFIG_JOBS_HEARTBEAT_INTERVAL,
+        stale_timeout: float=config.CONFIG_JOBS_STALE_TIMEOUT):
+        '''
+        Initialise the job runner.
+        :param: app, the Flask app whose database holds the job queue.
+        :param: max_concurrent_jobs (optional), the maximum number of jobs to run at the same time.
+        :param: poll_interval (optional), the number of seconds between checks of the queue when idle.
+        :param: heartbeat_interval (optional), the number of seconds between the updates that mark the running jobs
+        as alive and the checks for stale jobs.
+        :param: stale_timeout (optional), the number of seconds after which running jobs that were not marked as
+        alive, by this or any other job runner, are requeued.
+        '''
+        self.app = app
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_timeout = stale_timeout
+        self.logger = logging.getLogger('PIC - Job runner')
+        self._wake_up = threading.Condition()
+        self._stopping = False
+        self._stopped = threading.Event()
+        self._threads = []
+        self._running_jobs = set()
+        self._running_jobs_lock = threading.Lock()
+
+    def start(self, requeue_interrupted: bool=True):
+        '''
+        Start the worker threads.
+        :param: requeue_interrupted (optional), a flag indicating whether to requeue jobs that were running
+        when the server last stopped. Default: True
+        '''
+        if requeue_interrupted:
+            with self.app.app_context():
+                requeued = Job.requeue_interrupted()
+                if requeued > 0:
+                    self.logger.info(f'Requeued {requeued} interrupted job(s)')
+
+        for number in range(self.max_concurrent_jobs):
+            thread = threading.Thread(target=self._work, name=f'pic-job-runner-{number}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        thread = threading.Thread(target=self._beat, name='pic-job-heartbeat', daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def notify(self):
+        '''Wake up an idle worker thread because a job was submitted.'''
+        with self._wake_up:
+            self._wake_up.notify()
+
+    def stop(self):
+        '''Stop the worker threads once their current jobs are finished.'''
+        with self._wake_up:
+            self._stopping = True
+            self._wake_up.notify_all()
+        self._stopped.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _work(self):
+        '''PRIVATE METHOD: claim and run queued jobs until the runner is stopped.'''
+        while not self._stopping:
+            with self.app.app_context():
+                try:
+                    job = Job.claim_next()
+                except Exception as error: # The database may be briefly unavailable, e.g. locked by another process
+                    db.session.rollback()
+                    self.logger.error(f'Claiming a job failed: {error}')
+                    job = None
+                if job is not None:
+                    self._run(job)
+                    continue
+
+            with self._wake_up:
+                if not self._stopping:
+                    self._wake_up.wait(self.poll_interval)
+
+    def _beat(self):
+        '''
+        PRIVATE METHOD: mark the running jobs as alive and requeue stale jobs until the runner is stopped.
+        Jobs of a worker process that crashed or was killed stop being marked as alive, so the job runners of the
+        other worker processes requeue them once they are stale instead of leaving them running until a restart.
+        '''
+        while not self._stopped.wait(self.heartbeat_interval):
+            with self.app.app_context():
+                try:
+                    with self._running_jobs_lock:
+                        running_jobs = list(self._running_jobs)
+                    if len(running_jobs) > 0:
+                        Job.heartbeat(running_jobs)
+
+                    requeued = Job.requeue_stale(self.stale_timeout)
+                    if requeued > 0:
+                        self.logger.warning(f'Requeued {requeued} stale job(s)')
+                        with self._wake_up:
+                            self._wake_up.notify(requeued)
+                except Exception as error: # The database may be briefly unavailable, the next heartbeat retries
+                    db.session.rollback()
+                    self.logger.error(f'Job heartbeat failed: {error}')
+
+    def _run(self, job: Job):
+        '''
+        PRIVATE METHOD: convert the images of a claimed job and record the outcome.
+        :param: job, the job to run.
+        '''
+        job_id = job.id # Rolling back expires the job, whose attributes would be loaded from the database again
+        self.logger.info(f'Started job {job_id}')
+        with self._running_jobs_lock:
+            self._running_jobs.add(job_id)
+        progress = _JobProgress(job)
+        try:
+            failed_images = ConverterService.instance().convert(job.source, job.output, False,
+                job.auto_clean, job.delete, job.sort, progress_callback=progress.update, output_format=job.output_format,
+                profile=job.profile)
+            job.failed_images = len(failed_images)
+            job.status = Job.STATUS_COMPLETED
+        except Exception as error:
+            db.session.rollback()
+            job.status = Job.STATUS_FAILED
+            job.error = str(error)
+            self.logger.error(f'Job {job_id} failed: {error}')
+
+        try:
+            job.processed_images = progress.processed_images
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            self.logger.info(f'Finished job {job_id} with status: {job.status}')
+        except Exception as error: # Left running, so the job is requeued once it is stale
+            db.session.rollback()
+            self.logger.error(f'Recording the outcome of job {job_id} failed: {error}')
+        finally:
+            with self._running_jobs_lock:
+                self._running_jobs.discard(job_id)
+
+
+class _JobProgress:
+    '''PRIVATE CLASS: tracks the progress of a running job and writes it to the database at most once per interval.'''
+
+    def __init__(self, job: Job, interval: float=config.CONFIG_JOBS_PROGRESS_INTERVAL):
+        self.job = job
+        self.interval = interval
+        self.processed_images = 0
+        self.failed_images = 0
+        self._last_commit = time.monotonic()
+
+    def update(self, _, error):
+        '''
+        Count a converted image, used as the progress callback of PIC.
+        :param: _, the path of the source image.
+        :param: error, the error raised while converting the image or None if it succeeded.
+        '''
+        self.processed_images += 1
+        if error is not None:
+            self.failed_images += 1
+
+        now = time.monotonic()
+        if now - self._last_commit >= self.interval:
+            self.job.processed_images = self.processed_images
+            self.job.failed_images = self.failed_images
+            db.session.commit()
+            self._last_commit = now
@@ -0,0 +1,225 @@
+import csv
+import json
+from sqlalchemy.exc import IntegrityError
+
+from api.shared.database import db
+from api.shared.user import User
+from configuration import config
+
+_MAX_LINE_SIZE = 64 * 1024
+_MAX_ID = 2 ** 63 - 1 # SQLite integers are signed 64-bit
+_USERNAME_LENGTH = User.username.type.length
+_PASSWORD_LENGTH = 150
+
+
+def iterate_json_rows(users):
+    '''
+    :param: users, the list of users of a JSON request.
+    :return: an iterator of the user objects.
+    '''
+    if not isinstance(users, list):
+        raise MalformedUserDataError(f'The users must be a JSON list under the key {config.CONFIG_JSON_REGISTER_USERS}')
+    return iter(users)
+
+
+def iterate_ndjson_rows(stream):
+    '''
+    Incrementally parse a newline delimited JSON body with one user object per line. Empty lines are skipped.
+    :param: stream, the request body stream.
+    :return: a generator of the parsed lines.
+    '''
+    for line_number, line in _iterate_lines(stream):
+        if line.strip() == '':
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            raise MalformedUserDataError(f'Line {line_number} is not valid JSON')
+
+
+def iterate_csv_rows(stream):
+    '''
+    Incrementally parse a CSV body. The header names the columns with the JSON keys of a user,
+    e.g. user_id,UserName,user_password.
+    :param: stream, the request body stream.
+    :return: a generator of dictionaries mapping the columns of the header to the fields of a row.
+    '''
+    reader = csv.DictReader(line for _, line in _iterate_lines(stream))
+    try:
+        if reader.fieldnames is None:
+            raise MalformedUserDataError('The CSV body has no header')
+        if config.CONFIG_JSON_USER_NAME not in reader.fieldnames:
+            raise MalformedUserDataError(f'The CSV header has no {config.CONFIG_JSON_USER_NAME} column')
+        yield from reader
+    except csv.Error as error:
+        raise MalformedUserDataError(f'Line {reader.line_num} is not valid CSV: {error}')
+
+
+def provision_users(rows, admins: bool=False):
+    '''
+    Create users in bulk.\n
+    All rows are validated and checked for conflicts before any is inserted, then the valid rows are inserted in a
+    single transaction with batched statements. Invalid rows, and rows whose id or name is already taken by an
+    existing user or an earlier row, are rejected without aborting the rest.
+    :param: rows, an iterable of user objects, see iterate_json_rows, iterate_ndjson_rows and iterate_csv_rows.
+    :param: admins (optional), a flag indicating whether to create admins, which require a password hash. The names of
+    other users are lower-cased. Default: False
+    :return: a (created, rejected) tuple of the number of users created and a list of the rejected rows. Each rejected
+    row is described by its 1-based position among the rows, its user name and the reason it was rejected.
+    '''
+    candidates, rejected = _validate(rows, admins)
+    candidates = _reject_existing(candidates, rejected)
+
+    # Explicit ids first, so ids assigned by SQLite cannot collide with an explicit id later in the batch
+    candidates.sort(key=lambda candidate: candidate[1]['id'] is None)
+    mappings = [ mapping for _, mapping in candidates ]
+    try:
+        for batch in _batches(mappings):
+            db.session.execute(User.__table__.insert(), batch)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        raise UserConflictError('Users with the same id or name were created at the same time, please try again.')
+
+    rejected.sort(key=lambda rejection: rejection[config.CONFIG_JSON_ROW])
+    return len(mappings), rejected
+
+
+def _validate(rows, admins: bool):
+    '''
+    PRIVATE FUNCTION: validate rows and reject duplicates within them.
+    :return: a (candidates, rejected) tuple, where candidates is a list of (row, mapping) tuples.
+    '''
+    candidates = []
+    rejected = []
+    ids = set()
+    names = set()
+
+    for row, user in enumerate(rows, start=1):
+        if row > config.CONFIG_AUTH_PROVISION_MAX_ROWS:
+            raise TooManyUsersError(f'At most {config.CONFIG_AUTH_PROVISION_MAX_ROWS} users can be created at once')
+        if not isinstance(user, dict):
+            rejected.append(_rejection(row, None, 'A user must be an object'))
+            continue
+
+        user_name = user.get(config.CONFIG_JSON_USER_NAME)
+        try:
+            user_name = _user_name(user_name, admins)
+            user_id = _user_id(user.get(config.CONFIG_JSON_USER_ID))
+            mapping = { 'id': user_id, 'username': user_name, 'password': _password(user.get(config.CONFIG_JSON_USER_PASSWORD), admins) }
+        except ValueError as error:
+            rejected.append(_rejection(row, user_name, str(error)))
+            continue
+
+        if user_id is not None and user_id in ids:
+            rejected.append(_rejection(row, user_name, f'The id {user_id} appears in an earlier row'))
+        elif user_name in names:
+            rejected.append(_rejection(row, user_name, 'The user name appears in an earlier row'))
+        else:
+            if user_id is not None:
+                ids.add(user_id)
+            names.add(user_name)
+            candidates.append((row, mapping))
+
+    return candidates, rejected
+
+
+def _reject_existing(candidates: list, rejected: list):
+    '''
+    PRIVATE FUNCTION: reject candidates whose id or name is taken by an existing user, with one query per batch.
+    :return: the remaining candidates.
+    '''
+    ids = [ mapping['id'] for _, mapping in candidates if mapping['id'] is not None ]
+    names = [ mapping['username'] for _, mapping in candidates ]
+    existing_ids = set()
+    existing_names = set()
+    for batch in _batches(ids):
+        existing_ids.update(user_id for user_id, in db.session.query(User.id).filter(User.id.in_(batch)))
+    for batch in _batches(names):
+        existing_names.update(user_name for user_name, in db.session.query(User.username).filter(User.username.in_(batch)))
+
+    remaining = []
+    for row, mapping in candidates:
+        if mapping['id'] in existing_ids:
+            rejected.append(_rejection(row, mapping['username'], f'A user with the id {mapping["id"]} already exists'))
+        elif mapping['username'] in existing_names:
+            rejected.append(_rejection(row, mapping['username'], 'A user with this name already exists'))
+        else:
+            remaining.append((row, mapping))
+    return remaining
+
+
+def _user_name(user_name, admins: bool):
+    '''PRIVATE FUNCTION: validate a user name. The names of users that are not admins are lower-cased, like those of /create_users always were.'''
+    if not isinstance(user_name, str) or user_name.strip() == '':
+        raise ValueError('The user name is missing')
+    if len(user_name) > _USERNAME_LENGTH:
+        raise ValueError(f'The user name is longer than {_USERNAME_LENGTH} characters')
+    return user_name if admins else user_name.lower()
+
+
+def _user_id(user_id):
+    '''PRIVATE FUNCTION: validate an optional id, given as a JSON number or a CSV field. None lets the database assign one.'''
+    if user_id is None or user_id == '':
+        return None
+    if isinstance(user_id, str) and user_id.strip().isdigit():
+        user_id = int(user_id)
+    if not isinstance(user_id, int) or isinstance(user_id, bool) or not 0 <= user_id <= _MAX_ID:
+        raise ValueError(f'The id {user_id!r} is not a non-negative integer')
+    return user_id
+
+
+def _password(password, admins: bool):
+    '''PRIVATE FUNCTION: validate the password hash of an admin. Other users have no password.'''
+    if not admins:
+        return None
+    if not isinstance(password, str) or password == '':
+        raise ValueError('The password hash of the admin is missing')
+    if len(password) > _PASSWORD_LENGTH:
+        raise ValueError(f'The password hash is longer than {_PASSWORD_LENGTH} characters')
+    return password
+
+
+def _rejection(row: int, user_name, error: str):
+    '''PRIVATE FUNCTION: describe a rejected row.'''
+    return { config.CONFIG_JSON_ROW: row, config.CONFIG_JSON_USER_NAME: user_name, config.CONFIG_JSON_USER_ERROR: error }
+
+
+def _batches(items: list):
+    '''PRIVATE FUNCTION: split a list into batches of CONFIG_AUTH_PROVISION_BATCH_SIZE items.'''
+    for start in range(0, len(items), config.CONFIG_AUTH_PROVISION_BATCH_SIZE):
+        yield items[start:start + config.CONFIG_AUTH_PROVISION_BATCH_SIZE]
+
+
+def _iterate_lines(stream):
+    '''PRIVATE FUNCTION: decode a UTF-8 body line by line, yielding (line_number, line) tuples. Lines keep their line ending.'''
+    line_number = 0
+    while True:
+        line = stream.readline(_MAX_LINE_SIZE + 1)
+        if len(line) == 0:
+            return
+        line_number += 1
+        if len(line) > _MAX_LINE_SIZE:
+            raise MalformedUserDataError(f'Line {line_number} is longer than {_MAX_LINE_SIZE} bytes')
+        try:
+            line = line.decode('utf-8')
+        except UnicodeDecodeError:
+            raise MalformedUserDataError(f'Line {line_number} is not valid UTF-8')
+        yield line_number, line.lstrip('\ufeff') if line_number == 1 else line
+
+
+class ProvisioningError(Exception):
+    def __init__(self, message):
+        self.message = message
+
+class MalformedUserDataError(ProvisioningError):
+    def __init__(_, message):
+        super().__init__(message)
+
+class TooManyUsersError(ProvisioningError):
+    def __init__(_, message):
+        super().__init__(message)
+
+class UserConflictError(ProvisioningError):
+    def __init__(_, message):
+        super().__init__(message)
@@ -1,13 +1,200 @@
-import os, sys
+import os
+import atexit
+import logging
+import threading
+from concurrent.futures import Future
 
 from configuration import config
 from api.shared import Image
+from PIC.converter.pic import PIC, _convert_in_memory_task
+from PIC.converter.cache import ResultCache
+from PIC.converter.metrics import Metrics
+from PIC.converter.encoders import OutputFormat
+from PIC.converter.parallel import EXECUTION_SERIAL, EXECUTION_PROCESS, EXECUTION_PIPELINE, create_executor
+from PIC.converter.shared_memory import SharedMemoryExecutor
+
+class ConverterService:
+    '''
+    A long-lived Python Image Converter that keeps its worker pool and result cache warm between requests.\n
+    In the 'process' execution mode, images converted in memory are passed to and from the worker processes
+    through shared memory instead of being pickled, see SharedMemoryExecutor.
+    '''
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, execution_mode: str=config.CONFIG_PIC_EXECUTION_MODE, workers: int=config.CONFIG_PIC_WORKERS,
+        metrics_enabled: bool=config.CONFIG_METRICS_ENABLED):
+        '''
+        Initialise the converter service and start its worker pool.
+        :param: execution_mode (optional), the PIC execution mode to use. Default: CONFIG_PIC_EXECUTION_MODE
+        :param: workers (optional), the number of workers in the pool. Default: CONFIG_PIC_WORKERS
+        :param: metrics_enabled (optional), a flag indicating whether to record conversion metrics. Default: CONFIG_METRICS_ENABLED
+        '''
+        self.execution_mode = execution_mode
+        self.workers = workers
+        self.logger = logging.getLogger('PIC - API server')
+        self.metrics = Metrics(enabled=metrics_enabled)
+        self.executor = None
+        self.cache = None
+
+        if self.execution_mode == EXECUTION_PROCESS:
+            self.executor = SharedMemoryExecutor(self.workers)
+        elif self.execution_mode not in (EXECUTION_SERIAL, EXECUTION_PIPELINE):
+            self.executor = create_executor(self.execution_mode, self.workers)
+        if config.CONFIG_PIC_CACHE_DIR is not None:
+            self.cache = ResultCache(os.path.realpath(config.CONFIG_PIC_CACHE_DIR), max_size=config.CONFIG_PIC_CACHE_SIZE_MB * 1024 * 1024)
+
+    @classmethod
+    def instance(cls):
+        '''
+        Get the converter service shared by all requests, creating it on first use.
+        :return: the shared ConverterService.
+        '''
+        with cls._instance_lock:
+            if cls._instance is None:
+                # Read on first use, so every worker process of a server can be given its share of the CPUs
+                cls._instance = ConverterService(workers=config.CONFIG_PIC_WORKERS)
+                atexit.register(cls._instance.shutdown)
+            return cls._instance
+
+    def convert(self, source: str, output: str, show: bool, auto_clean: bool, delete: bool, sort: bool, progress_callback=None,
+        preview_size: int=None, output_format=config.CONFIG_PIC_OUTPUT_FORMAT, profile=config.CONFIG_PIC_PROFILE):
+        '''
+        Convert all images in the source directory in-process.
+        :param: source, the directory to take images from.
+        :param: output, the directory to save converted images to.
+        :param: show, a flag indicating whether to open the output directory when complete.
+        :param: auto_clean, a flag indicating whether to clean up the source directory when complete.
+        :param: delete, a flag indicating whether clean up deletes the source files.
+        :param: sort, a flag indicating whether clean up sorts the source files.
+        :param: progress_callback (optional), a callable receiving (source_path, error) after every image.
+        :param: preview_size (optional), convert previews no larger than this many pixels in either dimension.
+        :param: output_format (optional), an OutputFormat or a string like 'png:9'. Default: CONFIG_PIC_OUTPUT_FORMAT
+        :param: profile (optional), a ConversionProfile or the name of one. Default: CONFIG_PIC_PROFILE
+        :return: a list of (path, reason) tuples of images that failed to convert.
+        '''
+        pic = PIC(self.logger, path_to_images=source, target=output,
+            delete_source_file_when_complete=delete, organise_source_files_when_complete=sort, auto_cleanup=auto_clean,
+            execution_mode=self.execution_mode, workers=self.workers, cache=self.cache, executor=self.executor,
+            progress_callback=progress_callback, preview_size=preview_size, metrics=self.metrics, output_format=output_format,
+            profile=profile)
+        pic.load_images()
+        pic.convert_to_paintable()
+
+        if show and hasattr(os, 'startfile'):
+            os.startfile(os.path.realpath(output))
+
+        return pic.failed_images
+
+    def convert_in_memory(self, images: list, conversion: str=PIC.CONVERSION_PAINTABLE, output_format=config.CONFIG_PIC_OUTPUT_FORMAT,
+        preview_size: int=None, profile=config.CONFIG_PIC_PROFILE):
+        '''
+        Convert encoded images without touching the filesystem.
+        :param: images, a list of (name, image_bytes) tuples.
+        :param: conversion (optional), the name of the conversion. Default: 'paintable'
+        :param: output_format (optional), an OutputFormat or a string like 'png:9'. Default: CONFIG_PIC_OUTPUT_FORMAT
+        :param: preview_size (optional), convert previews no larger than this many pixels in either dimension.
+        :param: profile (optional), a ConversionProfile or the name of one. Default: CONFIG_PIC_PROFILE
+        :return: a list of (name, converted_bytes, error) tuples in the order of the given images, where
+        converted_bytes is None and error describes the problem if the image could not be converted.
+        '''
+        output_format = OutputFormat.parse(output_format)
+        profile = PIC.parse_profile(profile)
+        tasks = [ (image_bytes, conversion, output_format, preview_size, self.metrics.enabled, profile) for _, image_bytes in images ]
+        results = [ None ] * len(tasks)
+        if self.executor is None:
+            for index, task in enumerate(tasks):
+                try:
+                    results[index] = (_convert_in_memory_task(task), None)
+                except Exception as error:
+                    results[index] = (None, error)
+        else:
+            futures = [ self._submit_in_memory_task(task) for task in tasks ]
+            for index, future in enumerate(futures):
+                error = future.exception()
+                results[index] = (future.result() if error is None else None, error)
+
+        results = [ (self._record_in_memory_result(task, result, error), error) for task, (result, error) in zip(tasks, results) ]
+
+        return [ (name, converted_bytes, None if error is None else str(error))
+            for (name, _), (converted_bytes, error) in zip(images, results) ]
+
+    def submit_in_memory(self, image_bytes: bytes, conversion: str=PIC.CONVERSION_PAINTABLE, output_format=config.CONFIG_PIC_OUTPUT_FORMAT,
+        preview_size: int=None, profile=config.CONFIG_PIC_PROFILE):
+        '''
+        Start converting a single encoded image without touching the filesystem.
+        :param: image_bytes, the encoded image.
+        :param: conversion (optional), the name of the conversion. Default: 'paintable'
+        :param: output_format (optional), an OutputFormat or a string like 'png:9'. Default: CONFIG_PIC_OUTPUT_FORMAT
+        :param: preview_size (optional), convert a preview no larger than this many pixels in either dimension.
+        :param: profile (optional), a ConversionProfile or the name of one. Default: CONFIG_PIC_PROFILE
+        :return: a Future of the encoded bytes of the converted image.
+        '''
+        task = (image_bytes, conversion, OutputFormat.parse(output_format), preview_size, self.metrics.enabled, PIC.parse_profile(profile))
+        future = Future()
+        if self.executor is None:
+            try:
+                future.set_result(self._record_in_memory_result(task, _convert_in_memory_task(task), None))
+            except Exception as error:
+                self._record_in_memory_result(task, None, error)
+                future.set_exception(error)
+            return future
+
+        def resolve(task_future):
+            error = task_future.exception()
+            if error is None:
+                future.set_result(self._record_in_memory_result(task, task_future.result(), None))
+            else:
+                self._record_in_memory_result(task, None, error)
+                future.set_exception(error)
+
+        self._submit_in_memory_task(task).add_done_callback(resolve)
+        return future
+
+    def _submit_in_memory_task(self, task: tuple):
+        '''
+        PRIVATE METHOD: run an in-memory conversion on the worker pool, passing the image through shared memory
+        when the workers are processes.
+        :param: task, the task given to _convert_in_memory_task.
+        :return: a Future of the result of the task.
+        '''
+        if isinstance(self.executor, SharedMemoryExecutor):
+            return self.executor.submit_shared(_convert_in_memory_task, task)
+        return self.executor.submit(_convert_in_memory_task, task)
+
+    def _record_in_memory_result(self, task: tuple, result: tuple, error):
+        '''
+        PRIVATE METHOD: add the outcome of an in-memory conversion to the metrics.
+        :param: task, the task given to _convert_in_memory_task.
+        :param: result, the result of the task organised like (converted_bytes, stage_times), or None if it failed.
+        :param: error, the error raised by the task or None if it succeeded.
+        :return: the converted bytes, or None if the conversion failed.
+        '''
+        if error is not None:
+            self.metrics.increment('images_failed')
+            return None
+
+        converted_bytes, stage_times = result
+        if self.metrics.enabled:
+            self.metrics.observe_stages(stage_times)
+            self.metrics.increment('images_converted')
+            self.metrics.increment('bytes_read', len(task[0]))
+            self.metrics.increment('bytes_written', len(converted_bytes))
+        return converted_bytes
+
+    def shutdown(self):
+        '''Stop the worker pool, waiting for running conversions to finish.'''
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
 
 def _invoke_Python_Image_Converter(options: tuple):
     '''
     Parse the options and invoke the Python Image Converter with the relevant arguments.\n
-    Use the currently running python executable to invoke PIC.
-    :param: options, a tuple of options organised like (source, output, show, auto_clean, delete, sort)
+    Conversions run in-process on the shared ConverterService.
+    :param: options, a tuple of options organised like (source, output, show, auto_clean, delete, sort[, preview_size[, output_format[, profile]]])
+    :return: a list of (path, reason) tuples of images that failed to convert.
     '''
     source = options[0]
     output = options[1]
@@ -15,18 +202,23 @@ def _invoke_Python_Image_Converter(options: tuple):
     auto_clean = options[3]
     delete = options[4]
     sort = options[5]
+    preview_size = options[6] if len(options) > 6 else None
+    output_format = options[7] if len(options) > 7 else config.CONFIG_PIC_OUTPUT_FORMAT
+    profile = options[8] if len(options) > 8 else config.CONFIG_PIC_PROFILE
+
+    return ConverterService.instance().convert(source, output, show, auto_clean, delete, sort, preview_size=preview_size,
+        output_format=output_format, profile=profile)
 
-    arguments = f'-i {source} -o {output}'
-    if not show:
-        arguments += f' --noshow'
-    if auto_clean:
-        arguments += f' --auto'
-    if delete:
-        arguments += f' --delete'
-    if sort:
-        arguments += f' --sort'
 
-    os.system(f'{sys.executable} {os.path.realpath(config.CONFIG_PIC_ROOT_SCRIPT)} {arguments}' )
+def _decode_images_in_memory(images):
+    '''
+    Decode uploaded images from Base64 without saving them to disk.
+    :param: images, the list of name, base64 lists of images [[image_name, base64 representation],...]
+    :return: a list of (image_name, image_bytes) tuples.
+    '''
+    return [ (image_data.get(config.CONFIG_JSON_IMAGE_NAME),
+        Image.decode_base_64_to_bytes(image_data.get(config.CONFIG_JSON_IMAGE_DATA).encode('utf-8')))
+        for image_data in images ]
 
 
 def _save_images_to_input_dir(images, path):
@@ -42,4 +234,4 @@ def _save_images_to_input_dir(images, path):
         image_bytes = image_data.get(config.CONFIG_JSON_IMAGE_DATA).encode('utf-8')
         decoded_images.append(Image.decode_base_64(image_bytes, image_name, path))
 
-    return decoded_images
\ No newline at end of file
+    return decoded_images
@@ -0,0 +1,98 @@
+import re
+import tempfile
+
+from configuration import config
+
+_CHUNK_SIZE = 64 * 1024
+_HEADER_END = b'\r\n\r\n'
+_FILENAME_PATTERN = re.compile(r'filename="([^"]*)"')
+
+
+def iterate_multipart_files(stream, boundary: str, spool_size: int=config.CONFIG_STREAM_SPOOL_SIZE):
+    '''
+    Incrementally parse a multipart/form-data body, yielding each file as soon as it has been received.\n
+    Each part is spooled to a temporary file that is kept in memory up to spool_size bytes, so the memory
+    used does not depend on the size of the request.
+    :param: stream, the request body stream.
+    :param: boundary, the multipart boundary from the Content-Type header.
+    :param: spool_size (optional), the number of bytes of a part kept in memory before spilling to disk.
+    :return: a generator of (file_name, file) tuples, where file is positioned at the start of the part.
+    Parts without a file name are skipped.
+    '''
+    delimiter = b'\r\n--' + boundary.encode('latin-1')
+    buffer = bytearray(b'\r\n')
+    finished = False
+
+    def fill():
+        chunk = stream.read(_CHUNK_SIZE)
+        buffer.extend(chunk)
+        return len(chunk) > 0
+
+    # Skip the preamble up to the first delimiter.
+    while True:
+        index = buffer.find(delimiter)
+        if index >= 0:
+            del buffer[:index + len(delimiter)]
+            break
+        del buffer[:max(0, len(buffer) - len(delimiter))]
+        if not fill():
+            raise MalformedMultipartError('The request body does not contain the multipart boundary')
+
+    while not finished:
+        # After a delimiter either the closing '--' or the end of the line follows.
+        while len(buffer) < 2:
+            if not fill():
+                raise MalformedMultipartError('The request body ended unexpectedly')
+        if buffer[:2] == b'--':
+            return
+
+        while buffer.find(_HEADER_END) < 0:
+            if not fill():
+                raise MalformedMultipartError('The request body ended inside the headers of a part')
+        header_end = buffer.find(_HEADER_END)
+        headers = bytes(buffer[:header_end]).decode('utf-8', errors='replace')
+        del buffer[:header_end + len(_HEADER_END)]
+
+        file_name = _file_name(headers)
+        part = tempfile.SpooledTemporaryFile(max_size=spool_size)
+        while True:
+            index = buffer.find(delimiter)
+            if index >= 0:
+                part.write(buffer[:index])
+                del buffer[:index + len(delimiter)]
+                break
+
+            # Keep enough bytes to recognise a delimiter that is split across chunks.
+            keep = len(delimiter) - 1
+            if len(buffer) > keep:
+                part.write(buffer[:len(buffer) - keep])
+                del buffer[:len(buffer) - keep]
+            if not fill():
+                finished = True
+                break
+
+        if finished:
+            part.close()
+            raise MalformedMultipartError('The request body ended inside a part')
+
+        if file_name is None:
+            part.close()
+            continue
+
+        part.seek(0)
+        yield file_name, part
+
+
+def _file_name(headers: str):
+    '''PRIVATE FUNCTION: the file name from the Content-Disposition header of a part, or None.'''
+    for header in headers.split('\r\n'):
+        if header.lower().startswith('content-disposition:'):
+            match = _FILENAME_PATTERN.search(header)
+            if match is not None and match.group(1) != '':
+                return match.group(1)
+    return None
+
+
+class MalformedMultipartError(Exception):
+    def __init__(self, message):
+        self.message = message
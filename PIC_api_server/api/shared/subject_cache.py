@@ -0,0 +1,61 @@
+import time
+import threading
+from collections import OrderedDict
+
+class SubjectCache:
+    '''
+    A bounded, thread-safe cache of token subjects that were recently validated against the database.\n
+    Subjects expire after a fixed time to live, and the least recently validated subjects are evicted first
+    when the cache is full.
+    '''
+
+    def __init__(self, ttl: float, max_size: int):
+        '''
+        :param: ttl, the number of seconds a validated subject is trusted. 0 disables the cache.
+        :param: max_size, the maximum number of subjects in the cache.
+        '''
+        self.ttl = ttl
+        self.max_size = max_size
+        self._expiry_times = OrderedDict()
+        self._lock = threading.Lock()
+
+    def contains(self, subject):
+        '''
+        :param: subject, the subject of a token.
+        :return: True if the subject was validated less than ttl seconds ago and has not been invalidated since.
+        '''
+        with self._lock:
+            expiry_time = self._expiry_times.get(subject)
+            if expiry_time is None:
+                return False
+            if expiry_time <= time.monotonic():
+                del self._expiry_times[subject]
+                return False
+            return True
+
+    def add(self, subject):
+        '''
+        Remember that a subject was validated.
+        :param: subject, the subject of a token.
+        '''
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._expiry_times[subject] = time.monotonic() + self.ttl
+            self._expiry_times.move_to_end(subject)
+            while len(self._expiry_times) > self.max_size:
+                self._expiry_times.popitem(last=False)
+
+    def invalidate(self, subject):
+        '''
+        Forget a subject, e.g. because its user was deleted.
+        :param: subject, the subject of a token.
+        '''
+        with self._lock:
+            self._expiry_times.pop(subject, None)
+
+    def clear(self):
+        '''Forget all subjects.'''
+        with self._lock:
+            self._expiry_times.clear()
@@ -2,8 +2,15 @@ import jwt
 from datetime import datetime, timedelta
 
 from api.shared.database import db
+from api.shared.subject_cache import SubjectCache
 from configuration import config
 
+TOKEN_TYPE_ACCESS = 'access'
+TOKEN_TYPE_REFRESH = 'refresh'
+
+# Subjects of valid auth tokens, so authenticated requests do not query the database every time
+validated_subjects = SubjectCache(config.CONFIG_AUTH_VALIDATION_CACHE_TTL, config.CONFIG_AUTH_VALIDATION_CACHE_SIZE)
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
@@ -20,6 +27,7 @@ class User(db.Model):
     def delete_from_database(self):
         db.session.delete(self)
         db.session.commit()
+        validated_subjects.invalidate(self.id)
 
     @staticmethod
     def find_user_in_database(cls, user_name):
@@ -32,18 +40,70 @@ class User(db.Model):
 
 class Admin(User):
     password = db.Column(db.String(150))
+    # Only refresh tokens of the current version are valid, so bumping it revokes all earlier refresh tokens
+    refresh_token_version = db.Column(db.Integer, nullable=False, default=0)
 
     def __init__(self, id, name, password):
         super().__init__(id, name)
         self.password = password
 
     def generate_user_token(self):
+        return self._generate_token(TOKEN_TYPE_ACCESS, config.CONFIG_AUTH_TOKEN_LIFETIME)
+
+    def generate_refresh_token(self):
+        '''
+        Generate a refresh token of the current refresh token version of this admin.
+        :return: the encoded token.
+        '''
+        return self._generate_token(TOKEN_TYPE_REFRESH, config.CONFIG_AUTH_REFRESH_TOKEN_LIFETIME, ver=self.refresh_token_version)
+
+    def revoke_refresh_tokens(self):
+        '''Revoke all refresh tokens generated for this admin so far.'''
+        Admin.query.filter_by(id=self.id).update(
+            { 'refresh_token_version': Admin.refresh_token_version + 1 },
+            synchronize_session=False
+        )
+        db.session.commit()
+        db.session.refresh(self)
+
+    @classmethod
+    def redeem_refresh_token(cls, token):
+        '''
+        Find the admin of a refresh token and revoke the token, along with all other refresh tokens of the admin.
+        :param: token, the refresh token.
+        :return: the admin or None if the token is invalid, expired or was revoked, or the admin no longer exists.
+        '''
+        payload = Admin._decode_payload(token, TOKEN_TYPE_REFRESH)
+        if payload is None or not isinstance(payload.get('ver'), int):
+            return None
+
+        # Conditional, so only one of several requests with the same token can redeem it
+        redeemed = cls.query.filter(cls.id == payload.get('sub'), cls.refresh_token_version == payload['ver'],
+            cls.password.isnot(None)).update(
+            { 'refresh_token_version': cls.refresh_token_version + 1 },
+            synchronize_session=False
+        )
+        db.session.commit()
+        if redeemed != 1:
+            return None
+        return cls.query.populate_existing().get(payload['sub'])
+
+    def _generate_token(self, token_type: str, lifetime: int, **claims):
+        '''
+        PRIVATE METHOD: generate a signed JWT for this admin.
+        :param: token_type, either TOKEN_TYPE_ACCESS or TOKEN_TYPE_REFRESH.
+        :param: lifetime, the number of seconds the token is valid for.
+        :param: claims (optional), additional claims of the token.
+        :return: the encoded token.
+        '''
         try:
             payload = {
-                'exp': datetime.utcnow() + timedelta(days=0, minutes=1),
+                'exp': datetime.utcnow() + timedelta(seconds=lifetime),
                 'iat': datetime.utcnow(),
-                'sub': self.id
+                'sub': self.id,
+                'type': token_type
             }
+            payload.update(claims)
 
             return jwt.encode(
                 payload,
@@ -55,10 +115,24 @@ class Admin(User):
             print('Could not return JWT token!')
 
     @staticmethod
-    def decode_auth_token(_, token):
+    def decode_auth_token(_, token, token_type: str=TOKEN_TYPE_ACCESS):
+        payload = Admin._decode_payload(token, token_type)
+        return None if payload is None else payload.get('sub', None)
+
+    @staticmethod
+    def _decode_payload(token, token_type: str):
+        '''
+        PRIVATE METHOD: verify a JWT and decode its claims.
+        :param: token, the encoded token.
+        :param: token_type, the type the token must have, either TOKEN_TYPE_ACCESS or TOKEN_TYPE_REFRESH.
+        :return: the claims of the token or None if it is invalid, expired or of another type.
+        '''
         try:
-            payload = jwt.decode(token, config.CONFIG_AUTH_SECRET_KEY_JWT)
-            return payload.get('sub', None)
+            payload = jwt.decode(token, config.CONFIG_AUTH_SECRET_KEY_JWT, algorithms=['HS256'])
+            if payload.get('type', TOKEN_TYPE_ACCESS) != token_type:
+                print(f'Token was not of type {token_type}!')
+                return None
+            return payload
         except jwt.ExpiredSignatureError:
             print('Token expired. New login required!')
         except jwt.InvalidTokenError:
@@ -66,14 +140,17 @@ class Admin(User):
         return None
 
     @staticmethod
-    def validate_auth_token(cls, token):
-        decoded_token = cls.decode_auth_token(cls, token)
+    def validate_auth_token(cls, token, token_type: str=TOKEN_TYPE_ACCESS):
+        decoded_token = cls.decode_auth_token(cls, token, token_type)
 
         if decoded_token is None:
             return False
+        if validated_subjects.contains(decoded_token):
+            return True
         
         user_with_token = User.query.get(decoded_token)
 
         if user_with_token is None:
             return False
+        validated_subjects.add(decoded_token)
         return True
@@ -1,3 +1,5 @@
+import secrets
+import functools
 from flask import Blueprint, request, jsonify
 
 from werkzeug import security
@@ -13,7 +15,8 @@ def check_payload():
     json_data = request.get_json()
 
     if json_data is None:
-        return 'No JSON data found!', 200
+        # The older routes answer with 200 for compatibility, /refresh rejects a missing or non-JSON body
+        return 'No JSON data found!', 400 if request.endpoint == 'authenticate_user.refresh' else 200
 
 
 @authenticate_user.route('/login', methods=['POST'])
@@ -23,27 +26,62 @@ def login():
     user_name = json_data.get(config.CONFIG_JSON_USER_NAME)
     user_password = json_data.get(config.CONFIG_JSON_USER_PASSWORD)
 
-    all_users = Admin.query.all()
+    to_log_in = Admin.find_user_in_database(Admin, user_name)
+    if to_log_in is not None and to_log_in.password is None:
+        to_log_in = None # A user without a password is not an admin
 
-    to_log_in = None
-    for user in all_users:
-        if security.check_password_hash(user.username, user_name):
-            to_log_in = user
-            break
+    # Verify exactly one hash per attempt, also for unknown users, so every attempt costs the same
+    password_hash = _dummy_password_hash() if to_log_in is None else to_log_in.password
+    password_matches = security.check_password_hash(password_hash, user_password if isinstance(user_password, str) else '')
 
     if to_log_in is None:
         return 'User does not exist', 200
     
-    if security.check_password_hash(to_log_in.password, user_password):
+    if password_matches:
         user_token = to_log_in.generate_user_token()
+        to_log_in.revoke_refresh_tokens() # An admin has one valid refresh token at a time
+        refresh_token = to_log_in.generate_refresh_token()
         return jsonify(
             {
-                config.CONFIG_JSON_AUTH_TOKEN: user_token.decode()
+                config.CONFIG_JSON_AUTH_TOKEN: user_token.decode(),
+                config.CONFIG_JSON_REFRESH_TOKEN: refresh_token.decode()
             }
         )
     return 'Incorrect password!', 200
 
 
+@authenticate_user.route('/refresh', methods=['POST'])
+def refresh():
+    json_data = request.get_json()
+    refresh_token = json_data.get(config.CONFIG_JSON_REFRESH_TOKEN) if isinstance(json_data, dict) else None
+    if not isinstance(refresh_token, str):
+        return f'Could not find {config.CONFIG_JSON_REFRESH_TOKEN}', 400
+
+    # Refreshing issues new tokens without verifying the password hash again. Redeeming the refresh token revokes
+    # it, so a stolen refresh token stops working once either its thief or the admin used it.
+    to_refresh = Admin.redeem_refresh_token(refresh_token)
+    if to_refresh is None:
+        return 'Refresh token was invalid, please log in again.', 200
+
+    user_token = to_refresh.generate_user_token()
+    new_refresh_token = to_refresh.generate_refresh_token()
+    return jsonify(
+        {
+            config.CONFIG_JSON_AUTH_TOKEN: user_token.decode(),
+            config.CONFIG_JSON_REFRESH_TOKEN: new_refresh_token.decode()
+        }
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _dummy_password_hash():
+    '''
+    PRIVATE FUNCTION: a hash of a random password, verified instead of a password hash when a user does not exist.
+    :return: a password hash generated with CONFIG_AUTH_HASH_METHOD, like the hashes of /hash.
+    '''
+    return security.generate_password_hash(secrets.token_hex(16), method=config.CONFIG_AUTH_HASH_METHOD)
+
+
 
 @authenticate_user.route('/hash', methods=['POST'])
 def generate_hash():
@@ -1,21 +1,28 @@
-from flask import Blueprint, request
-from werkzeug.security import generate_password_hash
+from flask import Blueprint, request, jsonify
 
-from PIC_api_server.api.shared import User, Admin
+from PIC_api_server.api.shared import Admin, provision_users, iterate_json_rows, iterate_ndjson_rows, iterate_csv_rows
+from PIC_api_server.api.shared import MalformedUserDataError, TooManyUsersError, UserConflictError
 from PIC_api_server.configuration import config
 
 
 create_users_blueprint = Blueprint('create_users', __name__)
 
+_CSV_MIMETYPES = ('text/csv',)
+_NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
 
 @create_users_blueprint.before_request
 def authenticate():
-    json_data = request.get_json()
+    # Streamed bodies are not JSON, so their auth token is passed as a query parameter
+    if request.mimetype in _CSV_MIMETYPES + _NDJSON_MIMETYPES:
+        credentials = request.args
+    else:
+        credentials = request.get_json()
 
-    if json_data is None:
+    if credentials is None:
         return 'No user data was provided', 200
 
-    auth_token = json_data.get(config.CONFIG_JSON_AUTH_TOKEN)
+    auth_token = credentials.get(config.CONFIG_JSON_AUTH_TOKEN)
     if not Admin.validate_auth_token(Admin, auth_token):
         return 'Authentication token was invalid, please log in again.', 200
 
@@ -23,35 +30,48 @@ def authenticate():
 
 @create_users_blueprint.route('/create_users', methods=['POST'])
 def create_users():
-    data = request.get_json()
-
-    users = data.get(config.CONFIG_JSON_REGISTER_USERS)
-    for user in users:
-        user_id = user.get(config.CONFIG_JSON_USER_ID, None)
-        user_name = user.get(config.CONFIG_JSON_USER_NAME).lower()
-        new_user = User(user_id, user_name)
-        new_user.commit_to_database()
-        if User.query.filter_by(username=user_name) is None:
-            return 'User not created', 500
-            
-    print('Correctly created users!')
-    return 'Users created', 200
+    '''
+    Create users from a JSON list, or from a CSV or newline delimited JSON body streamed with the
+    text/csv or application/x-ndjson content type. See _create_in_bulk.
+    '''
+    return _create_in_bulk(admins=False)
 
 
 
 @create_users_blueprint.route('/create_admins', methods=['POST'])
 def create_admins():
-    data = request.get_json()
-
-    users = data.get(config.CONFIG_JSON_REGISTER_USERS)
-    for user in users:
-        user_id = user.get(config.CONFIG_JSON_USER_ID, None)
-        user_name = user.get(config.CONFIG_JSON_USER_NAME)
-        user_password = user.get(config.CONFIG_JSON_USER_PASSWORD)
-        new_admin = Admin(user_id, user_name, user_password)
-        new_admin.commit_to_database()
-        if Admin.query.filter_by(username=user_name) is None:
-            return 'Admin not created', 500
-            
-    print('Correctly created admins!')
-    return 'Admins created', 200
+    '''
+    Create admins like /create_users. Every admin needs a password hash, generated with /hash.
+    '''
+    return _create_in_bulk(admins=True)
+
+
+def _create_in_bulk(admins: bool):
+    '''
+    Create the users of the request in a single transaction. Rows that are invalid or conflict with an existing
+    user or an earlier row are reported without aborting the others.
+    :param: admins, a flag indicating whether to create admins.
+    :return: a JSON response with the number of users created and the rejected rows.
+    '''
+    try:
+        if request.mimetype in _CSV_MIMETYPES:
+            rows = iterate_csv_rows(request.stream)
+        elif request.mimetype in _NDJSON_MIMETYPES:
+            rows = iterate_ndjson_rows(request.stream)
+        else:
+            rows = iterate_json_rows(request.get_json().get(config.CONFIG_JSON_REGISTER_USERS))
+        created, rejected = provision_users(rows, admins)
+    except MalformedUserDataError as malformed_error:
+        return malformed_error.message, 400
+    except TooManyUsersError as size_error:
+        return size_error.message, 413
+    except UserConflictError as conflict_error:
+        return conflict_error.message, 409
+
+    print(f'Created {created} {"admins" if admins else "users"}, rejected {len(rejected)}!')
+    return jsonify(
+        {
+            config.CONFIG_JSON_CREATED_USERS: created,
+            config.CONFIG_JSON_REJECTED_USERS: rejected
+        }
+    ), 200
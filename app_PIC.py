@@ -1,7 +1,14 @@
+import json
 import logging
-import sys, getopt, os
+import sys, getopt, os, signal
 
 from PIC.converter.pic import PIC, ConflictingCompletionActionsError, NoImagesFoundError, SaveError, FailedDirectoryCreationError
+from PIC.converter.pic import InvalidExecutionModeError, InvalidOutputFormatError, InvalidBatchError, InvalidVideoOptionsError
+from PIC.converter.pic import UnknownConversionError, InvalidProfileError
+from PIC.converter.cache import ResultCache
+from PIC.converter.metrics import Metrics
+from PIC.converter.manifest import Manifest, MANIFEST_FILE_NAME
+from PIC.converter.watcher import FolderWatcher, DEFAULT_POLL_INTERVAL, DEFAULT_SETTLE_TIME
 
 # =====================Command line argument definitions=====================
 ARGV_HELP = 'h'
@@ -18,6 +25,32 @@ ARGV_CLEANUP_AUTO = 'a'
 ARGV_CLEANUP_AUTO_LONG = 'auto'
 ARGV_COMPLETE_NO_SHOW = 'ns'
 ARGV_COMPLETE_NO_SHOW_LONG = 'noshow'
+ARGV_EXECUTION_MODE = 'm'
+ARGV_EXECUTION_MODE_LONG = 'mode'
+ARGV_WORKERS = 'w'
+ARGV_WORKERS_LONG = 'workers'
+ARGV_QUEUE_SIZE_LONG = 'queue-size'
+ARGV_CACHE_DIR_LONG = 'cache-dir'
+ARGV_CACHE_SIZE_LONG = 'cache-size'
+ARGV_TILE_HEIGHT_LONG = 'tile-height'
+ARGV_PREVIEW_LONG = 'preview'
+ARGV_METRICS_LONG = 'metrics'
+ARGV_RECURSIVE = 'r'
+ARGV_RECURSIVE_LONG = 'recursive'
+ARGV_INCREMENTAL_LONG = 'incremental'
+ARGV_WATCH_LONG = 'watch'
+ARGV_POLL_INTERVAL_LONG = 'poll-interval'
+ARGV_SETTLE_TIME_LONG = 'settle-time'
+ARGV_MANIFEST_LONG = 'manifest'
+ARGV_OUTPUT_FORMAT = 'f'
+ARGV_OUTPUT_FORMAT_LONG = 'format'
+ARGV_BATCH_SIZE_LONG = 'batch-size'
+ARGV_EVERY_NTH_FRAME_LONG = 'every-nth-frame'
+ARGV_FRAME_SEQUENCE_LONG = 'frame-sequence'
+ARGV_ALGORITHM_LONG = 'algorithm'
+ARGV_DOWNSCALE_LONG = 'downscale'
+ARGV_PROFILE = 'p'
+ARGV_PROFILE_LONG = 'profile'
 
 # =====================Setup functions=====================
 def setup_logger():
@@ -56,6 +89,21 @@ def usage():
     usage_string += f' [-{ARGV_CLEANUP_ORGANISE}/--{ARGV_CLEANUP_ORGANISE_LONG}]'
     usage_string += f' [-{ARGV_CLEANUP_AUTO}/--{ARGV_CLEANUP_AUTO_LONG}]'
     usage_string += f' [-{ARGV_COMPLETE_NO_SHOW}/--{ARGV_COMPLETE_NO_SHOW_LONG}]'
+    usage_string += f' [-{ARGV_EXECUTION_MODE}/--{ARGV_EXECUTION_MODE_LONG} <serial|thread|process|pipeline>]'
+    usage_string += f' [-{ARGV_WORKERS}/--{ARGV_WORKERS_LONG} <number_of_workers>]'
+    usage_string += f' [--{ARGV_QUEUE_SIZE_LONG} <images_buffered_per_pipeline_stage>]'
+    usage_string += f' [--{ARGV_CACHE_DIR_LONG} <result_cache_directory> [--{ARGV_CACHE_SIZE_LONG} <max_cache_size_in_MB>]]'
+    usage_string += f' [--{ARGV_TILE_HEIGHT_LONG} <rows_converted_at_a_time>]'
+    usage_string += f' [--{ARGV_BATCH_SIZE_LONG} <same_resolution_images_converted_at_a_time>]'
+    usage_string += f' [--{ARGV_EVERY_NTH_FRAME_LONG} <video_frame_step>] [--{ARGV_FRAME_SEQUENCE_LONG}]'
+    usage_string += f' [--{ARGV_PREVIEW_LONG} <max_preview_dimension>]'
+    usage_string += f' [-{ARGV_PROFILE}/--{ARGV_PROFILE_LONG} <fast|balanced|high-quality>]'
+    usage_string += f' [--{ARGV_ALGORITHM_LONG} <standard|fast> [--{ARGV_DOWNSCALE_LONG} <factor_before_thresholding>]]'
+    usage_string += f' [-{ARGV_OUTPUT_FORMAT}/--{ARGV_OUTPUT_FORMAT_LONG} <jpeg[:quality]|png[:compression]|png-bilevel[:compression]|tiff-g4|webp-lossless>]'
+    usage_string += f' [--{ARGV_METRICS_LONG} <metrics_json_file|->]'
+    usage_string += f' [-{ARGV_RECURSIVE}/--{ARGV_RECURSIVE_LONG}]'
+    usage_string += f' [--{ARGV_INCREMENTAL_LONG}]'
+    usage_string += f' [--{ARGV_WATCH_LONG} [--{ARGV_POLL_INTERVAL_LONG} <seconds>] [--{ARGV_SETTLE_TIME_LONG} <seconds>] [--{ARGV_MANIFEST_LONG} <manifest_file>]]'
     usage_string += '\n'
     usage_string += f'Where -{ARGV_CLEANUP_DELETE} and -{ARGV_CLEANUP_ORGANISE} cannot be used simultaneously'
     
@@ -73,6 +121,7 @@ def parse_arguments(argv, logger: logging.Logger):
     # Setup option strings/lists and parse arguments.
     try:
         option_string = f'{ARGV_INPUT}:{ARGV_OUTPUT}:{ARGV_HELP}{ARGV_CLEANUP_DELETE}{ARGV_CLEANUP_ORGANISE}{ARGV_CLEANUP_AUTO}{ARGV_COMPLETE_NO_SHOW}'
+        option_string += f'{ARGV_EXECUTION_MODE}:{ARGV_WORKERS}:{ARGV_RECURSIVE}{ARGV_OUTPUT_FORMAT}:{ARGV_PROFILE}:'
         long_options = [ 
             ARGV_INPUT_LONG + '=', 
             ARGV_OUTPUT_LONG + '=',
@@ -80,7 +129,28 @@ def parse_arguments(argv, logger: logging.Logger):
             ARGV_CLEANUP_DELETE_LONG, 
             ARGV_CLEANUP_ORGANISE_LONG, 
             ARGV_CLEANUP_AUTO_LONG,
-            ARGV_COMPLETE_NO_SHOW_LONG
+            ARGV_COMPLETE_NO_SHOW_LONG,
+            ARGV_EXECUTION_MODE_LONG + '=',
+            ARGV_WORKERS_LONG + '=',
+            ARGV_QUEUE_SIZE_LONG + '=',
+            ARGV_CACHE_DIR_LONG + '=',
+            ARGV_CACHE_SIZE_LONG + '=',
+            ARGV_TILE_HEIGHT_LONG + '=',
+            ARGV_PREVIEW_LONG + '=',
+            ARGV_METRICS_LONG + '=',
+            ARGV_RECURSIVE_LONG,
+            ARGV_INCREMENTAL_LONG,
+            ARGV_WATCH_LONG,
+            ARGV_POLL_INTERVAL_LONG + '=',
+            ARGV_SETTLE_TIME_LONG + '=',
+            ARGV_MANIFEST_LONG + '=',
+            ARGV_OUTPUT_FORMAT_LONG + '=',
+            ARGV_BATCH_SIZE_LONG + '=',
+            ARGV_EVERY_NTH_FRAME_LONG + '=',
+            ARGV_FRAME_SEQUENCE_LONG,
+            ARGV_ALGORITHM_LONG + '=',
+            ARGV_DOWNSCALE_LONG + '=',
+            ARGV_PROFILE_LONG + '='
         ]
     
         options, _ = getopt.getopt(argv, option_string, long_options)
@@ -95,6 +165,13 @@ def parse_arguments(argv, logger: logging.Logger):
     organise = False
     auto_cleanup = False
     no_show = False
+    conversion_options = {}
+    cache_dir = None
+    cache_size = ResultCache.DEFAULT_MAX_SIZE
+    metrics_path = None
+    incremental = False
+    watch = False
+    watch_options = { 'poll_interval': DEFAULT_POLL_INTERVAL, 'settle_time': DEFAULT_SETTLE_TIME, 'manifest': None }
 
     # Identify each option and its associated value
     for option, value in options:
@@ -125,8 +202,93 @@ def parse_arguments(argv, logger: logging.Logger):
             auto_cleanup = True
         elif option in (f'-{ARGV_COMPLETE_NO_SHOW}', f'--{ARGV_COMPLETE_NO_SHOW_LONG}'): # User specified to noshow flag
             no_show = True
+        elif option in (f'-{ARGV_EXECUTION_MODE}', f'--{ARGV_EXECUTION_MODE_LONG}'): # User specified the execution mode
+            conversion_options['execution_mode'] = value
+        elif option in (f'-{ARGV_WORKERS}', f'--{ARGV_WORKERS_LONG}'): # User specified the number of workers
+            try:
+                conversion_options['workers'] = int(value)
+            except ValueError:
+                logger.error(f'The number of workers must be a whole number! {help}')
+                sys.exit(2)
+        elif option == f'--{ARGV_QUEUE_SIZE_LONG}': # User specified the pipeline queue size
+            try:
+                conversion_options['queue_size'] = int(value)
+            except ValueError:
+                logger.error(f'The queue size must be a whole number! {help}')
+                sys.exit(2)
+        elif option == f'--{ARGV_CACHE_DIR_LONG}': # User specified a result cache directory
+            cache_dir = os.path.realpath(value)
+        elif option == f'--{ARGV_CACHE_SIZE_LONG}': # User specified the maximum size of the result cache
+            try:
+                cache_size = int(value) * 1024 * 1024
+            except ValueError:
+                logger.error(f'The cache size must be a whole number of megabytes! {help}')
+                sys.exit(2)
+        elif option == f'--{ARGV_TILE_HEIGHT_LONG}': # User specified to convert large images in strips
+            try:
+                conversion_options['tile_height'] = int(value)
+            except ValueError:
+                logger.error(f'The tile height must be a whole number of rows! {help}')
+                sys.exit(2)
+        elif option == f'--{ARGV_BATCH_SIZE_LONG}': # User specified to convert images of the same resolution together
+            try:
+                conversion_options['batch_size'] = int(value)
+            except ValueError:
+                logger.error(f'The batch size must be a whole number of images! {help}')
+                sys.exit(2)
+        elif option == f'--{ARGV_EVERY_NTH_FRAME_LONG}': # User specified to convert only some frames of videos
+            try:
+                conversion_options['every_nth_frame'] = int(value)
+            except ValueError:
+                logger.error(f'Every nth frame must be a whole number of frames! {help}')
+                sys.exit(2)
+        elif option == f'--{ARGV_FRAME_SEQUENCE_LONG}': # User asked to save converted videos as numbered frames
+            conversion_options['frame_sequence'] = True
+        elif option in (f'-{ARGV_PROFILE}', f'--{ARGV_PROFILE_LONG}'): # User specified the kernel sizes and pre-scale of the conversion
+            conversion_options['profile'] = value
+        elif option == f'--{ARGV_ALGORITHM_LONG}': # User specified the paintable contours algorithm
+            conversion_options['algorithm'] = value
+        elif option == f'--{ARGV_DOWNSCALE_LONG}': # User specified to threshold downscaled images with the fast algorithm
+            try:
+                conversion_options['downscale'] = float(value)
+            except ValueError:
+                logger.error(f'The downscale factor must be a number between 0 and 1! {help}')
+                sys.exit(2)
+        elif option == f'--{ARGV_PREVIEW_LONG}': # User specified to convert previews
+            try:
+                conversion_options['preview_size'] = int(value)
+            except ValueError:
+                logger.error(f'The preview size must be a whole number of pixels! {help}')
+                sys.exit(2)
+        elif option == f'--{ARGV_METRICS_LONG}': # User asked for a metrics summary, '-' prints it to stdout
+            conversion_options['metrics'] = Metrics()
+            metrics_path = value if value == '-' else os.path.realpath(value)
+        elif option in (f'-{ARGV_RECURSIVE}', f'--{ARGV_RECURSIVE_LONG}'): # User asked to include subdirectories
+            conversion_options['recursive'] = True
+        elif option == f'--{ARGV_INCREMENTAL_LONG}': # User asked to skip images that were already converted
+            incremental = True
+        elif option == f'--{ARGV_WATCH_LONG}': # User asked to keep watching the source directory
+            watch = True
+        elif option in (f'--{ARGV_POLL_INTERVAL_LONG}', f'--{ARGV_SETTLE_TIME_LONG}'): # User specified the watch timings
+            try:
+                seconds = float(value)
+            except ValueError:
+                logger.error(f'The poll interval and settle time must be a number of seconds! {help}')
+                sys.exit(2)
+            watch_options['poll_interval' if option == f'--{ARGV_POLL_INTERVAL_LONG}' else 'settle_time'] = seconds
+        elif option == f'--{ARGV_MANIFEST_LONG}': # User specified where to keep the manifest of processed files
+            watch_options['manifest'] = os.path.realpath(value)
+        elif option in (f'-{ARGV_OUTPUT_FORMAT}', f'--{ARGV_OUTPUT_FORMAT_LONG}'): # User specified how to encode converted images
+            conversion_options['output_format'] = value
+
+    if cache_dir is not None:
+        conversion_options['cache'] = ResultCache(cache_dir, max_size=cache_size)
+    if incremental and not watch: # The watcher keeps its own manifest
+        manifest_path = watch_options['manifest'] or os.path.join(output_dir or os.path.realpath(PIC.BASE_TARGET_DIR), MANIFEST_FILE_NAME)
+        conversion_options['manifest'] = Manifest(manifest_path)
         
-    return (no_show, source_dir, output_dir, delete, organise, auto_cleanup, logger) # Results
+    return (no_show, source_dir, output_dir, delete, organise, auto_cleanup, logger, conversion_options, metrics_path,
+        watch_options if watch else None) # Results
 
 
 def open_in_explorer(path: str):
@@ -142,14 +304,60 @@ def build_PIC(*args):
     if len(args) < 6:
         raise InvalidArgumentsError('One or more of the given arguments were invalid')
 
+    options = args[6] if len(args) > 6 else {}
+
     if args[0] is None and args[1] is not None:
-        return PIC(args[5], target=args[1], delete_source_file_when_complete=args[2], organise_source_files_when_complete=args[3], auto_cleanup=args[4])
+        return PIC(args[5], target=args[1], delete_source_file_when_complete=args[2], organise_source_files_when_complete=args[3], auto_cleanup=args[4], **options)
     elif args[1] is None and args[0] is not None:
-        return PIC(args[5], path_to_images=args[0], delete_source_file_when_complete=args[2], organise_source_files_when_complete=args[3], auto_cleanup=args[4])
+        return PIC(args[5], path_to_images=args[0], delete_source_file_when_complete=args[2], organise_source_files_when_complete=args[3], auto_cleanup=args[4], **options)
     elif args[1] is not None and args[0] is not None:
-        return PIC(args[5], path_to_images=args[0], target=args[1], delete_source_file_when_complete=args[2], organise_source_files_when_complete=args[3], auto_cleanup=args[4])
+        return PIC(args[5], path_to_images=args[0], target=args[1], delete_source_file_when_complete=args[2], organise_source_files_when_complete=args[3], auto_cleanup=args[4], **options)
     else:
-        return PIC(args[5], delete_source_file_when_complete=args[2], organise_source_files_when_complete=args[3], auto_cleanup=args[4])
+        return PIC(args[5], delete_source_file_when_complete=args[2], organise_source_files_when_complete=args[3], auto_cleanup=args[4], **options)
+
+
+def write_metrics_summary(metrics: Metrics, path: str, logger: logging.Logger):
+    '''
+    Write the JSON summary of the recorded metrics.
+    :param: metrics, the metrics of the conversion.
+    :param: path, the file to write the summary to, or '-' to print it to stdout.
+    :param: logger, the logger of the application.
+    '''
+    summary = json.dumps(metrics.summary(), indent=4)
+    if path == '-':
+        print(summary)
+        return
+
+    try:
+        with open(path, 'w') as metrics_file:
+            metrics_file.write(summary)
+    except OSError:
+        logger.error(f'Could not write the metrics summary to: {path}')
+        return
+    logger.info(f'Metrics summary written to: {path}')
+
+
+def watch_source_directory(pic: PIC, watch_options: dict, logger: logging.Logger):
+    '''
+    Convert new images in the source directory as they arrive, until the application is interrupted or terminated.
+    :param: pic, the Python Image Converter to convert images with.
+    :param: watch_options, a dictionary with the poll_interval, settle_time and manifest path.
+    :param: logger, the logger of the application.
+    '''
+    manifest_path = watch_options['manifest'] or os.path.join(pic.target, MANIFEST_FILE_NAME)
+    watcher = FolderWatcher(pic, Manifest(manifest_path), poll_interval=watch_options['poll_interval'],
+        settle_time=watch_options['settle_time'])
+    signal.signal(signal.SIGTERM, lambda *_: watcher.stop())
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        logger.info('Stopped watching the source directory')
+
+    failed_images = watcher.manifest.failed()
+    if len(failed_images) > 0:
+        logger.warning(f'{len(failed_images)} image(s) could not be converted:')
+        for path, reason in failed_images:
+            logger.warning(f'{path}: {reason}')
 
 
 def execute_completion_behaviour(no_show: bool, path: str, logger: logging.Logger):
@@ -175,12 +383,39 @@ def main(argv):
     parsed_arguments = parse_arguments(argv, logger)
     try:
         pic = build_PIC(*parsed_arguments[1:])
-        pic.load_images()
-        pic.convert_to_paintable()
+        if parsed_arguments[9] is not None:
+            watch_source_directory(pic, parsed_arguments[9], logger)
+        else:
+            pic.load_images()
+            pic.convert_to_paintable()
     except InvalidArgumentsError:
         logger.error('One or more of the given arguments were invalid')
         logger.info(usage())
         sys.exit(2)
+    except InvalidExecutionModeError as mode_error:
+        logger.error(f'Invalid execution mode! {mode_error}')
+        logger.info(usage())
+        sys.exit(2)
+    except InvalidBatchError as batch_error:
+        logger.error(f'Invalid batch size! {batch_error}')
+        logger.info(usage())
+        sys.exit(2)
+    except UnknownConversionError as conversion_error:
+        logger.error(f'Invalid conversion! {conversion_error}')
+        logger.info(usage())
+        sys.exit(2)
+    except InvalidProfileError as profile_error:
+        logger.error(f'Invalid conversion profile! {profile_error}')
+        logger.info(usage())
+        sys.exit(2)
+    except InvalidVideoOptionsError as video_error:
+        logger.error(f'Invalid video options! {video_error}')
+        logger.info(usage())
+        sys.exit(2)
+    except InvalidOutputFormatError as format_error:
+        logger.error(f'Invalid output format! {format_error}')
+        logger.info(usage())
+        sys.exit(2)
     except ConflictingCompletionActionsError:
         logger.error('You cannot use both the cleanup delete and cleanup organise flags, please use eiter one or the other')
         logger.info(usage())
@@ -196,6 +431,17 @@ def main(argv):
         logger.error('Failed to create source or target directory! Try running with elevated priviliges\nTry navigating to the directory of app.py\nIf this issue persists, specify the directories manually')
         sys.exit(2)
 
+    if parsed_arguments[9] is None and len(pic.failed_images) > 0:
+        logger.warning(f'{len(pic.failed_images)} image(s) could not be converted:')
+        for path, reason in pic.failed_images:
+            logger.warning(f'{path}: {reason}')
+
+    if parsed_arguments[8] is not None:
+        write_metrics_summary(pic.metrics, parsed_arguments[8], logger)
+
+    if parsed_arguments[9] is not None:
+        return
+
     execute_completion_behaviour(parsed_arguments[0], parsed_arguments[2], logger)
 
 
@@ -1,26 +1,32 @@
-import sys, getopt
+import os, sys, getopt
 
 from flask import Flask
 from werkzeug import security
 
 from PIC_api_server.api import db
-from PIC_api_server.api.local import local_image_converter
-from PIC_api_server.api.shared import Admin
+from PIC_api_server.api.local import local_image_converter, local_jobs, local_stream_converter, local_metrics
+from PIC_api_server.api.shared import Admin, Job, ConverterService, JobRunner, configure_database, add_missing_columns
 from PIC_api_server.authentication import create_users_blueprint
 from PIC_api_server.authentication import authenticate_user
 
 from PIC_api_server.configuration import config
 
+# Set by initialize_database, so the worker processes it starts know the database is ready
+ENV_DATABASE_INITIALIZED = 'PIC_DATABASE_INITIALIZED'
 
-def create_app(argv):
+
+def create_app(argv, initialize: bool=True):
     '''
     Create a Flask web app to host the API.
     :param: The arguments passed to the application.
+    :param: initialize (optional), a flag indicating whether to initialise the database and requeue interrupted jobs.
+    Servers running several worker processes do this once with initialize_database before starting them, as every
+    worker would otherwise clear the database if CONFIG_DB_CLEAR is set and requeue the jobs the others are running.
+    Default: True
     :return: a Flask web app instance.
     '''
     # Configuration
     app = Flask(__name__)
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{config.CONFIG_DB_PATH}'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
     # Parse arguments
@@ -29,16 +35,69 @@ def create_app(argv):
     # Blueprints
     if api == config.ARGV_LOCAL_API_LONG:
         app.register_blueprint(local_image_converter, url_prefix='/api')
+        app.register_blueprint(local_jobs, url_prefix='/api')
+        app.register_blueprint(local_stream_converter, url_prefix='/api')
+        app.register_blueprint(local_metrics)
+        ConverterService.instance()
 
     app.register_blueprint(create_users_blueprint, url_prefix='/auth')
     app.register_blueprint(authenticate_user, url_prefix='/auth')
 
     # Database
+    configure_database(app)
+    if initialize:
+        _initialize_database(app)
+
+    # Background jobs
+    if api == config.ARGV_LOCAL_API_LONG:
+        job_runner = JobRunner(app)
+        job_runner.start(requeue_interrupted=initialize)
+        app.extensions['job_runner'] = job_runner
+
+    return app
+
+
+def initialize_database():
+    '''
+    Initialise the database and requeue the jobs that were running when the server last stopped, without starting
+    an app. Run once by the parent process of a multi-worker server, before the workers are started.
+    Sets the ENV_DATABASE_INITIALIZED environment variable, which the workers inherit.
+    '''
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    configure_database(app)
+    _initialize_database(app)
+    with app.app_context():
+        Job.requeue_interrupted()
+        # Connections must not be inherited by the worker processes
+        db.session.remove()
+        db.get_engine().dispose()
+    os.environ[ENV_DATABASE_INITIALIZED] = '1'
+
+
+def shutdown_app(app):
+    '''
+    Stop the background jobs and conversion workers of an app, waiting for running jobs and conversions to finish.
+    :param: app, the Flask web app instance.
+    '''
+    job_runner = app.extensions.pop('job_runner', None)
+    if job_runner is not None: # Only the local API converts images
+        job_runner.stop()
+        ConverterService.instance().shutdown()
+
+
+def _initialize_database(app):
+    '''
+    PRIVATE FUNCTION: create the tables and the root user, clearing the database first if CONFIG_DB_CLEAR is set.
+    Columns added to the models since the database was created are added to its existing tables.
+    :param: app, the Flask web app instance.
+    '''
     with app.app_context():
-        db.init_app(app)
         if config.CONFIG_DB_CLEAR:
             db.drop_all()
         db.create_all(app=app)
+        for column in add_missing_columns():
+            app.logger.info(f'Added the missing column {column} to the database')
 
         root_user = Admin.query.get(0)
         if root_user is None:
@@ -48,8 +107,6 @@ def create_app(argv):
             )
             db.session.commit()
 
-    return app
-
 
 def usage():
     '''
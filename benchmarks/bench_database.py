@@ -0,0 +1,185 @@
+'''
+Load test of the database layer of the API server.
+
+Sends concurrent requests from several threads to the API server: user creation requests, which write one row each,
+and logins, which read one. It runs once with the former database settings (a new connection per session, the rollback
+journal and a full sync of every commit) and once with the configured ones, and reports the throughput, latency
+percentiles and failed requests, e.g. 'database is locked' errors, of each run. Results are written as JSON.
+
+Usage: python benchmarks/bench_database.py [--threads 16] [--requests 2000] [--write-ratio 0.5] [--uri sqlite:////tmp/load.db] [--output results.json]
+'''
+import os
+import sys
+import json
+import time
+import random
+import getopt
+import shutil
+import tempfile
+import platform
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'PIC_api_server'))
+
+from werkzeug import security
+
+DEFAULT_THREADS = 16
+DEFAULT_REQUESTS = 2000
+DEFAULT_WRITE_RATIO = 0.5
+ADMIN_NAME = 'load-admin'
+PASSWORD = 'benchmark-password'
+
+# The settings of the API server before the database layer was configurable
+FORMER_SETTINGS = {
+    'CONFIG_DB_POOL_SIZE': 0,
+    'CONFIG_DB_SQLITE_JOURNAL_MODE': 'DELETE',
+    'CONFIG_DB_SQLITE_SYNCHRONOUS': 'FULL',
+    'CONFIG_DB_SQLITE_CACHE_SIZE_KB': 2000
+}
+
+
+def create_app(uri: str, settings: dict):
+    '''
+    Create the API server on a cleared database.
+    :param: uri, the SQLAlchemy URL of the database.
+    :param: settings, configuration values overriding those of config.py.
+    :return: the Flask app, the configuration module and an auth token of an admin.
+    '''
+    from PIC_api_server.configuration import config as api_config
+    import configuration.config as server_config
+
+    for module in (api_config, server_config):
+        module.CONFIG_DB_URI = uri
+        module.CONFIG_DB_CLEAR = True
+        module.CONFIG_AUTH_HASH_METHOD = 'sha256' # Logins should measure the database, not the password hash
+        for name, value in settings.items():
+            setattr(module, name, value)
+
+    import app_api_server
+    app = app_api_server.create_app([])
+
+    from PIC_api_server.api import db
+    from PIC_api_server.api.shared import Admin
+    with app.app_context():
+        db.session.add(Admin(None, ADMIN_NAME, security.generate_password_hash(PASSWORD, method='sha256')))
+        db.session.commit()
+        auth_token = Admin.find_user_in_database(Admin, ADMIN_NAME).generate_user_token().decode()
+    return app, api_config, auth_token
+
+
+def run_load(app, config, auth_token: str, threads: int, requests: int, write_ratio: float):
+    '''
+    Send requests from several threads, each with its own test client.
+    :return: a dictionary with the throughput, latency percentiles and failures of the run.
+    '''
+    local = threading.local()
+    random.seed(0)
+    kinds = [ 'write' if random.random() < write_ratio else 'read' for _ in range(requests) ]
+    login = { config.CONFIG_JSON_USER_NAME: ADMIN_NAME, config.CONFIG_JSON_USER_PASSWORD: PASSWORD }
+
+    def send(index: int):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        start = time.perf_counter()
+        try:
+            if kinds[index] == 'write':
+                users = [ { config.CONFIG_JSON_USER_NAME: f'load-user-{index}' } ]
+                response = local.client.post('/auth/create_users', json={ config.CONFIG_JSON_AUTH_TOKEN: auth_token, config.CONFIG_JSON_REGISTER_USERS: users })
+                succeeded = response.status_code == 200 and response.get_json()[config.CONFIG_JSON_CREATED_USERS] == 1
+            else:
+                response = local.client.post('/auth/login', json=login)
+                succeeded = response.status_code == 200 and response.is_json
+            error = None if succeeded else response.get_data(as_text=True)[:200]
+        except Exception as exception:
+            error = str(exception).splitlines()[0][:200]
+        return kinds[index], time.perf_counter() - start, error
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(send, range(requests)))
+    duration = time.perf_counter() - start
+
+    report = { 'duration_s': duration, 'requests_per_s': requests / duration }
+    for kind in ('write', 'read'):
+        latencies = sorted(latency for result_kind, latency, _ in results if result_kind == kind)
+        errors = [ error for result_kind, _, error in results if result_kind == kind and error is not None ]
+        report[kind] = {
+            'requests': len(latencies),
+            'failed': len(errors),
+            'errors': sorted(set(errors))[:5],
+            'median_s': statistics.median(latencies) if latencies else None,
+            'p95_s': latencies[int(len(latencies) * 0.95)] if latencies else None,
+            'max_s': latencies[-1] if latencies else None
+        }
+    return report
+
+
+def usage():
+    return __doc__.strip().splitlines()[-1:]
+
+
+def main(argv):
+    try:
+        options, _ = getopt.getopt(argv, 'h', ['help', 'threads=', 'requests=', 'write-ratio=', 'uri=', 'output='])
+    except getopt.GetoptError as error:
+        print(error)
+        print('\n'.join(usage()))
+        sys.exit(2)
+
+    threads = DEFAULT_THREADS
+    requests = DEFAULT_REQUESTS
+    write_ratio = DEFAULT_WRITE_RATIO
+    uri = None
+    output_path = None
+    for option, value in options:
+        if option in ('-h', '--help'):
+            print('\n'.join(usage()))
+            sys.exit(0)
+        elif option == '--threads':
+            threads = int(value)
+        elif option == '--requests':
+            requests = int(value)
+        elif option == '--write-ratio':
+            write_ratio = float(value)
+        elif option == '--uri':
+            uri = value
+        elif option == '--output':
+            output_path = value
+
+    work_dir = tempfile.mkdtemp(prefix='pic_database_bench_')
+    results = {}
+    try:
+        from PIC_api_server.configuration import config
+        configured = { name: getattr(config, name) for name in FORMER_SETTINGS }
+        # The former settings only differ from the configured ones for SQLite
+        runs = { 'configured': configured } if uri is not None else { 'former': FORMER_SETTINGS, 'configured': configured }
+        for name, settings in runs.items():
+            run_uri = uri or f'sqlite:///{os.path.join(work_dir, name + ".db")}'
+            app, config, auth_token = create_app(run_uri, settings)
+            results[name] = run_load(app, config, auth_token, threads, requests, write_ratio)
+            results[name]['uri'] = app.config['SQLALCHEMY_DATABASE_URI'].split('@')[-1] # Without credentials
+            results[name]['engine_options'] = { key: str(value) for key, value in app.config['SQLALCHEMY_ENGINE_OPTIONS'].items() }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'environment': { 'python': platform.python_version(), 'platform': platform.platform() },
+        'threads': threads,
+        'requests': requests,
+        'write_ratio': write_ratio,
+        'results': results
+    }
+    output = json.dumps(report, indent=4)
+    if output_path is None:
+        print(output)
+    else:
+        with open(output_path, 'w') as output_file:
+            output_file.write(output)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,191 @@
+'''
+Benchmark harness for the login endpoint of the API server.
+
+Fills a temporary database with admins, then measures the latency and throughput of /auth/login for an existing
+admin, a wrong password and an unknown user, and counts the password hash verifications of every login.
+The query plan of the lookup shows whether it uses the index on the user name. Results are written as JSON.
+
+Usage: python benchmarks/bench_login.py [--users 10000] [--repeats 200] [--hash-method pbkdf2:sha256] [--output results.json]
+'''
+import os
+import sys
+import json
+import time
+import getopt
+import shutil
+import tempfile
+import platform
+import statistics
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'PIC_api_server'))
+
+from werkzeug import security
+
+DEFAULT_USERS = 10000
+DEFAULT_REPEATS = 200
+PASSWORD = 'benchmark-password'
+
+
+def create_app(work_dir: str):
+    '''
+    Create the API server on a database in work_dir.
+    :return: the Flask app and the configuration module.
+    '''
+    from PIC_api_server.configuration import config as api_config
+    import configuration.config as server_config
+
+    for module in (api_config, server_config):
+        module.CONFIG_DB_PATH = os.path.join(work_dir, 'benchmark.db')
+        module.CONFIG_DB_CLEAR = True
+
+    import app_api_server
+    return app_api_server.create_app([]), api_config
+
+
+def add_admins(app, users: int, hash_method: str):
+    '''
+    Add admins named admin-0 to admin-<users - 1>. Every admin gets the same password, hashed once, as
+    generating thousands of salted hashes would take longer than the benchmark itself.
+    :return: the password hash of the admins.
+    '''
+    from PIC_api_server.api import db
+    from PIC_api_server.api.shared import Admin
+
+    password_hash = security.generate_password_hash(PASSWORD, method=hash_method)
+    with app.app_context():
+        db.session.bulk_insert_mappings(Admin, [
+            { 'id': index + 1, 'username': f'admin-{index}', 'password': password_hash } for index in range(users)
+        ])
+        db.session.commit()
+    return password_hash
+
+
+def query_plan(app, user_name: str):
+    '''
+    :return: the SQLite query plan of looking up an admin by name.
+    '''
+    from PIC_api_server.api import db
+    from PIC_api_server.api.shared import Admin
+
+    with app.app_context():
+        query = Admin.query.filter_by(username=user_name).limit(1)
+        statement = str(query.statement.compile(compile_kwargs={ 'literal_binds': True }))
+        return [ row[-1] for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {statement}')) ]
+
+
+def benchmark_login(client, config, user_name: str, password: str, repeats: int):
+    '''
+    Time logins with the given credentials and count the password hash verifications they run.
+    :return: a dictionary with the median and minimum latency, the logins per second, the hash verifications
+    per login and the response of the last login.
+    '''
+    verifications = 0
+    check_password_hash = security.check_password_hash
+
+    def counting_check_password_hash(*args, **kwargs):
+        nonlocal verifications
+        verifications += 1
+        return check_password_hash(*args, **kwargs)
+
+    payload = { config.CONFIG_JSON_USER_NAME: user_name, config.CONFIG_JSON_USER_PASSWORD: password }
+    durations = []
+    security.check_password_hash = counting_check_password_hash
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            response = client.post('/auth/login', json=payload)
+            durations.append(time.perf_counter() - start)
+    finally:
+        security.check_password_hash = check_password_hash
+
+    return {
+        'median_s': statistics.median(durations),
+        'min_s': min(durations),
+        'logins_per_s': len(durations) / sum(durations),
+        'hash_verifications_per_login': verifications / repeats,
+        'response': 'token' if response.is_json else response.get_data(as_text=True)
+    }
+
+
+def time_verification(password_hash: str, repeats: int):
+    '''
+    :return: the median duration in seconds of verifying a password against a hash.
+    '''
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        security.check_password_hash(password_hash, PASSWORD)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def usage():
+    return __doc__.strip().splitlines()[-1:]
+
+
+def main(argv):
+    try:
+        options, _ = getopt.getopt(argv, 'h', ['help', 'users=', 'repeats=', 'hash-method=', 'output='])
+    except getopt.GetoptError as error:
+        print(error)
+        print('\n'.join(usage()))
+        sys.exit(2)
+
+    users = DEFAULT_USERS
+    repeats = DEFAULT_REPEATS
+    hash_method = None
+    output_path = None
+    for option, value in options:
+        if option in ('-h', '--help'):
+            print('\n'.join(usage()))
+            sys.exit(0)
+        elif option == '--users':
+            users = int(value)
+        elif option == '--repeats':
+            repeats = int(value)
+        elif option == '--hash-method':
+            hash_method = value
+        elif option == '--output':
+            output_path = value
+
+    work_dir = tempfile.mkdtemp(prefix='pic_login_bench_')
+    try:
+        app, config = create_app(work_dir)
+        hash_method = hash_method or config.CONFIG_AUTH_HASH_METHOD
+        config.CONFIG_AUTH_HASH_METHOD = hash_method # Unknown users are verified against a hash of the same method
+        password_hash = add_admins(app, users, hash_method)
+        client = app.test_client()
+        last_admin = f'admin-{users - 1}' # The last admin was the slowest to find by scanning
+
+        verification = time_verification(password_hash, repeats)
+        results = {
+            'users': users,
+            'hash_method': hash_method,
+            'query_plan': query_plan(app, last_admin),
+            'hash_verification_s': verification,
+            'scan_estimate_s': verification * users, # One verification per admin, as the former login did
+            'logins': {
+                'existing_user': benchmark_login(client, config, last_admin, PASSWORD, repeats),
+                'wrong_password': benchmark_login(client, config, last_admin, 'wrong', repeats),
+                'unknown_user': benchmark_login(client, config, 'nobody', PASSWORD, repeats)
+            }
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'environment': { 'python': platform.python_version(), 'platform': platform.platform() },
+        'results': results
+    }
+    output = json.dumps(report, indent=4)
+    if output_path is None:
+        print(output)
+    else:
+        with open(output_path, 'w') as output_file:
+            output_file.write(output)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
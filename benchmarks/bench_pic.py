@@ -0,0 +1,440 @@
+'''
+Benchmark harness for the Python Image Converter.
+
+Generates synthetic images locally, measures the time of every conversion stage, the batch throughput of
+every execution mode, the speed and quality of the fast paintable algorithm and of every conversion profile
+compared to the standard one, peak memory and, optionally, the API end-to-end path. Results are written as JSON so
+runs can be compared against a stored baseline.
+
+Usage: python benchmarks/bench_pic.py [--sizes 640x480,1920x1080] [--formats jpg,png] [--repeats 5]
+    [--batch-size 16] [--modes serial,thread,process,pipeline] [--api] [--output results.json]
+    [--baseline baseline.json] [--tolerance 0.15]
+'''
+import os
+import sys
+import json
+import time
+import base64
+import shutil
+import getopt
+import logging
+import platform
+import resource
+import tempfile
+import statistics
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import cv2 as cv
+import numpy as np
+
+from PIC.converter.pic import PIC
+from PIC.converter.fast_paintable import FastPaintableFilter
+from PIC.converter.profiles import PROFILES, DEFAULT_PROFILE
+from PIC.converter.parallel import EXECUTION_MODES, EXECUTION_PIPELINE
+
+DEFAULT_SIZES = [(640, 480), (1920, 1080), (4000, 3000)]
+DEFAULT_FORMATS = ['jpg', 'png']
+DEFAULT_REPEATS = 5
+DEFAULT_BATCH_SIZE = 16
+DEFAULT_TOLERANCE = 0.15
+FAST_PAINTABLE_DOWNSCALES = [1.0, 0.5, 0.25]
+SEED = 1234
+
+
+# =====================Synthetic images=====================
+def generate_image(width: int, height: int, seed: int=SEED):
+    '''
+    Generate a deterministic photo-like image with gradients, shapes, edges and noise.
+    :param: width, the width of the image.
+    :param: height, the height of the image.
+    :param: seed (optional), the random seed.
+    :return: a cv2 image in BGR colour scheme.
+    '''
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 1, width, dtype=np.float32)
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:, :, 0] = (255 * x * (1 - y)).astype(np.uint8)
+    image[:, :, 1] = (255 * y * np.ones_like(x)).astype(np.uint8)
+    image[:, :, 2] = (255 * (1 - x) * np.ones_like(y)).astype(np.uint8)
+
+    scale = max(width, height)
+    for _ in range(40):
+        colour = tuple(int(c) for c in rng.integers(0, 256, 3))
+        centre = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        if rng.random() < 0.5:
+            cv.circle(image, centre, int(rng.integers(scale // 50, scale // 8)), colour, -1)
+        else:
+            corner = (centre[0] + int(rng.integers(scale // 50, scale // 6)), centre[1] + int(rng.integers(scale // 50, scale // 6)))
+            cv.rectangle(image, centre, corner, colour, -1)
+
+    noise = rng.normal(0, 8, image.shape).astype(np.int16)
+    return np.clip(image.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def write_dataset(directory: str, size: tuple, image_format: str, count: int):
+    '''
+    Write a batch of synthetic images to a directory.
+    :return: the paths of the written images.
+    '''
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index in range(count):
+        path = os.path.join(directory, f'synthetic-{size[0]}x{size[1]}-{index}.{image_format}')
+        cv.imwrite(path, generate_image(size[0], size[1], SEED + index))
+        paths.append(path)
+    return paths
+
+
+# =====================Measurements=====================
+def time_call(function, repeats: int):
+    '''
+    Time a function.
+    :return: a dictionary with the median and minimum duration in seconds.
+    '''
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return { 'median_s': statistics.median(durations), 'min_s': min(durations) }
+
+
+def benchmark_stages(path: str, repeats: int):
+    '''
+    Measure every stage of both conversions on a single image.
+    :return: a dictionary of stage name to timing, including megapixels per second.
+    '''
+    image = cv.imread(path)
+    grayscale = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
+    median_blur = cv.medianBlur(grayscale, 5)
+    paintable = PIC.paintable_filter(image)
+    extension = os.path.splitext(path)[1]
+    encoded = cv.imencode(extension, image)[1]
+    output_path = os.path.join(os.path.dirname(path), 'stage-output.jpg')
+    megapixels = image.shape[0] * image.shape[1] / 1e6
+
+    stages = {
+        'read': lambda: cv.imread(path),
+        'decode': lambda: cv.imdecode(encoded, cv.IMREAD_COLOR),
+        'grayscale': lambda: cv.cvtColor(image, cv.COLOR_BGR2GRAY),
+        'median_blur': lambda: cv.medianBlur(grayscale, 5),
+        'adaptive_threshold': lambda: PIC.apply_adaptive_thresholding(median_blur),
+        'paintable_filter': lambda: PIC.paintable_filter(image),
+        'laplacian_filter': lambda: PIC.laplacian_filter(image),
+        'encode': lambda: cv.imencode('.jpg', paintable),
+        'write': lambda: cv.imwrite(output_path, paintable)
+    }
+
+    results = {}
+    for name, function in stages.items():
+        timing = time_call(function, repeats)
+        timing['megapixels_per_s'] = megapixels / timing['median_s'] if timing['median_s'] > 0 else None
+        results[name] = timing
+
+    os.remove(output_path)
+    return results
+
+
+def compare_quality(reference, candidate):
+    '''
+    Compare a paintable conversion to the output of the standard algorithm.
+    :return: a dictionary with the fraction of identical pixels, the F1 score of the black line pixels where lines
+    within one pixel of each other match, and the fraction of black pixels of both conversions.
+    '''
+    kernel = np.ones((3, 3), dtype=np.uint8)
+    reference_lines = reference == 0
+    candidate_lines = candidate == 0
+    near_reference = cv.dilate(reference_lines.astype(np.uint8), kernel) > 0
+    near_candidate = cv.dilate(candidate_lines.astype(np.uint8), kernel) > 0
+    precision = np.count_nonzero(candidate_lines & near_reference) / max(1, np.count_nonzero(candidate_lines))
+    recall = np.count_nonzero(reference_lines & near_candidate) / max(1, np.count_nonzero(reference_lines))
+
+    return {
+        'identical_pixels': float(np.mean(reference == candidate)),
+        'line_f1': 2 * precision * recall / (precision + recall) if precision + recall > 0 else 0.0,
+        'black_pixels': float(np.mean(candidate_lines)),
+        'reference_black_pixels': float(np.mean(reference_lines))
+    }
+
+
+def benchmark_fast_paintable(path: str, repeats: int):
+    '''
+    Measure the speed of the fast paintable algorithm at every downscale factor, and the quality of its output
+    compared to the standard algorithm.
+    :return: a dictionary of algorithm to timing and quality, including the speedup over the standard algorithm.
+    '''
+    image = cv.imread(path)
+    reference = PIC.paintable_filter(image)
+    standard = time_call(lambda: PIC.paintable_filter(image), repeats)
+    results = { 'standard': standard }
+    for scale in FAST_PAINTABLE_DOWNSCALES:
+        fast_filter = FastPaintableFilter(scale)
+        timing = time_call(lambda: fast_filter(image), repeats)
+        timing['speedup'] = standard['median_s'] / timing['median_s'] if timing['median_s'] > 0 else None
+        timing.update(compare_quality(reference, fast_filter(image)))
+        results[f'fast-{round(scale * 100)}%'] = timing
+    return results
+
+
+def benchmark_profiles(path: str, repeats: int):
+    '''
+    Measure the speed of every conversion profile, and the quality of its paintable output compared to the
+    default profile. Outputs of profiles that scale images are scaled back up to compare them.
+    :return: a dictionary of conversion to profile to timing and quality, including the speedup over the default profile.
+    '''
+    image = cv.imread(path)
+    results = {}
+    for conversion in (PIC.CONVERSION_PAINTABLE, PIC.CONVERSION_LAPLACIAN):
+        default_filter = PIC.conversion_filter(conversion, DEFAULT_PROFILE)
+        reference = default_filter(image)
+        default_timing = time_call(lambda: default_filter(image), repeats)
+        results[conversion] = {}
+        for name, profile in PROFILES.items():
+            image_filter = PIC.conversion_filter(conversion, profile)
+            timing = default_timing if profile == DEFAULT_PROFILE else time_call(lambda: image_filter(image), repeats)
+            timing = dict(timing, speedup=default_timing['median_s'] / timing['median_s'] if timing['median_s'] > 0 else None)
+            converted = image_filter(image)
+            timing['output_size'] = list(converted.shape[1::-1])
+            if conversion == PIC.CONVERSION_PAINTABLE:
+                size = reference.shape[1::-1]
+                timing.update(compare_quality(reference, cv.resize(converted, size, interpolation=cv.INTER_NEAREST)))
+            results[conversion][name] = timing
+    return results
+
+
+def benchmark_batch(source: str, target: str, mode: str, conversion: str, count: int, stacked: bool=False):
+    '''
+    Measure the throughput of converting a directory of images with PIC.
+    :param: stacked (optional), convert all images of the same resolution at once with PIC's batch filters.
+    :return: a dictionary with the duration and images per second.
+    '''
+    shutil.rmtree(target, ignore_errors=True)
+    os.makedirs(target)
+    pic = PIC(logging.getLogger('PIC - Benchmark'), path_to_images=source, target=target,
+        delete_source_file_when_complete=False, execution_mode=mode, batch_size=count if stacked else None)
+    pic.load_images()
+
+    start = time.perf_counter()
+    if conversion == PIC.CONVERSION_PAINTABLE:
+        pic.convert_to_paintable()
+    else:
+        pic.convert_to_laplacian()
+    duration = time.perf_counter() - start
+
+    return { 'duration_s': duration, 'images_per_s': count / duration, 'failed_images': len(pic.failed_images) }
+
+
+def benchmark_api(source: str, work_dir: str, repeats: int):
+    '''
+    Measure the API end-to-end path through upload_images using Flask's test client.
+    :return: a dictionary with the timing and images per second of one request.
+    '''
+    sys.path.insert(0, os.path.join(ROOT_DIR, 'PIC_api_server'))
+    from PIC_api_server.configuration import config as api_config
+    import configuration.config as server_config
+
+    for module in (api_config, server_config):
+        module.CONFIG_DB_PATH = os.path.join(work_dir, 'benchmark.db')
+        module.CONFIG_PIC_SOURCE_DIR = os.path.join(work_dir, 'api_source')
+        module.CONFIG_PIC_OUTPUT_DIR = os.path.join(work_dir, 'api_output')
+        module.CONFIG_PIG_SHOW_OUTPUT_WHEN_COMPLETE = False
+        module.CONFIG_PIC_CACHE_DIR = None
+        module.CONFIG_USE_LOCAL_AUTHENTICATION = False
+    os.makedirs(api_config.CONFIG_PIC_SOURCE_DIR, exist_ok=True)
+    os.makedirs(api_config.CONFIG_PIC_OUTPUT_DIR, exist_ok=True)
+
+    import app_api_server
+    app = app_api_server.create_app([])
+    client = app.test_client()
+
+    files = sorted(os.listdir(source))
+    payload = {
+        api_config.CONFIG_JSON_IMAGES: [
+            {
+                api_config.CONFIG_JSON_IMAGE_NAME: file,
+                api_config.CONFIG_JSON_IMAGE_DATA: base64.b64encode(open(os.path.join(source, file), 'rb').read()).decode('utf-8')
+            } for file in files
+        ]
+    }
+
+    results = {}
+    for endpoint in ('/api/local/convert_images', '/api/local/convert_images/memory'):
+        def request():
+            response = client.post(endpoint, json=payload)
+            if response.status_code != 200:
+                raise RuntimeError(f'{endpoint} returned {response.status_code}: {response.data[:200]}')
+
+        timing = time_call(request, repeats)
+        timing['images_per_s'] = len(files) / timing['median_s']
+        results[endpoint] = timing
+    return results
+
+
+def peak_rss():
+    '''
+    :return: the peak resident set size in megabytes of this process and of its children.
+    '''
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return {
+        'self_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor,
+        'children_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / divisor
+    }
+
+
+# =====================Baseline comparison=====================
+def flatten(results: dict, prefix: str=''):
+    '''Flatten nested results to {'a.b.c': value} for comparison.'''
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}.{key}' if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float):
+    '''
+    Compare the durations of two runs.
+    :return: a list of (metric, baseline, current, ratio) tuples of durations that regressed by more than tolerance.
+    '''
+    current = flatten(results.get('results', {}))
+    previous = flatten(baseline.get('results', {}))
+    regressions = []
+    for metric, value in sorted(current.items()):
+        if not (metric.endswith('median_s') or metric.endswith('duration_s')) or metric not in previous:
+            continue
+        if previous[metric] > 0:
+            ratio = value / previous[metric]
+            if ratio > 1 + tolerance:
+                regressions.append((metric, previous[metric], value, ratio))
+    return regressions
+
+
+# =====================Entrypoint=====================
+def usage():
+    return __doc__.strip().splitlines()[-3:]
+
+
+def parse_size(value: str):
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+def main(argv):
+    try:
+        options, _ = getopt.getopt(argv, 'h', ['help', 'sizes=', 'formats=', 'repeats=', 'batch-size=', 'modes=',
+            'api', 'output=', 'baseline=', 'tolerance='])
+    except getopt.GetoptError as error:
+        print(error)
+        print('\n'.join(usage()))
+        sys.exit(2)
+
+    sizes = DEFAULT_SIZES
+    formats = DEFAULT_FORMATS
+    repeats = DEFAULT_REPEATS
+    batch_size = DEFAULT_BATCH_SIZE
+    modes = EXECUTION_MODES
+    run_api = False
+    output = None
+    baseline = None
+    tolerance = DEFAULT_TOLERANCE
+
+    for option, value in options:
+        if option in ('-h', '--help'):
+            print('\n'.join(usage()))
+            sys.exit(0)
+        elif option == '--sizes':
+            sizes = [ parse_size(size) for size in value.split(',') ]
+        elif option == '--formats':
+            formats = value.split(',')
+        elif option == '--repeats':
+            repeats = int(value)
+        elif option == '--batch-size':
+            batch_size = int(value)
+        elif option == '--modes':
+            modes = value.split(',')
+        elif option == '--api':
+            run_api = True
+        elif option == '--output':
+            output = value
+        elif option == '--baseline':
+            baseline = value
+        elif option == '--tolerance':
+            tolerance = float(value)
+
+    work_dir = tempfile.mkdtemp(prefix='pic-benchmark-')
+    results = {}
+    try:
+        for size in sizes:
+            for image_format in formats:
+                name = f'{size[0]}x{size[1]}.{image_format}'
+                print(f'Benchmarking {name}...', file=sys.stderr)
+                source = os.path.join(work_dir, name, 'source')
+                target = os.path.join(work_dir, name, 'target')
+                paths = write_dataset(source, size, image_format, batch_size)
+
+                entry = {
+                    'file_size_bytes': os.path.getsize(paths[0]),
+                    'stages': benchmark_stages(paths[0], repeats),
+                    'paintable_quality': benchmark_fast_paintable(paths[0], repeats),
+                    'profiles': benchmark_profiles(paths[0], repeats),
+                    'batch': {}
+                }
+                for conversion in PIC.CONVERSIONS:
+                    entry['batch'][conversion] = {
+                        mode: benchmark_batch(source, target, mode, conversion, batch_size) for mode in modes
+                    }
+                    for mode in modes:
+                        if mode != EXECUTION_PIPELINE: # The pipeline converts images one at a time
+                            entry['batch'][conversion][f'{mode}-stacked'] = benchmark_batch(source, target, mode,
+                                conversion, batch_size, stacked=True)
+                if run_api:
+                    entry['api'] = benchmark_api(source, os.path.join(work_dir, name), repeats)
+                results[name] = entry
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'opencv': cv.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count()
+        },
+        'parameters': {
+            'sizes': [ f'{width}x{height}' for width, height in sizes ],
+            'formats': formats,
+            'repeats': repeats,
+            'batch_size': batch_size,
+            'modes': modes
+        },
+        'results': results,
+        'peak_rss': peak_rss()
+    }
+
+    serialised = json.dumps(report, indent=2)
+    if output is None:
+        print(serialised)
+    else:
+        with open(output, 'w') as output_file:
+            output_file.write(serialised)
+
+    if baseline is not None:
+        with open(baseline) as baseline_file:
+            regressions = compare_to_baseline(report, json.load(baseline_file), tolerance)
+        for metric, previous, current, ratio in regressions:
+            print(f'REGRESSION {metric}: {previous:.4f}s -> {current:.4f}s ({ratio:.2f}x)', file=sys.stderr)
+        if len(regressions) > 0:
+            sys.exit(1)
+        print(f'No regressions beyond {tolerance:.0%} compared to {baseline}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,224 @@
+'''
+Load test of the production server of the API.
+
+Starts the API server with gunicorn.conf.py on a temporary database for every number of worker processes, sends
+conversion requests with one synthetic image each to /api/local/convert_images/memory from concurrent clients, and
+stops the server with SIGTERM. Reports the throughput and latency percentiles of every run, its speedup over the first
+run and how long the graceful shutdown took. Results are written as JSON.
+
+Usage: python benchmarks/bench_server.py [--workers 1,2,4] [--threads 4] [--clients 16] [--requests 200] [--size 1024x768] [--execution-mode serial] [--output results.json]
+'''
+import os
+import sys
+import json
+import time
+import base64
+import socket
+import getopt
+import signal
+import shutil
+import tempfile
+import platform
+import statistics
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'PIC_api_server'))
+
+import cv2 as cv
+
+from bench_pic import generate_image
+from PIC_api_server.configuration import config
+
+DEFAULT_WORKERS = [1, 2, 4]
+DEFAULT_CLIENTS = 16
+DEFAULT_REQUESTS = 200
+DEFAULT_SIZE = (1024, 768)
+STARTUP_TIMEOUT = 60
+
+
+def serve(settings: dict):
+    '''
+    Run the production server on a temporary database, in a subprocess started by start_server.
+    :param: settings, the work directory, bind address, workers, threads and execution mode of the server.
+    '''
+    import configuration.config as server_config
+
+    work_dir = settings['work_dir']
+    for module in (config, server_config):
+        module.CONFIG_DB_PATH = os.path.join(work_dir, 'benchmark.db')
+        module.CONFIG_DB_CLEAR = True # Safe with several workers, as only the parent process initialises the database
+        module.CONFIG_PIC_SOURCE_DIR = os.path.join(work_dir, 'api_source')
+        module.CONFIG_PIC_OUTPUT_DIR = os.path.join(work_dir, 'api_output')
+        module.CONFIG_PIG_SHOW_OUTPUT_WHEN_COMPLETE = False
+        module.CONFIG_PIC_CACHE_DIR = None # Every request converts the same image
+        module.CONFIG_USE_LOCAL_AUTHENTICATION = False
+        if settings['execution_mode'] is not None:
+            module.CONFIG_PIC_EXECUTION_MODE = settings['execution_mode']
+
+    from gunicorn.app.wsgiapp import run
+    sys.argv = [
+        'gunicorn', '-c', os.path.join(ROOT_DIR, 'gunicorn.conf.py'), '--chdir', ROOT_DIR, '--bind', settings['bind'],
+        '--workers', str(settings['workers']), '--threads', str(settings['threads']), '--log-level', 'warning', 'wsgi:app'
+    ]
+    run()
+
+
+def start_server(work_dir: str, workers: int, threads: int, execution_mode: str):
+    '''
+    Start the production server in a subprocess and wait until it responds.
+    :return: the subprocess and the base URL of the server.
+    '''
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    settings = { 'work_dir': work_dir, 'bind': f'127.0.0.1:{port}', 'workers': workers, 'threads': threads, 'execution_mode': execution_mode }
+    server = subprocess.Popen([sys.executable, os.path.realpath(__file__), '--serve', json.dumps(settings)], cwd=work_dir)
+
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'The server exited with code {server.returncode} while starting')
+        try:
+            with urllib.request.urlopen(f'{url}/metrics', timeout=1):
+                return server, url
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f'The server did not respond within {STARTUP_TIMEOUT} seconds')
+
+
+def stop_server(server):
+    '''
+    Stop the server gracefully with SIGTERM.
+    :return: a dictionary with the duration of the shutdown and the exit code of the server.
+    '''
+    start = time.perf_counter()
+    server.send_signal(signal.SIGTERM)
+    try:
+        exit_code = server.wait(timeout=120)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        exit_code = server.wait()
+    return { 'shutdown_s': time.perf_counter() - start, 'exit_code': exit_code }
+
+
+def run_load(url: str, payload: bytes, clients: int, requests: int):
+    '''
+    Send conversion requests from concurrent clients, after one warm-up request per client.
+    :return: a dictionary with the throughput, latency percentiles and failures of the run.
+    '''
+    def send(_):
+        request = urllib.request.Request(f'{url}/api/local/convert_images/memory', data=payload, headers={ 'Content-Type': 'application/json' })
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=300) as response:
+                images = json.loads(response.read())[config.CONFIG_JSON_IMAGES]
+            failed = response.status != 200 or any(config.CONFIG_JSON_IMAGE_ERROR in image for image in images)
+        except (OSError, ValueError, KeyError):
+            failed = True
+        return time.perf_counter() - start, failed
+
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        list(executor.map(send, range(clients)))
+        start = time.perf_counter()
+        results = list(executor.map(send, range(requests)))
+        duration = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    return {
+        'duration_s': duration,
+        'images_per_s': requests / duration,
+        'failed': sum(1 for _, failed in results if failed),
+        'median_s': statistics.median(latencies),
+        'p95_s': latencies[int(len(latencies) * 0.95)]
+    }
+
+
+def usage():
+    return __doc__.strip().splitlines()[-1:]
+
+
+def main(argv):
+    try:
+        options, _ = getopt.getopt(argv, 'h', ['help', 'serve=', 'workers=', 'threads=', 'clients=', 'requests=', 'size=', 'execution-mode=', 'output='])
+    except getopt.GetoptError as error:
+        print(error)
+        print('\n'.join(usage()))
+        sys.exit(2)
+
+    worker_counts = DEFAULT_WORKERS
+    threads = config.CONFIG_SERVER_THREADS
+    clients = DEFAULT_CLIENTS
+    requests = DEFAULT_REQUESTS
+    size = DEFAULT_SIZE
+    execution_mode = None
+    output_path = None
+    for option, value in options:
+        if option in ('-h', '--help'):
+            print('\n'.join(usage()))
+            sys.exit(0)
+        elif option == '--serve':
+            serve(json.loads(value))
+            return
+        elif option == '--workers':
+            worker_counts = [ int(count) for count in value.split(',') ]
+        elif option == '--threads':
+            threads = int(value)
+        elif option == '--clients':
+            clients = int(value)
+        elif option == '--requests':
+            requests = int(value)
+        elif option == '--size':
+            size = tuple(int(dimension) for dimension in value.lower().split('x'))
+        elif option == '--execution-mode':
+            execution_mode = value
+        elif option == '--output':
+            output_path = value
+
+    encoded, buffer = cv.imencode('.jpg', generate_image(*size))
+    payload = json.dumps({
+        config.CONFIG_JSON_IMAGES: [
+            { config.CONFIG_JSON_IMAGE_NAME: 'benchmark.jpg', config.CONFIG_JSON_IMAGE_DATA: base64.b64encode(buffer.tobytes()).decode('utf-8') }
+        ]
+    }).encode('utf-8')
+
+    results = {}
+    for workers in worker_counts:
+        work_dir = tempfile.mkdtemp(prefix='pic_server_bench_')
+        try:
+            server, url = start_server(work_dir, workers, threads, execution_mode)
+            try:
+                results[workers] = run_load(url, payload, clients, requests)
+            finally:
+                results.setdefault(workers, {}).update(stop_server(server))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    baseline = results[worker_counts[0]]['images_per_s']
+    for result in results.values():
+        result['speedup'] = result['images_per_s'] / baseline
+
+    report = {
+        'environment': { 'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count() },
+        'threads': threads,
+        'clients': clients,
+        'requests': requests,
+        'size': f'{size[0]}x{size[1]}',
+        'execution_mode': execution_mode or config.CONFIG_PIC_EXECUTION_MODE,
+        'results': { f'{workers}_workers': result for workers, result in results.items() }
+    }
+    output = json.dumps(report, indent=4)
+    if output_path is None:
+        print(output)
+    else:
+        with open(output_path, 'w') as output_file:
+            output_file.write(output)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,51 @@
+'''
+Gunicorn configuration of the API server: python -m gunicorn -c gunicorn.conf.py wsgi:app
+
+The parent process imports OpenCV and the converter once, initialises the database and then starts the worker
+processes, which share the imported modules copy-on-write. The app itself is created by every worker, as its job
+runner threads and conversion worker pool do not survive a fork. On SIGTERM the workers stop accepting requests
+and get CONFIG_SERVER_GRACEFUL_TIMEOUT seconds to finish their requests, jobs and conversions.
+The jobs of a worker that crashed or was killed are requeued by the job runners of the other workers once they
+are stale, see CONFIG_JOBS_STALE_TIMEOUT.
+Settings on the command line, e.g. --workers 4, take precedence over those below.
+'''
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), 'PIC_api_server'))
+
+# Imported once by the parent process and shared by the workers
+import cv2
+import numpy
+import PIC.converter.pic
+from PIC_api_server.configuration import config as api_config # Module level names that are gunicorn settings, like config, are read as settings
+import configuration.config as server_config
+
+bind = api_config.CONFIG_SERVER_BIND
+workers = api_config.CONFIG_SERVER_WORKERS
+threads = api_config.CONFIG_SERVER_THREADS
+worker_class = 'gthread'
+timeout = api_config.CONFIG_SERVER_TIMEOUT
+graceful_timeout = api_config.CONFIG_SERVER_GRACEFUL_TIMEOUT
+preload_app = False
+
+
+def on_starting(server):
+    '''Initialise the database once, before any worker process starts.'''
+    import app_api_server
+    app_api_server.initialize_database()
+
+
+def post_fork(server, worker):
+    '''Give every worker process its share of the CPUs for its conversion workers, unless CONFIG_PIC_WORKERS is set.'''
+    if server_config.CONFIG_PIC_WORKERS is None:
+        share = max(1, (os.cpu_count() or 1) // server.cfg.workers)
+        api_config.CONFIG_PIC_WORKERS = server_config.CONFIG_PIC_WORKERS = share
+
+
+def worker_exit(server, worker):
+    '''Stop the job runner and conversion workers of a worker process once it stopped serving requests.'''
+    app = getattr(worker, 'wsgi', None)
+    if app is not None:
+        import app_api_server
+        app_api_server.shutdown_app(app)
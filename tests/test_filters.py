@@ -0,0 +1,64 @@
+import os
+import sys
+
+import cv2 as cv
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from PIC.converter.pic import PIC
+
+
+def reference_laplacian(image):
+    '''The chalk drawing filter chain before it was narrowed to CV_16S.'''
+    grayscale = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
+    return np.uint8(np.absolute(cv.Laplacian(grayscale, cv.CV_64F, ksize=3)))
+
+
+def reference_paintable(image):
+    '''The paintable contours filter chain before it wrote to reusable buffers.'''
+    grayscale = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
+    median_blur = cv.medianBlur(grayscale, 5)
+    return cv.adaptiveThreshold(median_blur, 255, cv.ADAPTIVE_THRESH_GAUSSIAN_C, cv.THRESH_BINARY, 9, 3)
+
+
+def random_image(height, width, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+def dots(height, width):
+    '''White pixels on black, 3 pixels apart, whose Laplacian exceeds 255 and wraps around.'''
+    grayscale = np.zeros((height, width), dtype=np.uint8)
+    grayscale[1::3, 1::3] = 255
+    return cv.cvtColor(grayscale, cv.COLOR_GRAY2BGR)
+
+
+IMAGES = {
+    'random': random_image(480, 640),
+    'random-odd-size': random_image(97, 131, seed=1),
+    'all-black': np.zeros((64, 64, 3), dtype=np.uint8),
+    'all-white': np.full((64, 64, 3), 255, dtype=np.uint8),
+    'one-pixel-wide': random_image(50, 1, seed=2),
+    'one-pixel-high': random_image(1, 50, seed=3),
+    'dots': dots(32, 48),
+}
+
+
+@pytest.mark.parametrize('name', IMAGES)
+def test_laplacian_filter_matches_the_cv_64f_reference(name):
+    image = IMAGES[name]
+    np.testing.assert_array_equal(PIC.laplacian_filter(image), reference_laplacian(image))
+
+
+@pytest.mark.parametrize('name', IMAGES)
+def test_paintable_filter_matches_the_reference(name):
+    image = IMAGES[name]
+    np.testing.assert_array_equal(PIC.paintable_filter(image), reference_paintable(image))
+
+
+def test_filters_reuse_buffers_without_stale_data():
+    # A smaller image after a larger one reuses the buffers of the larger one
+    for image in (IMAGES['random'], IMAGES['random-odd-size'], IMAGES['all-white']):
+        np.testing.assert_array_equal(PIC.laplacian_filter(image), reference_laplacian(image))
+        np.testing.assert_array_equal(PIC.paintable_filter(image), reference_paintable(image))
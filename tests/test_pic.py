@@ -0,0 +1,31 @@
+import os
+import sys
+import logging
+
+import cv2 as cv
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from PIC.converter.pic import PIC
+
+
+@pytest.mark.parametrize('execution_mode', ['thread', 'process', 'pipeline'])
+def test_auto_cleanup_keeps_sources_that_failed_to_convert(tmp_path, execution_mode):
+    source = tmp_path / 'src'
+    target = tmp_path / 'out'
+    source.mkdir()
+    target.mkdir()
+    image = np.random.default_rng(0).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    cv.imwrite(str(source / 'good.jpg'), image)
+    (source / 'bad.jpg').write_bytes(b'not an image')
+
+    pic = PIC(logging.getLogger('PIC - tests'), path_to_images=str(source), target=str(target), delete_source_file_when_complete=True,
+        auto_cleanup=True, execution_mode=execution_mode, workers=2)
+    pic.load_images()
+    pic.convert_to_paintable()
+
+    assert [ os.path.basename(path) for path, _ in pic.failed_images ] == ['bad.jpg']
+    assert sorted(os.listdir(source)) == ['bad.jpg']
+    assert len(os.listdir(target)) == 1
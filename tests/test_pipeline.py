@@ -0,0 +1,38 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from PIC.converter.pipeline import run_pipeline
+
+
+def run(items, compute_workers=2, queue_size=2):
+    return run_pipeline(lambda item: item, lambda _, image: image * 2, lambda _, image: image, items,
+        compute_workers=compute_workers, queue_size=queue_size)
+
+
+def test_pipeline_processes_every_item():
+    assert sorted(result for _, result, _ in run(range(20))) == [ item * 2 for item in range(20) ]
+
+
+def test_pipeline_raises_errors_of_the_items():
+    def items():
+        yield 1
+        raise OSError('The source directory disappeared')
+
+    results = []
+    with pytest.raises(OSError):
+        for _, result, _ in run(items()):
+            results.append(result)
+    assert results == [2]
+
+
+def test_pipeline_stops_its_stages_when_the_consumer_stops_early():
+    stages_before = threading.active_count()
+    results = run(range(1000))
+    next(results)
+    results.close()
+    assert threading.active_count() == stages_before
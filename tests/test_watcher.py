@@ -0,0 +1,54 @@
+import os
+import sys
+import logging
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from PIC.converter import watcher
+from PIC.converter.pic import PIC
+from PIC.converter.manifest import Manifest
+from PIC.converter.scanner import ScannedFile
+
+
+@pytest.fixture
+def folder_watcher(tmp_path):
+    source = tmp_path / 'src'
+    target = tmp_path / 'out'
+    source.mkdir()
+    target.mkdir()
+    pic = PIC(logging.getLogger('PIC - tests'), path_to_images=str(source), target=str(target), recursive=True)
+    manifest = Manifest(str(tmp_path / 'manifest.json'))
+    manifest.record('a.jpg', 1, 1)
+    manifest.record(os.path.join('sub', 'b.jpg'), 1, 1)
+    return watcher.FolderWatcher(pic, manifest, settle_time=0)
+
+
+def test_failed_scan_keeps_the_manifest(folder_watcher, monkeypatch):
+    def scan_files(*_, **__):
+        yield ScannedFile('a.jpg', 'a.jpg', 1, 1)
+        raise OSError('The network share disconnected')
+    monkeypatch.setattr(watcher, 'scan_files', scan_files)
+
+    assert folder_watcher.poll() == 0
+    assert sorted(folder_watcher.manifest.names()) == ['a.jpg', os.path.join('sub', 'b.jpg')]
+
+
+def test_skipped_directory_keeps_its_manifest_entries(folder_watcher, monkeypatch):
+    def scan_files(*_, on_error=None, **__):
+        yield ScannedFile('a.jpg', 'a.jpg', 1, 1)
+        on_error(PermissionError(13, 'Permission denied', 'sub'))
+    monkeypatch.setattr(watcher, 'scan_files', scan_files)
+
+    assert folder_watcher.poll() == 0
+    assert sorted(folder_watcher.manifest.names()) == ['a.jpg', os.path.join('sub', 'b.jpg')]
+
+
+def test_complete_scan_removes_disappeared_files(folder_watcher, monkeypatch):
+    def scan_files(*_, **__):
+        yield ScannedFile('a.jpg', 'a.jpg', 1, 1)
+    monkeypatch.setattr(watcher, 'scan_files', scan_files)
+
+    assert folder_watcher.poll() == 0
+    assert list(folder_watcher.manifest.names()) == ['a.jpg']
@@ -0,0 +1,14 @@
+'''
+WSGI entry point of the API server for production servers: python -m gunicorn -c gunicorn.conf.py wsgi:app
+
+Every worker process imports this module and creates its own app. If the server initialised the database before
+starting the workers, see initialize_database in app_api_server.py, the workers skip it.
+'''
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), 'PIC_api_server'))
+
+from app_api_server import create_app, ENV_DATABASE_INITIALIZED
+
+app = create_app([], initialize=ENV_DATABASE_INITIALIZED not in os.environ)